@@ -27,6 +27,7 @@ from .plugin.execute_command import LspExecuteCommand
 from .plugin.formatting import FormatOnSaveListener
 from .plugin.formatting import LspFormatDocumentCommand
 from .plugin.formatting import LspFormatDocumentRangeCommand
+from .plugin.goto import DefinitionPrefetchListener
 from .plugin.goto import LspSymbolDeclarationCommand
 from .plugin.goto import LspSymbolDefinitionCommand
 from .plugin.goto import LspSymbolImplementationCommand
@@ -34,13 +35,16 @@ from .plugin.goto import LspSymbolTypeDefinitionCommand
 from .plugin.highlights import DocumentHighlightListener
 from .plugin.hover import HoverHandler
 from .plugin.hover import LspHoverCommand
+from .plugin.panels import LspShowCacheStatisticsCommand
 from .plugin.panels import LspShowDiagnosticsPanelCommand
 from .plugin.panels import LspToggleServerPanelCommand
 from .plugin.references import LspSymbolReferencesCommand
 from .plugin.rename import LspSymbolRenameCommand
 from .plugin.signature_help import SignatureHelpListener
+from .plugin.symbols import DocumentSymbolsListener
 from .plugin.symbols import LspDocumentSymbolsCommand
 from .plugin.symbols import LspSelectionAddCommand
 from .plugin.symbols import LspSelectionClearCommand
+from .plugin.symbols import LspWorkspaceSymbolsAsYouTypeCommand
 from .plugin.symbols import LspWorkspaceSymbolsCommand
 import sublime
@@ -1,17 +1,72 @@
 import sublime
 import sublime_plugin
-from .core.configurations import is_supported_syntax
+from .core.cache import LRUCache
 from .core.documents import is_transient_view
 from .core.protocol import Range
 from .core.protocol import Request
 from .core.registry import session_for_view, sessions_for_view, client_from_session, configs_for_scope
 from .core.settings import settings, client_configs
-from .core.typing import Any, List, Dict, Optional
+from .core.typing import Any, List, Dict, Optional, Set, Tuple
 from .core.url import filename_to_uri
 from .core.views import range_to_region
 
 
-color_phantoms_by_view = dict()  # type: Dict[int, sublime.PhantomSet]
+color_phantoms_by_view = dict()  # type: Dict[int, ColorPhantoms]
+color_box_cache = LRUCache("color box", 256)
+
+
+def color_box_html(color: str) -> str:
+    content = color_box_cache.get(color)
+    if content is None:
+        content = """
+            <style>html {{padding: 0}}</style>
+            <div style='padding: 0.4em;
+                        margin-top: 0.2em;
+                        border: 1px solid color(var(--foreground) alpha(0.25));
+                        background-color: {}'>
+            </div>""".format(color)
+        color_box_cache.set(color, content)
+    return content
+
+
+class ColorPhantoms(object):
+    """
+    The color boxes of a view.
+
+    sublime.PhantomSet compares every new phantom with every existing one. Here the boxes are matched by region
+    and color with dict lookups, and only boxes that appeared or disappeared are added or erased.
+    """
+
+    def __init__(self, view: sublime.View) -> None:
+        self._view = view
+        self._colors = {}  # type: Dict[int, str]
+        # the version of the document the boxes were requested for.
+        self.change_count = -1
+
+    def update(self, boxes: List[Tuple[sublime.Region, str]]) -> None:
+        wanted = set((region.a, region.b, color) for region, color in boxes)
+        kept = set()  # type: Set[Tuple[int, int, str]]
+        pids = list(self._colors.keys())
+        # phantoms move with edits, so match them by where they are now.
+        for pid, region in zip(pids, self._view.query_phantoms(pids)):
+            key = (region.a, region.b, self._colors[pid])
+            if key in wanted and key not in kept:
+                kept.add(key)
+            else:
+                self._view.erase_phantom_by_id(pid)
+                del self._colors[pid]
+
+        for region, color in boxes:
+            key = (region.a, region.b, color)
+            if key not in kept:
+                kept.add(key)
+                pid = self._view.add_phantom("lsp_color", region, color_box_html(color), sublime.LAYOUT_INLINE)
+                self._colors[pid] = color
+
+    def clear(self) -> None:
+        self._view.erase_phantoms("lsp_color")
+        self._colors.clear()
+        self.change_count = -1
 
 
 class LspColorListener(sublime_plugin.ViewEventListener):
@@ -24,17 +79,23 @@ class LspColorListener(sublime_plugin.ViewEventListener):
     @classmethod
     def is_applicable(cls, _settings: Any) -> bool:
         syntax = _settings.get('syntax')
-        is_supported = syntax and is_supported_syntax(syntax, client_configs.all)
+        is_supported = syntax and client_configs.is_syntax_supported(syntax)
         disabled_by_user = 'colorProvider' in settings.disabled_capabilities
         return is_supported and not disabled_by_user
 
     @property
-    def phantom_set(self) -> sublime.PhantomSet:
-        return color_phantoms_by_view.setdefault(self.view.id(), sublime.PhantomSet(self.view, "lsp_color"))
+    def phantoms(self) -> ColorPhantoms:
+        phantoms = color_phantoms_by_view.get(self.view.id())
+        if phantoms is None:
+            phantoms = color_phantoms_by_view[self.view.id()] = ColorPhantoms(self.view)
+        return phantoms
 
     def on_activated_async(self) -> None:
         if not self.initialized:
             self.initialize()
+        elif self.enabled:
+            # catch up on edits made while the view was hidden.
+            self.send_color_request()
 
     def initialize(self, is_retry: bool = False) -> None:
         configs = configs_for_scope(self.view)
@@ -67,13 +128,25 @@ class LspColorListener(sublime_plugin.ViewEventListener):
             sublime.set_timeout_async(lambda: self.fire_request(current_point), 800)
 
     def fire_request(self, current_point: int) -> None:
-        if current_point == self._stored_point:
+        if current_point == self._stored_point and self.is_visible():
             self.send_color_request()
 
+    def is_visible(self) -> bool:
+        window = self.view.window()
+        if not window:
+            return False
+        group, _index = window.get_view_index(self.view)
+        return window.active_view_in_group(group) == self.view
+
     def send_color_request(self) -> None:
         if is_transient_view(self.view):
             return
 
+        change_count = self.view.change_count()
+        if change_count == self.phantoms.change_count:
+            # the boxes shown are for this version of the document already.
+            return
+
         client = client_from_session(session_for_view(self.view, 'colorProvider'))
         if client:
             file_path = self.view.file_name()
@@ -85,12 +158,16 @@ class LspColorListener(sublime_plugin.ViewEventListener):
                 }
                 client.send_request(
                     Request.documentColor(params),
-                    self.handle_response
+                    lambda response: self.handle_response(change_count, response)
                 )
 
-    def handle_response(self, response: Optional[List[dict]]) -> None:
+    def handle_response(self, change_count: int, response: Optional[List[dict]]) -> None:
+        if change_count != self.view.change_count():
+            # the document changed while waiting, a request for the new version is scheduled.
+            return
+
         color_infos = response if response else []
-        phantoms = []
+        boxes = []  # type: List[Tuple[sublime.Region, str]]
         for color_info in color_infos:
             color = color_info['color']
             red = color['red'] * 255
@@ -98,23 +175,16 @@ class LspColorListener(sublime_plugin.ViewEventListener):
             blue = color['blue'] * 255
             alpha = color['alpha']
 
-            content = """
-            <style>html {{padding: 0}}</style>
-            <div style='padding: 0.4em;
-                        margin-top: 0.2em;
-                        border: 1px solid color(var(--foreground) alpha(0.25));
-                        background-color: rgba({}, {}, {}, {})'>
-            </div>""".format(red, green, blue, alpha)
-
             range = Range.from_lsp(color_info['range'])
             region = range_to_region(range, self.view)
 
-            phantoms.append(sublime.Phantom(region, content, sublime.LAYOUT_INLINE))
+            boxes.append((region, "rgba({}, {}, {}, {})".format(red, green, blue, alpha)))
 
-        self.phantom_set.update(phantoms)
+        self.phantoms.change_count = change_count
+        self.phantoms.update(boxes)
 
 
 def remove_color_boxes(view: sublime.View) -> None:
-    phantom_set = color_phantoms_by_view.get(view.id())
-    if phantom_set:
-        phantom_set.update([])
+    phantoms = color_phantoms_by_view.get(view.id())
+    if phantoms:
+        phantoms.clear()
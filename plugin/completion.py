@@ -1,15 +1,16 @@
+import functools
 import sublime
 import sublime_plugin
-from .core.completion import parse_completion_response, format_completion
-from .core.configurations import is_supported_syntax
+from .core.cache import LRUCache
+from .core.completion import parse_completion_response, format_completion, CompletionIndex
 from .core.documents import position_is_word
 from .core.edit import parse_text_edit
 from .core.logging import debug
 from .core.protocol import Request
-from .core.registry import session_for_view, client_from_session, LSPViewEventListener
+from .core.registry import sessions_for_view, LSPViewEventListener
 from .core.sessions import Session
 from .core.settings import settings, client_configs
-from .core.typing import Any, List, Dict, Tuple, Optional, Union
+from .core.typing import Any, List, Dict, Set, Tuple, Optional, Union
 from .core.views import text_document_position_params
 
 
@@ -39,21 +40,41 @@ class LspTrimCompletionCommand(sublime_plugin.TextCommand):
 
 
 class CompletionHandler(LSPViewEventListener):
+    # complete (not isIncomplete) completion lists, shared by all views and keyed by buffer.
+    cache = LRUCache("completion", 64)
+
     def __init__(self, view: sublime.View) -> None:
         super().__init__(view)
         self.initialized = False
         self.enabled = False
         self.trigger_chars = []  # type: List[str]
+        # the scopes of the auto_complete_triggers entries registered for the sessions, rather than by the user.
+        self.trigger_scopes = set()  # type: Set[str]
         self.auto_complete_selector = ""
         self.resolve = False
         self.state = CompletionState.IDLE
         self.completions = []  # type: List[Any]
+        self.completion_index = CompletionIndex([])
         self.next_request = None  # type: Optional[Tuple[str, List[int]]]
         self.last_prefix = ""
         self.last_location = -1
         self.committing = False
         self.response_items = []  # type: List[dict]
+        self.response_configs = []  # type: List[str]
         self.response_incomplete = False
+        # completion requests fanned out to every capable session, by config name.
+        self.request_generation = 0
+        self.request_configs = []  # type: List[str]
+        self.pending_configs = set()  # type: Set[str]
+        self.received_responses = {}  # type: Dict[str, Tuple[List[dict], bool]]
+        self.deadline_passed = False
+        self.presented = False
+        self.request_cache_key = None  # type: Optional[Tuple]
+        # speculative completionItem/resolve requests, by index into response_items.
+        self.response_generation = 0
+        self.pending_resolves = {}  # type: Dict[int, Tuple[str, int]]
+        self.resolved_items = {}  # type: Dict[int, Optional[dict]]
+        self.resolve_waiting = None  # type: Optional[Tuple[int, int]]
 
     @classmethod
     def is_applicable(cls, view_settings: dict) -> bool:
@@ -61,45 +82,65 @@ class CompletionHandler(LSPViewEventListener):
             return False
 
         syntax = view_settings.get('syntax')
-        return is_supported_syntax(syntax, client_configs.all) if syntax else False
+        return client_configs.is_syntax_supported(syntax) if syntax else False
 
     def initialize(self) -> None:
         self.initialized = True
-        session = session_for_view(self.view, 'completionProvider')
-        if session:
+        for session in self.completion_sessions():
             completionProvider = session.get_capability('completionProvider') or dict()  # type: dict
             # A language server may have an empty dict as CompletionOptions. In that case,
             # no trigger characters will be registered but we'll still respond to Sublime's
             # usual query for completions. So the explicit check for None is necessary.
             self.enabled = True
-            self.resolve = completionProvider.get('resolveProvider') or False
-            self.trigger_chars = completionProvider.get(
-                'triggerCharacters') or []
-            if self.trigger_chars:
-                self.register_trigger_chars(session)
+            self.resolve = self.resolve or bool(completionProvider.get('resolveProvider'))
+            trigger_chars = completionProvider.get('triggerCharacters') or []  # type: List[str]
+            for trigger_char in trigger_chars:
+                if trigger_char not in self.trigger_chars:
+                    self.trigger_chars.append(trigger_char)
+            if trigger_chars:
+                self.register_trigger_chars(session, trigger_chars)
+        if self.enabled:
             self.auto_complete_selector = self.view.settings().get("auto_complete_selector", "") or ""
 
+    def completion_sessions(self, point: Optional[int] = None) -> List[Session]:
+        return [session for session in sessions_for_view(self.view, point)
+                if session.client and session.has_capability('completionProvider')]
+
+    def completion_session(self, config_name: str) -> Optional[Session]:
+        return next((session for session in self.completion_sessions(self.last_location)
+                     if session.config.name == config_name), None)
+
+    def supports_resolve(self, session: Session) -> bool:
+        completion_provider = session.get_capability('completionProvider') or dict()  # type: dict
+        return bool(completion_provider.get('resolveProvider'))
+
     def _view_language(self, config_name: str) -> Optional[str]:
         languages = self.view.settings().get('lsp_language')
         return languages.get(config_name) if languages else None
 
-    def register_trigger_chars(self, session: Session) -> None:
+    def register_trigger_chars(self, session: Session, trigger_chars: List[str]) -> None:
         completion_triggers = self.view.settings().get('auto_complete_triggers', []) or []  # type: List[Dict[str, str]]
         view_language = self._view_language(session.config.name)
         if view_language:
             for language in session.config.languages:
                 if language.id == view_language:
                     for scope in language.scopes:
-                        # debug("registering", self.trigger_chars, "for", scope)
+                        # debug("registering", trigger_chars, "for", scope)
                         scope_trigger = next(
                             (trigger for trigger in completion_triggers if trigger.get('selector', None) == scope),
                             None
                         )
-                        if not scope_trigger:  # do not override user's trigger settings.
+                        if not scope_trigger:
                             completion_triggers.append({
-                                'characters': "".join(self.trigger_chars),
+                                'characters': "".join(trigger_chars),
                                 'selector': scope
                             })
+                            self.trigger_scopes.add(scope)
+                        elif scope in self.trigger_scopes:  # do not override user's trigger settings.
+                            # registered for another session, which shares the scope.
+                            characters = scope_trigger.get('characters', '')
+                            scope_trigger['characters'] = characters + "".join(
+                                char for char in trigger_chars if char not in characters)
 
             self.view.settings().set('auto_complete_triggers', completion_triggers)
 
@@ -122,26 +163,18 @@ class CompletionHandler(LSPViewEventListener):
         last_start = self.last_location - len(self.last_prefix)
         return prefix.startswith(self.last_prefix) and current_start == last_start
 
-    def find_completion_item(self, inserted: str) -> Optional[dict]:
+    def find_completion_index(self, inserted: str) -> Optional[int]:
         """
 
-        Returns the completionItem for a given replacement string.
+        Returns the index of the completionItem for a given replacement string.
         Matches exactly or up to first snippet placeholder ($s)
 
         """
-        # TODO: candidate for extracting and thorough testing.
-        if self.completions:
-            for index, item in enumerate(self.completions):
-                trigger, replacement = item
-
-                snippet_offset = replacement.find('$', 2)
-                if snippet_offset > -1:
-                    if inserted.startswith(replacement[:snippet_offset]):
-                        return self.response_items[index]
-                else:
-                    if replacement == inserted:
-                        return self.response_items[index]
-        return None
+        return self.completion_index.find(inserted)
+
+    def find_completion_item(self, inserted: str) -> Optional[dict]:
+        index = self.find_completion_index(inserted)
+        return self.response_items[index] if index is not None else None
 
     def on_modified(self) -> None:
 
@@ -179,15 +212,16 @@ class CompletionHandler(LSPViewEventListener):
         region = sublime.Region(begin, self.view.sel()[0].end())
         inserted = self.view.substr(region)
 
-        item = self.find_completion_item(inserted)
-        if not item:
+        index = self.find_completion_index(inserted)
+        if index is None:
             # issues 714 and 720 - calling view.word() on last_location includes a trigger char that is not part of
             # inserted completion.
             debug('No match for inserted "{}", skipping first char'.format(inserted))
             begin += 1
-            item = self.find_completion_item(inserted[1:])
+            index = self.find_completion_index(inserted[1:])
 
-        if item:
+        if index is not None:
+            item = self.response_items[index]
             # the newText is already inserted, now we need to check where it should start.
             edit = item.get('textEdit')
             if edit:
@@ -206,7 +240,8 @@ class CompletionHandler(LSPViewEventListener):
             if additional_edits:
                 self.apply_additional_edits(additional_edits)
             elif self.resolve:
-                self.do_resolve(item)
+                self.resolve_inserted_item(index)
+            self.cancel_pending_resolves()
 
         else:
             debug('could not find completion item for inserted "{}"'.format(inserted))
@@ -232,8 +267,9 @@ class CompletionHandler(LSPViewEventListener):
                 if not reuse_completion:
                     self.last_prefix = prefix
                     self.last_location = locations[0]
-                    self.do_request(prefix, locations)
                     self.completions = []
+                    self.completion_index = CompletionIndex([])
+                    self.do_request(prefix, locations)
 
             elif self.state in (CompletionState.REQUESTING, CompletionState.CANCELLING):
                 if not reuse_completion:
@@ -252,30 +288,141 @@ class CompletionHandler(LSPViewEventListener):
 
     def do_request(self, prefix: str, locations: List[int]) -> None:
         self.next_request = None
-        view = self.view
+        self.discard_resolves()
 
-        # don't store client so we can handle restarts
-        client = client_from_session(session_for_view(view, 'completionProvider', locations[0]))
-        if not client:
+        # don't store sessions so we can handle restarts
+        sessions = self.completion_sessions(locations[0])
+        if not sessions:
             return
 
         if settings.complete_all_chars or self.is_after_trigger_character(locations[0]):
+            cache_key = self.cache_key(locations[0], [session.config.name for session in sessions])
+            cached = self.cache.get(cache_key)
+            if cached:
+                self.use_cached_completions(cached)
+                return
+
             self.manager.documents.purge_changes(self.view)
             document_position = text_document_position_params(self.view, locations[0])
             self.state = CompletionState.REQUESTING
-            client.send_request(
-                Request.complete(document_position),
-                self.handle_response,
-                self.handle_error)
+            self.request_generation += 1
+            generation = self.request_generation
+            self.request_configs = [session.config.name for session in sessions]
+            self.pending_configs = set(self.request_configs)
+            self.received_responses = {}
+            self.deadline_passed = False
+            self.presented = False
+            self.request_cache_key = cache_key
+            for session in sessions:
+                client = session.client
+                if not client:
+                    continue
+                client.send_request(
+                    Request.complete(document_position),
+                    functools.partial(self.handle_response, config_name=session.config.name, generation=generation),
+                    functools.partial(self.handle_error, config_name=session.config.name, generation=generation))
+            if self.pending_configs:
+                sublime.set_timeout(lambda: self.handle_deadline(generation), settings.completion_deadline)
+
+    def cache_key(self, location: int, config_names: List[str]) -> Tuple:
+        """
+        Completion lists are cached per line, by the text of the line around the word being completed.
+
+        The key covers the word start and the trigger character before it, and any edit to the line changes it.
+        """
+        completion_start = self.view.word(location).begin() if position_is_word(self.view, location) else location
+        line = self.view.line(completion_start)
+        row, _col = self.view.rowcol(completion_start)
+        return (self.view.buffer_id(),
+                row,
+                self.view.substr(sublime.Region(line.begin(), completion_start)),
+                self.view.substr(sublime.Region(location, line.end())),
+                tuple(config_names))
+
+    def cache_completions(self) -> None:
+        if self.request_cache_key is None or self.pending_configs or self.response_incomplete:
+            return
 
-    def do_resolve(self, item: dict) -> None:
-        view = self.view
+        self.cache.set(self.request_cache_key,
+                       (tuple(self.response_items), tuple(self.response_configs), tuple(self.completions)))
+
+    def use_cached_completions(self, cached: Tuple[Tuple[dict, ...], Tuple[str, ...], Tuple[Any, ...]]) -> None:
+        response_items, response_configs, completions = cached
+        self.request_generation += 1
+        self.request_configs = []
+        self.pending_configs = set()
+        self.received_responses = {}
+        self.request_cache_key = None
+        self.presented = True
+        self.response_items = list(response_items)
+        self.response_configs = list(response_configs)
+        self.response_incomplete = False
+        self.completions = list(completions)
+        self.completion_index = CompletionIndex(self.completions)
+        self.prefetch_resolves()
 
-        client = client_from_session(session_for_view(view, 'completionProvider', self.last_location))
-        if not client:
+    def do_resolve(self, item: dict, config_name: str) -> None:
+        session = self.completion_session(config_name)
+        if not session or not session.client or not self.supports_resolve(session):
             return
 
-        client.send_request(Request.resolveCompletionItem(item), self.handle_resolve_response)
+        session.client.send_request(Request.resolveCompletionItem(item), self.handle_resolve_response)
+
+    def resolve_inserted_item(self, index: int) -> None:
+        if index in self.resolved_items:
+            self.handle_resolve_response(self.resolved_items[index])
+        elif index in self.pending_resolves:
+            # the prefetched resolve will apply its edits when it arrives.
+            self.resolve_waiting = (self.response_generation, index)
+        else:
+            self.do_resolve(self.response_items[index], self.response_configs[index])
+
+    def prefetch_resolves(self) -> None:
+        if not self.resolve or settings.completion_resolve_prefetch < 1:
+            return
+
+        generation = self.response_generation
+        sessions = {}  # type: Dict[str, Optional[Session]]
+        for index, item in enumerate(self.response_items[:settings.completion_resolve_prefetch]):
+            if item.get('additionalTextEdits'):
+                continue
+            config_name = self.response_configs[index]
+            if config_name not in sessions:
+                sessions[config_name] = self.completion_session(config_name)
+            session = sessions[config_name]
+            if not session or not session.client or not self.supports_resolve(session):
+                continue
+            request_id = session.client.send_request(
+                Request.resolveCompletionItem(item),
+                functools.partial(self.handle_prefetched_resolve, generation, index))
+            if request_id is not None and index not in self.resolved_items:
+                self.pending_resolves[index] = (config_name, request_id)
+
+    def handle_prefetched_resolve(self, generation: int, index: int, response: Optional[Dict]) -> None:
+        if self.resolve_waiting == (generation, index):
+            self.resolve_waiting = None
+            self.handle_resolve_response(response)
+        if generation == self.response_generation:
+            self.pending_resolves.pop(index, None)
+            self.resolved_items[index] = response
+
+    def cancel_pending_resolves(self) -> None:
+        """ Cancels prefetched resolves, except the one an inserted completion is waiting for. """
+        if not self.pending_resolves:
+            return
+
+        sessions = dict((session.config.name, session) for session in self.completion_sessions(self.last_location))
+        for index, pending in self.pending_resolves.items():
+            config_name, request_id = pending
+            session = sessions.get(config_name)
+            if session and session.client and self.resolve_waiting != (self.response_generation, index):
+                session.client.cancel_request(request_id)
+        self.pending_resolves.clear()
+
+    def discard_resolves(self) -> None:
+        self.cancel_pending_resolves()
+        self.resolved_items.clear()
+        self.response_generation += 1
 
     def handle_resolve_response(self, response: Optional[Dict]) -> None:
         if response:
@@ -289,52 +436,131 @@ class CompletionHandler(LSPViewEventListener):
         self.view.run_command("lsp_apply_document_edit", {'changes': edits})
         sublime.status_message('Applied additional edits for completion')
 
-    def handle_response(self, response: Optional[Union[Dict, List]]) -> None:
-        if self.state == CompletionState.REQUESTING:
-
-            completion_start = self.last_location
-            if position_is_word(self.view, self.last_location):
-                # if completion is requested in the middle of a word, where does it start?
-                word = self.view.word(self.last_location)
-                completion_start = word.begin()
-
-            current_word_start = self.view.sel()[0].begin()
-            if position_is_word(self.view, current_word_start):
-                current_word_region = self.view.word(current_word_start)
-                current_word_start = current_word_region.begin()
-
-            if current_word_start != completion_start:
-                debug('completion results for', completion_start, 'now at', current_word_start, 'discarding')
-                self.state = CompletionState.IDLE
-                return
-
-            _last_row, last_col = self.view.rowcol(completion_start)
-
-            response_items, response_incomplete = parse_completion_response(response)
-            self.response_items = response_items
-            self.response_incomplete = response_incomplete
-            self.completions = list(format_completion(item, last_col, settings) for item in self.response_items)
-
-            # if insert_best_completion was just ran, undo it before presenting new completions.
-            prev_char = self.view.substr(self.view.sel()[0].begin() - 1)
-            if prev_char.isspace():
-                if last_text_command == "insert_best_completion":
-                    self.view.run_command("undo")
+    def handle_response(self, response: Optional[Union[Dict, List]], config_name: str, generation: int) -> None:
+        if generation != self.request_generation:
+            debug('discarding completions from', config_name, 'for an earlier request')
+            return
 
-            self.state = CompletionState.APPLYING
-            self.view.run_command("hide_auto_complete")
-            self.run_auto_complete()
+        self.pending_configs.discard(config_name)
+        if self.state == CompletionState.REQUESTING:
+            self.received_responses[config_name] = parse_completion_response(response)
+            if not self.pending_configs or self.deadline_passed:
+                self.present_completions()
         elif self.state == CompletionState.CANCELLING:
             self.state = CompletionState.IDLE
             if self.next_request:
                 prefix, locations = self.next_request
                 self.do_request(prefix, locations)
+        elif self.presented:
+            self.merge_late_response(config_name, response)
         else:
             debug('Got unexpected response while in state {}'.format(self.state))
 
-    def handle_error(self, error: dict) -> None:
+    def handle_deadline(self, generation: int) -> None:
+        if generation != self.request_generation or not self.pending_configs:
+            return
+
+        if self.state == CompletionState.REQUESTING:
+            # present what we have, or the first set that arrives from now on.
+            self.deadline_passed = True
+            if self.received_responses:
+                debug('completion deadline passed, still waiting for', ", ".join(self.pending_configs))
+                self.present_completions()
+        elif self.state == CompletionState.CANCELLING:
+            self.state = CompletionState.IDLE
+            if self.next_request:
+                prefix, locations = self.next_request
+                self.do_request(prefix, locations)
+
+    def completion_start(self) -> int:
+        completion_start = self.last_location
+        if position_is_word(self.view, self.last_location):
+            # if completion is requested in the middle of a word, where does it start?
+            word = self.view.word(self.last_location)
+            completion_start = word.begin()
+        return completion_start
+
+    def present_completions(self) -> None:
+        completion_start = self.completion_start()
+
+        current_word_start = self.view.sel()[0].begin()
+        if position_is_word(self.view, current_word_start):
+            current_word_region = self.view.word(current_word_start)
+            current_word_start = current_word_region.begin()
+
+        if current_word_start != completion_start:
+            debug('completion results for', completion_start, 'now at', current_word_start, 'discarding')
+            self.state = CompletionState.IDLE
+            return
+
+        _last_row, last_col = self.view.rowcol(completion_start)
+
+        self.response_items = []
+        self.response_configs = []
+        self.response_incomplete = False
+        self.completions = []
+        seen = set()  # type: Set[Tuple[str, str]]
+        for config_name in self.request_configs:
+            if config_name in self.received_responses:
+                response_items, response_incomplete = self.received_responses[config_name]
+                self.add_response_items(config_name, response_items, last_col, seen)
+                self.response_incomplete = self.response_incomplete or response_incomplete
+        self.completion_index = CompletionIndex(self.completions)
+        self.cache_completions()
+        self.prefetch_resolves()
+
+        # if insert_best_completion was just ran, undo it before presenting new completions.
+        prev_char = self.view.substr(self.view.sel()[0].begin() - 1)
+        if prev_char.isspace():
+            if last_text_command == "insert_best_completion":
+                self.view.run_command("undo")
+
+        self.presented = True
+        self.state = CompletionState.APPLYING
+        self.view.run_command("hide_auto_complete")
+        self.run_auto_complete()
+
+    def add_response_items(self, config_name: str, response_items: List[dict], word_col: int,
+                           seen: Set[Tuple[str, str]]) -> None:
+        """ Appends items that are not duplicates of completions from sessions with a higher priority. """
+        for item in response_items:
+            completion = format_completion(item, word_col, settings)
+            if completion not in seen:
+                seen.add(completion)
+                self.completions.append(completion)
+                self.response_items.append(item)
+                self.response_configs.append(config_name)
+
+    def merge_late_response(self, config_name: str, response: Optional[Union[Dict, List]]) -> None:
+        if not self.view.is_auto_complete_visible():
+            debug('popup closed, dropping late completions from', config_name)
+            return
+
+        response_items, response_incomplete = parse_completion_response(response)
+        _last_row, last_col = self.view.rowcol(self.completion_start())
+        # appending keeps the indices of the presented items, and of their prefetched resolves, stable.
+        self.add_response_items(config_name, response_items, last_col, set(self.completions))
+        self.response_incomplete = self.response_incomplete or response_incomplete
+        self.completion_index = CompletionIndex(self.completions)
+        self.cache_completions()
+
+        self.state = CompletionState.APPLYING
+        self.view.run_command("hide_auto_complete")
+        self.run_auto_complete()
+
+    def handle_error(self, error: dict, config_name: str, generation: int) -> None:
         sublime.status_message('Completion error: ' + str(error.get('message')))
-        self.state = CompletionState.IDLE
+        if generation != self.request_generation:
+            return
+
+        self.pending_configs.discard(config_name)
+        if self.state == CompletionState.REQUESTING and (not self.pending_configs or self.deadline_passed):
+            if self.received_responses:
+                self.present_completions()
+            elif not self.pending_configs:
+                self.state = CompletionState.IDLE
+        elif self.state == CompletionState.CANCELLING:
+            self.state = CompletionState.IDLE
 
     def run_auto_complete(self) -> None:
         self.view.run_command(
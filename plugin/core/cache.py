@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from .typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class LRUCache(object):
+    """
+    A small least-recently-used cache that counts its hits and misses.
+
+    Named caches register themselves so their counters can be inspected with `cache_statistics`.
+    """
+
+    def __init__(self, name: str, capacity: int) -> None:
+        self.name = name
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # type: OrderedDict
+        _caches.append(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._entries
+
+    def get(self, key: Any) -> Optional[Any]:
+        try:
+            value = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key: Any, value: Any) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: Any) -> None:
+        self._entries.pop(key, None)
+
+    def discard_matching(self, predicate: Callable[[Any], bool]) -> None:
+        """ Discard the entries whose key satisfies predicate. """
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_caches = []  # type: List[LRUCache]
+
+
+def cache_statistics() -> Dict[str, Tuple[int, int, int]]:
+    """ Returns (hits, misses, entries) for every named cache, summed over caches sharing a name. """
+    statistics = {}  # type: Dict[str, Tuple[int, int, int]]
+    for cache in _caches:
+        hits, misses, entries = statistics.get(cache.name, (0, 0, 0))
+        statistics[cache.name] = (hits + cache.hits, misses + cache.misses, entries + len(cache))
+    return statistics
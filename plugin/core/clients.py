@@ -1,5 +1,5 @@
 from .protocol import WorkspaceFolder
-from .sessions import create_session, Session
+from .sessions import start_session, Session
 from .settings import ClientConfig, settings
 from .typing import List, Dict, Tuple, Callable, Optional
 import os
@@ -32,17 +32,19 @@ def start_window_config(window: sublime.Window,
                         on_pre_initialize: Callable[[Session], None],
                         on_post_initialize: Callable[[Session], None],
                         on_post_exit: Callable[[str], None],
-                        on_stderr_log: Optional[Callable[[str], None]]) -> Optional[Session]:
+                        on_stderr_log: Optional[Callable[[str], None]],
+                        on_start_failed: Callable[[Session, str], None]) -> Optional[Session]:
     args, env = get_window_env(window, config)
     config.binary_args = args
-    return create_session(config=config,
-                          workspace_folders=workspace_folders,
-                          env=env,
-                          settings=settings,
-                          on_pre_initialize=on_pre_initialize,
-                          on_post_initialize=on_post_initialize,
-                          on_post_exit=lambda config_name: on_session_ended(window, config_name, on_post_exit),
-                          on_stderr_log=on_stderr_log)
+    return start_session(config=config,
+                         workspace_folders=workspace_folders,
+                         env=env,
+                         settings=settings,
+                         on_pre_initialize=on_pre_initialize,
+                         on_post_initialize=on_post_initialize,
+                         on_post_exit=lambda config_name: on_session_ended(window, config_name, on_post_exit),
+                         on_stderr_log=on_stderr_log,
+                         on_start_failed=on_start_failed)
 
 
 def on_session_ended(window: sublime.Window, config_name: str, on_post_exit_handler: Callable[[str], None]) -> None:
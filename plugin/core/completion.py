@@ -73,6 +73,39 @@ def text_edit_text(item: dict, word_col: int) -> Optional[str]:
     return None
 
 
+class CompletionIndex(object):
+    """
+    Maps text inserted by Sublime back to the index of the completion it came from.
+
+    Replacements without snippet placeholders must match exactly, snippets match up to their first placeholder.
+    When several completions match, the first one in the list wins, like a linear scan would.
+    """
+
+    def __init__(self, completions: List[Tuple[str, str]]) -> None:
+        self._exact = {}  # type: Dict[str, int]
+        self._snippet_prefixes = {}  # type: Dict[str, int]
+        prefix_lengths = set()
+        for index, completion in enumerate(completions):
+            replacement = completion[1]
+            snippet_offset = replacement.find('$', 2)
+            if snippet_offset > -1:
+                self._snippet_prefixes.setdefault(replacement[:snippet_offset], index)
+                prefix_lengths.add(snippet_offset)
+            else:
+                self._exact.setdefault(replacement, index)
+        self._prefix_lengths = sorted(prefix_lengths)
+
+    def find(self, inserted: str) -> Optional[int]:
+        found = self._exact.get(inserted)
+        for length in self._prefix_lengths:
+            if length > len(inserted):
+                break
+            index = self._snippet_prefixes.get(inserted[:length])
+            if index is not None and (found is None or index < found):
+                found = index
+        return found
+
+
 def parse_completion_response(response: Optional[Union[Dict, List]]) -> Tuple[List[Dict], bool]:
     items = []  # type: List[Dict]
     is_incomplete = False
@@ -2,7 +2,7 @@ import sublime
 from copy import deepcopy
 from .logging import debug
 from .types import ClientConfig, LanguageConfig, ViewLike, WindowLike, ConfigRegistry
-from .types import config_supports_syntax, syntax_language
+from .types import config_supports_syntax, index_configs_by_syntax
 from .typing import Any, List, Dict, Tuple, Optional, Iterator
 from .workspace import get_project_config, enable_in_project, disable_in_project
 
@@ -71,6 +71,7 @@ def apply_project_overrides(client_config: ClientConfig, lsp_project_settings: d
             client_env,
             overrides.get("tcp_host", client_config.tcp_host),
             overrides.get("experimental_capabilities", client_config.experimental_capabilities),
+            idle_timeout=overrides.get("idle_timeout", client_config.idle_timeout)
         )
 
     return client_config
@@ -107,6 +108,9 @@ class WindowConfigManager(object):
         self._global_configs = global_configs
         self._temp_disabled_configs = []  # type: List[str]
         self.all = create_window_configs(window, global_configs)
+        self._by_syntax = index_configs_by_syntax(self.all)
+        # changes whenever the configs do, so anything derived from them can tell it is stale.
+        self.generation = 0
 
     def is_supported(self, view: Any) -> bool:
         return any(self.scope_configs(view))
@@ -116,29 +120,35 @@ class WindowConfigManager(object):
 
     def syntax_configs(self, view: Any, include_disabled: bool = False) -> List[ClientConfig]:
         syntax = view.settings().get("syntax")
-        return list(filter(lambda c: config_supports_syntax(c, syntax) and (c.enabled or include_disabled), self.all))
+        return [config for config, _ in self._by_syntax.get(syntax, ()) if config.enabled or include_disabled]
 
     def syntax_supported(self, view: ViewLike) -> bool:
         syntax = view.settings().get("syntax")
-        for found in filter(lambda c: config_supports_syntax(c, syntax) and c.enabled, self.all):
-            return True
-        return False
+        return any(config.enabled for config, _ in self._by_syntax.get(syntax, ()))
 
     def syntax_config_languages(self, view: ViewLike) -> Dict[str, LanguageConfig]:
         syntax = view.settings().get("syntax")
-        config_languages = {}
-        for config in self.all:
-            if config.enabled:
-                language = syntax_language(config, syntax)
-                if language:
-                    config_languages[config.name] = language
-        return config_languages
+        return dict((config.name, language) for config, language in self._by_syntax.get(syntax, ()) if config.enabled)
 
     def update(self) -> None:
         self.all = create_window_configs(self._window, self._global_configs)
         for config in self.all:
             if config.name in self._temp_disabled_configs:
                 config.enabled = False
+        self._configs_changed()
+
+    def add(self, config: ClientConfig) -> None:
+        """ Add a config to this window only, keeping the syntax index in sync. """
+        self.all.append(config)
+        self._configs_changed()
+
+    def remove(self, config: ClientConfig) -> None:
+        self.all.remove(config)
+        self._configs_changed()
+
+    def _configs_changed(self) -> None:
+        self._by_syntax = index_configs_by_syntax(self.all)
+        self.generation += 1
 
     def enable_config(self, config_name: str) -> None:
         enable_in_project(self._window, config_name)
@@ -1,6 +1,5 @@
 import sublime
 
-from .configurations import is_supported_syntax
 from .registry import LSPViewEventListener
 from .settings import client_configs
 from .typing import Optional
@@ -51,7 +50,7 @@ class DocumentSyncListener(LSPViewEventListener):
         if not syntax:
             return False
         else:
-            return is_supported_syntax(syntax, client_configs.all)
+            return client_configs.is_syntax_supported(syntax)
 
     @classmethod
     def applies_to_primary_view_only(cls) -> bool:
@@ -1,4 +1,6 @@
+import mdpopups
 import sublime
+from .cache import LRUCache
 
 
 class PopupsConfig(object):
@@ -12,3 +14,25 @@ class PopupsConfig(object):
 
 
 popups = PopupsConfig()
+
+
+class MarkupRenderer(object):
+    """
+    Converts markdown to HTML with mdpopups, reusing earlier results for the same content.
+
+    The rendered HTML depends on the color scheme, so results are cached by color scheme and content.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._cache = LRUCache("markup", capacity)
+
+    def md2html(self, view: sublime.View, markdown: str) -> str:
+        key = (view.settings().get("color_scheme"), markdown)
+        html = self._cache.get(key)
+        if html is None:
+            html = mdpopups.md2html(view, markdown)
+            self._cache.set(key, html)
+        return html
+
+
+markup = MarkupRenderer(128)
@@ -0,0 +1,62 @@
+from .typing import Dict, Iterable, List, Set
+import os
+import re
+
+# stop scanning a project after this many files, prewarming is a guess and must stay cheap.
+SCAN_FILE_LIMIT = 10000
+
+_YAML_INLINE_LIST = re.compile(r'^file_extensions:\s*\[([^\]]*)\]', re.MULTILINE)
+_YAML_BLOCK_LIST = re.compile(r'^file_extensions:\s*\n((?:[ \t]*-[^\n]*\n?)+)', re.MULTILINE)
+_PLIST_FILE_TYPES = re.compile(r'<key>fileTypes</key>\s*<array>(.*?)</array>', re.DOTALL)
+_PLIST_STRING = re.compile(r'<string>([^<]*)</string>')
+
+
+def _unquote(value: str) -> str:
+    value = value.split('#', 1)[0].strip()
+    if len(value) > 1 and value[0] == value[-1] and value[0] in '"\'':
+        value = value[1:-1]
+    return value
+
+
+def syntax_file_extensions(syntax: str, content: str) -> List[str]:
+    """
+    The file extensions a syntax definition claims, read from the file_extensions of a .sublime-syntax or the
+    fileTypes of a .tmLanguage. Entries can also be whole file names, like Makefile.
+    """
+    extensions = []  # type: List[str]
+    if syntax.endswith('.sublime-syntax'):
+        match = _YAML_INLINE_LIST.search(content)
+        if match:
+            extensions = [_unquote(item) for item in match.group(1).split(',')]
+        else:
+            match = _YAML_BLOCK_LIST.search(content)
+            if match:
+                extensions = [_unquote(line.strip()[1:]) for line in match.group(1).splitlines()]
+    else:
+        match = _PLIST_FILE_TYPES.search(content)
+        if match:
+            extensions = _PLIST_STRING.findall(match.group(1))
+    return [extension.lower() for extension in extensions if extension]
+
+
+def find_files_by_extension(folders: Iterable[str], extensions: Set[str],
+                            limit: int = SCAN_FILE_LIMIT) -> Dict[str, str]:
+    """
+    Map each of the extensions to a file that has it, walking the folders top down and skipping hidden
+    directories. The walk ends once every extension has a file or after limit files.
+    """
+    found = {}  # type: Dict[str, str]
+    scanned = 0
+    for folder in folders:
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = [name for name in dirs if not name.startswith('.')]
+            for name in files:
+                lower_name = name.lower()
+                extension = os.path.splitext(lower_name)[1][1:]
+                for candidate in (extension, lower_name):
+                    if candidate in extensions and candidate not in found:
+                        found[candidate] = os.path.join(root, name)
+                scanned += 1
+                if scanned >= limit or len(found) == len(extensions):
+                    return found
+    return found
@@ -292,6 +292,10 @@ class Notification:
     def exit(cls) -> 'Notification':
         return Notification("exit")
 
+    @classmethod
+    def cancelRequest(cls, request_id: int) -> 'Notification':
+        return Notification("$/cancelRequest", {"id": request_id})
+
     def __repr__(self) -> str:
         return self.method + " " + str(self.params)
 
@@ -1,7 +1,7 @@
 import sublime
 import sublime_plugin
 from .clients import start_window_config
-from .configurations import ConfigManager, is_supported_syntax
+from .configurations import ConfigManager
 from .handlers import LanguageHandler
 from .logging import debug
 from .rpc import Client
@@ -25,7 +25,7 @@ class LSPViewEventListener(sublime_plugin.ViewEventListener):
     def has_supported_syntax(cls, view_settings: dict) -> bool:
         syntax = view_settings.get('syntax')
         if syntax:
-            return is_supported_syntax(syntax, client_configs.all)
+            return client_configs.is_syntax_supported(syntax)
         else:
             return False
 
@@ -84,22 +84,33 @@ def session_for_view(view: sublime.View,
                  if session.has_capability(capability)), None)
 
 
+def session_for_view_or_starting(view: sublime.View,
+                                 capability: str,
+                                 point: Optional[int] = None) -> Optional[Session]:
+    """
+    The ready session of the view with the capability, or else a session of the view that is still starting.
+    The latter queues requests until its capabilities are known, see Session.send_request.
+    """
+    session = session_for_view(view, capability, point)
+    if session:
+        return session
+    window = view.window()
+    if not window:
+        return None
+    manager = windows.lookup(window)
+    manager.wake_hibernated(view)
+    return next((session for session in manager.sessions_for_view(view, point)
+                 if session.state == ClientStates.STARTING), None)
+
+
 def _sessions_for_view_and_window(view: sublime.View, window: Optional[sublime.Window],
                                   point: Optional[int] = None) -> Iterable[Session]:
     if not window:
         debug("no window for view", view.file_name())
         return []
 
-    file_path = view.file_name()
-    if not file_path:
-        # debug("no session for unsaved file")
-        return []
-
-    manager = windows.lookup(window)
-    scope_configs = manager._configs.scope_configs(view, point)
-    sessions = (manager.get_session(config.name, file_path) for config in scope_configs)
-    ready_sessions = (session for session in sessions if session and session.state == ClientStates.READY)
-    return ready_sessions
+    sessions = windows.lookup(window).sessions_for_view(view, point)
+    return (session for session in sessions if session.state == ClientStates.READY)
 
 
 def unload_sessions(window: sublime.Window) -> None:
@@ -7,6 +7,7 @@ from abc import ABCMeta, abstractmethod
 from threading import Condition
 import json
 import subprocess
+import time
 
 
 TCP_CONNECT_TIMEOUT = 5
@@ -143,26 +144,43 @@ class Client(object):
 		self._crash_handler = None  # type: Optional[Callable]
 		self._transport_fail_handler = None  # type: Optional[Callable]
 		self._error_display_handler = lambda msg: debug(msg)
+		# when a request or notification was last sent, to detect idle servers.
+		self.last_activity = time.time()
 
 	def send_request(
             self,
             request: Request,
             handler: Callable[[Optional[Any]], None],
             error_handler: Optional[Callable[[Any], None]] = None,
-	) -> None:
+	) -> Optional[int]:
+		"""
+		Sends a request without waiting for the response. Returns the request ID, which can be passed to
+		cancel_request, or None when there is no transport.
+		"""
 		if self.transport is not None:
 			with self._sync_request_cvar:
 				self.request_id += 1
 				request_id = self.request_id
 				self._response_handlers[request_id] = (handler, error_handler)
+			self.last_activity = time.time()
 			self.logger.outgoing_request(request_id, request.method, request.params, blocking=False)
 			self.send_payload(request.to_payload(request_id))
+			return request_id
 		else:
 			debug('unable to send', request.method)
 			if error_handler is not None:
 				error_handler(None)
 			return None
 
+	def cancel_request(self, request_id: int) -> None:
+		"""
+		Drops the handlers of a request sent with send_request and asks the server to stop working on it.
+		"""
+		with self._sync_request_cvar:
+			if self._response_handlers.pop(request_id, None) is None:
+				return  # already answered
+		self.send_notification(Notification.cancelRequest(request_id))
+
 	def execute_request(
             self,
             request: Request,
@@ -230,6 +248,7 @@ class Client(object):
 
 	def send_notification(self, notification: Notification) -> None:
 		if self.transport is not None:
+			self.last_activity = time.time()
 			self.logger.outgoing_notification(notification.method, notification.params)
 			self.send_payload(notification.to_payload())
 		else:
@@ -368,6 +387,9 @@ class Client(object):
 			return (None, None)
 		if handler:
 			return (handler, result)
+		elif is_error and result.get("code") == ErrorCode.RequestCancelled:
+			debug("dropping cancelled response with ID", response_id)
+			return (None, None)
 		elif is_error:
 			return (self._error_display_handler, result.get("message"))
 		else:
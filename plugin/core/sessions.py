@@ -1,14 +1,28 @@
 from .. import __version__
 from .logging import debug
 from .process import start_server
-from .protocol import completion_item_kinds, symbol_kinds, WorkspaceFolder, Request, Notification
+from .protocol import completion_item_kinds, symbol_kinds, WorkspaceFolder, Request, Notification, ErrorCode
 from .protocol import TextDocumentSyncKindNone, TextDocumentSyncKindIncremental
-from .rpc import Client, attach_stdio_client, Response
-from .transports import start_tcp_transport, start_tcp_listener, TCPTransport, Transport
+from .rpc import Client, attach_stdio_client, Response, try_terminate_process
+from .transports import start_tcp_transport, start_tcp_listener, TCPTransport
 from .types import ClientConfig, ClientStates, Settings
 from .typing import Callable, Dict, Any, Optional, List, Tuple
-from .workspace import is_subpath_of
+from .workspace import FolderTrie
 import os
+import threading
+
+# requests about the caret, for which a newer request of the same method makes a queued one pointless.
+SUPERSEDED_METHODS = frozenset((
+    "textDocument/hover",
+    "textDocument/completion",
+    "textDocument/signatureHelp",
+    "textDocument/documentHighlight",
+    "textDocument/codeAction",
+    "textDocument/definition",
+    "textDocument/typeDefinition",
+    "textDocument/declaration",
+    "textDocument/implementation",
+))
 
 
 def get_initialize_params(workspace_folders: List[WorkspaceFolder], config: ClientConfig) -> dict:
@@ -222,11 +236,67 @@ def clear_dotted_value(current: dict, dotted: str) -> None:
     current.pop(keys[-1], None)
 
 
+def _text_sync_option(textsync: Any, option: str) -> bool:
+    if isinstance(textsync, dict):
+        value = textsync.get(option)
+        if isinstance(value, dict):
+            return True  # dynamic registration
+        return bool(value)
+    return False
+
+
+def _text_sync_kind(textsync: Any) -> int:
+    if isinstance(textsync, dict):
+        change = textsync.get('change', TextDocumentSyncKindNone)
+        if isinstance(change, dict):
+            # dynamic registration
+            return TextDocumentSyncKindIncremental  # or TextDocumentSyncKindFull?
+        return int(change)
+    if isinstance(textsync, int):
+        return textsync
+    return TextDocumentSyncKindNone
+
+
+def _did_save(textsync: Any) -> Tuple[bool, bool]:
+    if isinstance(textsync, dict):
+        options = textsync.get('save')
+        if isinstance(options, dict):
+            return True, bool(options.get('includeText'))
+        elif isinstance(options, bool):
+            return options, False
+    return False, False
+
+
+class CompiledCapabilities(object):
+    """
+    The answers to the capability checks made on every keystroke, hover and save, computed once from the
+    capabilities of a session. Sessions rebuild it whenever their capabilities change.
+    """
+
+    __slots__ = ("providers", "did_open", "text_sync_kind", "will_save", "will_save_wait_until", "did_save",
+                 "did_change_workspace_folders", "did_change_configuration")
+
+    def __init__(self, capabilities: Dict[str, Any]) -> None:
+        self.providers = frozenset(key for key, value in capabilities.items() if value is not False)
+        textsync = capabilities.get('textDocumentSync')
+        if isinstance(textsync, int):
+            self.did_open = textsync > TextDocumentSyncKindNone
+        else:
+            self.did_open = _text_sync_option(textsync, 'openClose')
+        self.text_sync_kind = _text_sync_kind(textsync)
+        self.will_save = _text_sync_option(textsync, 'willSave')
+        self.will_save_wait_until = _text_sync_option(textsync, 'willSaveWaitUntil')
+        self.did_save = _did_save(textsync)
+        self.did_change_workspace_folders = bool(
+            capabilities.get("workspace", {}).get("workspaceFolders", {}).get("changeNotifications"))
+        self.did_change_configuration = "didChangeConfigurationProvider" in capabilities
+
+
 class Session(object):
     def __init__(self,
                  config: ClientConfig,
                  workspace_folders: List[WorkspaceFolder],
-                 client: Client,
+                 client: Optional[Client],
                  on_pre_initialize: 'Optional[Callable[[Session], None]]' = None,
                  on_post_initialize: 'Optional[Callable[[Session], None]]' = None,
                  on_post_exit: Optional[Callable[[str], None]] = None) -> None:
@@ -235,80 +305,76 @@ class Session(object):
         self._on_post_initialize = on_post_initialize
         self._on_post_exit = on_post_exit
         self.capabilities = dict()  # type: Dict[str, Any]
-        self.client = client
-        self._workspace_folders = workspace_folders
-        if on_pre_initialize:
-            on_pre_initialize(self)
+        self._compiled = CompiledCapabilities(self.capabilities)
+        # requests made while the server initializes, see send_request.
+        self._pending_requests = []  # type: List[Tuple[Request, Optional[str], Callable, Optional[Callable]]]
+        self._pending_lock = threading.Lock()
+        self._on_pre_initialize = on_pre_initialize
+        self._set_workspace_folders(workspace_folders)
+        # None while a session created by start_session connects, and once the server exited.
+        self.client = client  # type: Optional[Client]
+        if client:
+            self._begin()
+
+    def connected(self, client: Client) -> None:
+        """ Initializes the server once the client of a session created by start_session is connected. """
+        with self._pending_lock:
+            self.client = client
+            ended = self.state == ClientStates.STOPPING
+        if ended:
+            # the session ended while connecting, there is nothing to shut down.
+            self._handle_shutdown_result()
+        else:
+            self._begin()
+
+    def connection_failed(self) -> None:
+        with self._pending_lock:
+            self.state = ClientStates.STOPPING
+        self._flush_pending_requests()
+        if self._on_post_exit:
+            self._on_post_exit(self.config.name)
+
+    def _begin(self) -> None:
+        if self._on_pre_initialize:
+            self._on_pre_initialize(self)
         self._initialize()
 
     def has_capability(self, capability: str) -> bool:
-        return capability in self.capabilities and self.capabilities[capability] is not False
+        return capability in self._compiled.providers
 
     def get_capability(self, capability: str) -> Optional[Any]:
         return self.capabilities.get(capability)
 
     def should_notify_did_open(self) -> bool:
-        textsync = self.capabilities.get('textDocumentSync')
-        if isinstance(textsync, dict):
-            open_close = textsync.get('openClose')
-            if isinstance(open_close, dict):
-                return True  # dynamic registration
-            return bool(open_close)
-        if isinstance(textsync, int):
-            return textsync > TextDocumentSyncKindNone
-        return False
+        return self._compiled.did_open
 
     def text_sync_kind(self) -> int:
-        textsync = self.capabilities.get('textDocumentSync')
-        if isinstance(textsync, dict):
-            change = textsync.get('change', TextDocumentSyncKindNone)
-            if isinstance(change, dict):
-                # dynamic registration
-                return TextDocumentSyncKindIncremental  # or TextDocumentSyncKindFull?
-            return int(change)
-        if isinstance(textsync, int):
-            return textsync
-        return TextDocumentSyncKindNone
+        return self._compiled.text_sync_kind
 
     def should_notify_did_change(self) -> bool:
-        return self.text_sync_kind() > TextDocumentSyncKindNone
+        return self._compiled.text_sync_kind > TextDocumentSyncKindNone
 
     def should_notify_will_save(self) -> bool:
-        textsync = self.capabilities.get('textDocumentSync')
-        if isinstance(textsync, dict):
-            will_save = textsync.get('willSave')
-            if isinstance(will_save, dict):
-                return True  # dynamic registration
-            return bool(will_save)
-        return False
+        return self._compiled.will_save
 
     def should_request_will_save_wait_until(self) -> bool:
-        textsync = self.capabilities.get('textDocumentSync')
-        if isinstance(textsync, dict):
-            wswu = textsync.get('willSaveWaitUntil')
-            if isinstance(wswu, dict):
-                return True  # dynamic registration
-            return bool(wswu)
-        return False
+        return self._compiled.will_save_wait_until
 
     def should_notify_did_save(self) -> Tuple[bool, bool]:
-        textsync = self.capabilities.get('textDocumentSync')
-        if isinstance(textsync, dict):
-            options = textsync.get('save')
-            if isinstance(options, dict):
-                return True, bool(options.get('includeText'))
-            elif isinstance(options, bool):
-                return options, False
-        return False, False
+        return self._compiled.did_save
 
     def should_notify_did_close(self) -> bool:
-        return self.should_notify_did_open()
+        return self._compiled.did_open
 
     def should_notify_did_change_workspace_folders(self) -> bool:
-        return bool(self.capabilities.get("workspace", {}).get("workspaceFolders", {}).get("changeNotifications"))
+        return self._compiled.did_change_workspace_folders
 
     def should_notify_did_change_configuration(self) -> bool:
-        return "didChangeConfigurationProvider" in self.capabilities
+        return self._compiled.did_change_configuration
+
+    def _compile_capabilities(self) -> None:
+        # replaced as a whole, so readers on other threads never see a half-built record.
+        self._compiled = CompiledCapabilities(self.capabilities)
 
     def handles_path(self, file_path: Optional[str]) -> bool:
         if not file_path:
@@ -317,11 +383,11 @@ class Session(object):
         if not self._workspace_folders:
             return True
 
-        for folder in self._workspace_folders:
-            if is_subpath_of(file_path, folder.path):
-                return True
+        return self._folder_trie.nearest_folder(file_path) is not None
 
-        return False
+    def _set_workspace_folders(self, folders: List[WorkspaceFolder]) -> None:
+        self._workspace_folders = folders
+        self._folder_trie = FolderTrie(folder.path for folder in folders)
 
     def update_folders(self, folders: List[WorkspaceFolder]) -> None:
         if self.should_notify_did_change_workspace_folders():
@@ -333,11 +399,14 @@ class Session(object):
                 }
             }
             notification = Notification.didChangeWorkspaceFolders(params)
-            self.client.send_notification(notification)
+            if self.client:
+                self.client.send_notification(notification)
         if self._supports_workspace_folders():
-            self._workspace_folders = folders
+            self._set_workspace_folders(folders)
 
     def _initialize(self) -> None:
+        if not self.client:
+            return
         params = get_initialize_params(self._workspace_folders, self.config)
         self.client.send_request(
             Request.initialize(params),
@@ -350,10 +419,47 @@ class Session(object):
         return workspace_folder_cap.get("supported")
 
     def on_request(self, method: str, handler: Callable) -> None:
-        self.client.on_request(method, handler)
+        if self.client:
+            self.client.on_request(method, handler)
+
+    def send_request(self, request: Request, handler: Callable[[Optional[Any]], None],
+                     error_handler: Optional[Callable[[Any], None]] = None,
+                     capability: Optional[str] = None) -> None:
+        """
+        Sends the request, or queues it while the server initializes to send it once the session is ready.
+        A queued request is dropped when the server lacks capability, or when a newer request of the same
+        method supersedes it. The error_handler of a dropped request receives a RequestCancelled error.
+        """
+        superseded = []  # type: List[Tuple[Request, Optional[str], Callable, Optional[Callable]]]
+        queued = False
+        with self._pending_lock:
+            if self.state == ClientStates.STARTING:
+                if request.method in SUPERSEDED_METHODS:
+                    superseded = [p for p in self._pending_requests if p[0].method == request.method]
+                    self._pending_requests = [p for p in self._pending_requests if p[0].method != request.method]
+                self._pending_requests.append((request, capability, handler, error_handler))
+                queued = True
+        for pending in superseded:
+            _cancel_pending_request(pending[0], pending[3])
+        if queued:
+            return
+        if self.state == ClientStates.READY and self.client and (capability is None or self.has_capability(capability)):
+            self.client.send_request(request, handler, error_handler)
+        else:
+            _cancel_pending_request(request, error_handler)
+
+    def _flush_pending_requests(self) -> None:
+        with self._pending_lock:
+            pending_requests = self._pending_requests
+            self._pending_requests = []
+        if pending_requests:
+            debug("{}: sending {} requests made during startup".format(self.config.name, len(pending_requests)))
+        for request, capability, handler, error_handler in pending_requests:
+            self.send_request(request, handler, error_handler, capability)
 
     def on_notification(self, method: str, handler: Callable) -> None:
-        self.client.on_notification(method, handler)
+        if self.client:
+            self.client.on_notification(method, handler)
 
     def _handle_initialize_error(self, error: Any) -> None:
         self.state = ClientStates.STOPPING
@@ -361,13 +467,14 @@ class Session(object):
 
     def _handle_initialize_result(self, result: Any) -> None:
         self.capabilities.update(result.get('capabilities', dict()))
+        self._compile_capabilities()
 
         # only keep supported amount of folders
         if self._workspace_folders:
             if self._supports_workspace_folders():
                 debug('multi folder session:', self._workspace_folders)
             else:
-                self._workspace_folders = self._workspace_folders[:1]
+                self._set_workspace_folders(self._workspace_folders[:1])
                 debug('single folder session:', self._workspace_folders[0])
         else:
             debug("session with no workspace folders")
@@ -380,12 +487,14 @@ class Session(object):
         self.on_request("client/unregisterCapability", self._handle_unregister_capability)
         if self._on_post_initialize:
             self._on_post_initialize(self)
+        # after the initialized notification and the didOpen of the documents.
+        self._flush_pending_requests()
         execute_commands = self.get_capability('executeCommandProvider.commands')
         if execute_commands:
             debug("{}: Supported execute commands: {}".format(self.config.name, execute_commands))
 
     def _handle_request_workspace_folders(self, _: Any, request_id: Any) -> None:
-        self.client.send_response(Response(request_id, [wf.to_lsp() for wf in self._workspace_folders]))
+        self._send_response(Response(request_id, [wf.to_lsp() for wf in self._workspace_folders]))
 
     def _handle_request_workspace_configuration(self, params: Dict[str, Any], request_id: Any) -> None:
         items = []  # type: List[Any]
@@ -399,7 +508,7 @@ class Session(object):
                     items.append(self.config.settings)
             else:
                 items.append(self.config.settings)
-        self.client.send_response(Response(request_id, items))
+        self._send_response(Response(request_id, items))
 
     def _handle_register_capability(self, params: Any, request_id: Any) -> None:
         registrations = params["registrations"]
@@ -409,7 +518,8 @@ class Session(object):
             debug("{}: registering capability:".format(self.config.name), capability_path)
             set_dotted_value(self.capabilities, capability_path, registration.get("registerOptions"))
             set_dotted_value(self.capabilities, registration_path, registration["id"])
-        self.client.send_response(Response(request_id, None))
+        self._compile_capabilities()
+        self._send_response(Response(request_id, None))
 
     def _handle_unregister_capability(self, params: Any, request_id: Any) -> None:
         unregistrations = params["unregisterations"]  # typo in the official specification
@@ -418,77 +528,143 @@ class Session(object):
             debug("{}: unregistering capability:".format(self.config.name), capability_path)
             clear_dotted_value(self.capabilities, capability_path)
             clear_dotted_value(self.capabilities, registration_path)
-        self.client.send_response(Response(request_id, None))
+        self._compile_capabilities()
+        self._send_response(Response(request_id, None))
+
+    def _send_response(self, response: Response) -> None:
+        if self.client:
+            self.client.send_response(response)
 
     def end(self) -> None:
-        self.state = ClientStates.STOPPING
-        self.client.send_request(
+        with self._pending_lock:
+            self.state = ClientStates.STOPPING
+            client = self.client
+        self._flush_pending_requests()
+        if not client:
+            # still connecting, see connected, or exited already.
+            return
+        client.send_request(
             Request.shutdown(),
             lambda result: self._handle_shutdown_result(),
             lambda error: self._handle_shutdown_result())
 
     def _handle_shutdown_result(self) -> None:
-        self.client.exit()
-        self.client = None  # type: ignore
+        if self.client:
+            self.client.exit()
+            self.client = None
         self.capabilities.clear()
+        self._compile_capabilities()
         if self._on_post_exit:
             self._on_post_exit(self.config.name)
 
 
-def create_session(config: ClientConfig,
-                   workspace_folders: List[WorkspaceFolder],
-                   env: dict,
-                   settings: Settings,
-                   on_pre_initialize: Optional[Callable[[Session], None]] = None,
-                   on_post_initialize: Optional[Callable[[Session], None]] = None,
-                   on_post_exit: Optional[Callable[[str], None]] = None,
-                   on_stderr_log: Optional[Callable[[str], None]] = None,
-                   bootstrap_client: Optional[Any] = None) -> Optional[Session]:
+def _cancel_pending_request(request: Request, error_handler: Optional[Callable[[Any], None]]) -> None:
+    debug('dropped queued request', request.method)
+    if error_handler:
+        error_handler({"code": ErrorCode.RequestCancelled, "message": "{} was not sent".format(request.method)})
 
-    def with_client(client: Client) -> Session:
-        return Session(
-            config=config,
-            workspace_folders=workspace_folders,
-            client=client,
-            on_pre_initialize=on_pre_initialize,
-            on_post_initialize=on_post_initialize,
-            on_post_exit=on_post_exit)
 
-    session = None
+def _connect_client(config: ClientConfig,
+                    workspace_folders: List[WorkspaceFolder],
+                    env: dict,
+                    settings: Settings,
+                    on_stderr_log: Optional[Callable[[str], None]] = None,
+                    bootstrap_client: Optional[Any] = None) -> Optional[Client]:
+    """ Spawns the server of the config and connects a client to it, blocking until the server is reachable. """
     if config.binary_args:
         tcp_port = config.tcp_port
         server_args = config.binary_args
+        listener = None
 
         if config.tcp_mode == "host":
-            socket = start_tcp_listener(tcp_port or 0)
-            tcp_port = socket.getsockname()[1]
+            listener = start_tcp_listener(tcp_port or 0)
+            tcp_port = listener.getsockname()[1]
             server_args = list(s.replace("{port}", str(tcp_port)) for s in config.binary_args)
 
         working_dir = workspace_folders[0].path if workspace_folders else None
         process = start_server(server_args, working_dir, env, on_stderr_log)
-        if process:
-            if config.tcp_mode == "host":
-                client_socket, address = socket.accept()
-                transport = TCPTransport(client_socket)  # type: Transport
-                session = with_client(Client(transport, settings))
+        if not process:
+            if listener:
+                listener.close()
+            return None
+        try:
+            if listener:
+                try:
+                    client_socket, address = listener.accept()
+                finally:
+                    listener.close()
+                return Client(TCPTransport(client_socket), settings)
             elif tcp_port:
-                transport = start_tcp_transport(tcp_port, config.tcp_host)
-                if transport:
-                    session = with_client(Client(transport, settings))
-                else:
-                    # try to terminate the process
-                    try:
-                        process.terminate()
-                    except Exception:
-                        pass
-            else:
-                session = with_client(attach_stdio_client(process, settings))
-    else:
-        if config.tcp_port:
-            transport = start_tcp_transport(config.tcp_port)
-            session = with_client(Client(transport, settings))
-        elif bootstrap_client:
-            session = with_client(bootstrap_client)
-        else:
-            debug("No way to start session")
+                return Client(start_tcp_transport(tcp_port, config.tcp_host), settings)
+        except Exception:
+            try_terminate_process(process)
+            raise
+        return attach_stdio_client(process, settings)
+    elif config.tcp_port:
+        return Client(start_tcp_transport(config.tcp_port), settings)
+    elif bootstrap_client:
+        return bootstrap_client
+    debug("No way to start session")
+    return None
+
+
+def create_session(config: ClientConfig,
+                   workspace_folders: List[WorkspaceFolder],
+                   env: dict,
+                   settings: Settings,
+                   on_pre_initialize: Optional[Callable[[Session], None]] = None,
+                   on_post_initialize: Optional[Callable[[Session], None]] = None,
+                   on_post_exit: Optional[Callable[[str], None]] = None,
+                   on_stderr_log: Optional[Callable[[str], None]] = None,
+                   bootstrap_client: Optional[Any] = None) -> Optional[Session]:
+    client = _connect_client(config, workspace_folders, env, settings, on_stderr_log, bootstrap_client)
+    if not client:
+        return None
+    return Session(
+        config=config,
+        workspace_folders=workspace_folders,
+        client=client,
+        on_pre_initialize=on_pre_initialize,
+        on_post_initialize=on_post_initialize,
+        on_post_exit=on_post_exit)
+
+
+def start_session(config: ClientConfig,
+                  workspace_folders: List[WorkspaceFolder],
+                  env: dict,
+                  settings: Settings,
+                  on_pre_initialize: Optional[Callable[[Session], None]] = None,
+                  on_post_initialize: Optional[Callable[[Session], None]] = None,
+                  on_post_exit: Optional[Callable[[str], None]] = None,
+                  on_stderr_log: Optional[Callable[[str], None]] = None,
+                  on_start_failed: Optional[Callable[[Session, str], None]] = None) -> Session:
+    """
+    Like create_session, but returns a starting session right away. The server is spawned, connected to and
+    initialized on a thread of its own, so slow servers neither block the caller nor each other. When the server
+    cannot be reached, on_start_failed receives the session and the reason before the session exits.
+    """
+    session = Session(
+        config=config,
+        workspace_folders=workspace_folders,
+        client=None,
+        on_pre_initialize=on_pre_initialize,
+        on_post_initialize=on_post_initialize,
+        on_post_exit=on_post_exit)
+
+    def connect() -> None:
+        try:
+            client = _connect_client(config, workspace_folders, env, settings, on_stderr_log)
+            error = "" if client else "No way to start session"
+        except Exception as ex:
+            client = None
+            error = str(ex)
+        if client:
+            session.connected(client)
+            return
+        debug("could not start {}: {}".format(config.name, error))
+        if on_start_failed:
+            on_start_failed(session, error)
+        session.connection_failed()
+
+    threading.Thread(target=connect, name="{} startup".format(config.name)).start()
     return session
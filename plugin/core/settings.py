@@ -1,6 +1,6 @@
 from .logging import debug
-from .types import Settings, ClientConfig, LanguageConfig
-from .typing import List, Optional, Dict, Callable
+from .types import Settings, ClientConfig, LanguageConfig, index_configs_by_syntax
+from .typing import List, Optional, Dict, Callable, Tuple
 import sublime
 
 
@@ -77,6 +77,9 @@ def update_settings(settings: Settings, settings_obj: sublime.Settings) -> None:
     settings.only_show_lsp_completions = read_bool_setting(settings_obj, "only_show_lsp_completions", False)
     settings.complete_all_chars = read_bool_setting(settings_obj, "complete_all_chars", True)
     settings.completion_hint_type = read_str_setting(settings_obj, "completion_hint_type", "auto")
+    settings.completion_resolve_prefetch = read_int_setting(settings_obj, "completion_resolve_prefetch", 0)
+    settings.completion_deadline = read_int_setting(settings_obj, "completion_deadline", 300)
+    settings.definition_prefetch = read_bool_setting(settings_obj, "definition_prefetch", False)
     settings.show_references_in_quick_panel = read_bool_setting(settings_obj, "show_references_in_quick_panel", False)
     settings.disabled_capabilities = read_array_setting(settings_obj, "disabled_capabilities", [])
     settings.log_debug = read_bool_setting(settings_obj, "log_debug", False)
@@ -84,6 +87,10 @@ def update_settings(settings: Settings, settings_obj: sublime.Settings) -> None:
     settings.log_stderr = read_bool_setting(settings_obj, "log_stderr", False)
     settings.log_payloads = read_bool_setting(settings_obj, "log_payloads", False)
     settings.auto_restart = read_bool_setting(settings_obj, "auto_restart", False)
+    settings.prewarm_sessions = read_bool_setting(settings_obj, "prewarm_sessions", False)
+    settings.prewarm_concurrency = read_int_setting(settings_obj, "prewarm_concurrency", 2)
+    settings.prewarm_idle_timeout = read_int_setting(settings_obj, "prewarm_idle_timeout", 300)
+    settings.share_sessions = read_bool_setting(settings_obj, "share_sessions", False)
     settings.origin_encoding = read_str_setting(settings_obj, "origin_encoding", "UTF-8")
 
 
@@ -94,6 +101,7 @@ class ClientConfigs(object):
         self._global_settings = dict()  # type: Dict[str, dict]
         self._external_configs = dict()  # type: Dict[str, ClientConfig]
         self.all = []  # type: List[ClientConfig]
+        self._by_syntax = {}  # type: Dict[str, List[Tuple[ClientConfig, LanguageConfig]]]
         self._listener = None  # type: Optional[Callable]
 
     def update(self, settings_obj: sublime.Settings) -> None:
@@ -119,10 +127,24 @@ class ClientConfigs(object):
             merged_settings.update(user_settings)
             self.all.append(read_client_config(config_name, merged_settings))
 
+        self._by_syntax = index_configs_by_syntax(self.all)
         debug('global configs', list('{}={}'.format(c.name, c.enabled) for c in self.all))
         if self._listener:
             self._listener()
 
+    def add(self, config: ClientConfig) -> None:
+        """ Add a config that isn't read from the settings, keeping the syntax index in sync. """
+        self.all.append(config)
+        self._by_syntax = index_configs_by_syntax(self.all)
+
+    def remove(self, config: ClientConfig) -> None:
+        self.all.remove(config)
+        self._by_syntax = index_configs_by_syntax(self.all)
+
+    def is_syntax_supported(self, syntax: str) -> bool:
+        """ Whether any config, enabled or not, supports the syntax. """
+        return syntax in self._by_syntax
+
     def _set_enabled(self, config_name: str, is_enabled: bool) -> None:
         if _settings_obj:
             client_settings = self._global_settings.setdefault(config_name, {})
@@ -189,7 +211,8 @@ def read_client_config(name: str, client_config: Dict) -> ClientConfig:
         client_config.get("env", dict()),
         client_config.get("tcp_host", None),
         client_config.get("tcp_mode", None),
-        client_config.get("experimental_capabilities", dict())
+        client_config.get("experimental_capabilities", dict()),
+        client_config.get("idle_timeout", 0)
     )
 
 
@@ -209,5 +232,6 @@ def update_client_config(config: ClientConfig, settings: dict) -> ClientConfig:
         settings.get("env", config.env),
         settings.get("tcp_host", config.tcp_host),
         settings.get("tcp_mode", config.tcp_mode),
-        settings.get("experimental_capabilities", config.experimental_capabilities)
+        settings.get("experimental_capabilities", config.experimental_capabilities),
+        settings.get("idle_timeout", config.idle_timeout)
     )
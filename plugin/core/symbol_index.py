@@ -0,0 +1,121 @@
+from .logging import debug
+from .typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import threading
+
+INDEX_VERSION = 1
+
+
+def matches_query(query: str, name: str) -> bool:
+    """ Whether the characters of query appear in name in order, ignoring case. """
+    position = 0
+    name = name.lower()
+    for char in query.lower():
+        position = name.find(char, position) + 1
+        if not position:
+            return False
+    return True
+
+
+def flatten_document_symbols(uri: str, items: List[Dict[str, Any]],
+                             container_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """ Convert a textDocument/documentSymbol response into a flat list of SymbolInformation. """
+    symbols = []  # type: List[Dict[str, Any]]
+    for item in items:
+        if 'location' in item:
+            symbols.append(item)
+            continue
+        symbol = {'name': item['name'], 'kind': item['kind'], 'location': {'uri': uri, 'range': item['range']}}
+        if container_name:
+            symbol['containerName'] = container_name
+        symbols.append(symbol)
+        symbols.extend(flatten_document_symbols(uri, item.get('children') or [], item['name']))
+    return symbols
+
+
+def _symbol_name(symbol: Dict[str, Any]) -> Tuple[str, int]:
+    return (symbol['name'], symbol['kind'])
+
+
+class SymbolIndex(object):
+    """
+    The workspace symbols of a project, kept in a JSON file so symbol queries can be answered before the language
+    servers are ready. Symbols are stored as SymbolInformation, grouped by document uri.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._symbols_by_uri = {}  # type: Dict[str, List[Dict[str, Any]]]
+        self._dirty = False
+        self._loaded = False
+
+    def load(self) -> None:
+        """ Read the index from disk. Documents indexed in the meantime keep their newer symbols. """
+        documents = {}  # type: Dict[str, List[Dict[str, Any]]]
+        try:
+            with open(self._path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            if isinstance(data, dict) and data.get('version') == INDEX_VERSION:
+                documents = data.get('documents') or {}
+        except (OSError, ValueError):
+            pass
+        with self._lock:
+            documents.update(self._symbols_by_uri)
+            self._symbols_by_uri = documents
+            self._loaded = True
+
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty or not self._loaded:
+                # an index that wasn't read yet would overwrite the saved one.
+                return
+            data = json.dumps({'version': INDEX_VERSION, 'documents': self._symbols_by_uri}, separators=(',', ':'))
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            temporary_path = self._path + '.tmp'
+            with open(temporary_path, 'w', encoding='utf-8') as file:
+                file.write(data)
+            os.replace(temporary_path, self._path)
+        except OSError as ex:
+            debug('could not save symbol index', self._path, ex)
+
+    def is_empty(self) -> bool:
+        return not self._symbols_by_uri
+
+    def query(self, query: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [symbol for symbols in self._symbols_by_uri.values() for symbol in symbols
+                    if matches_query(query, symbol['name'])]
+
+    def set_document_symbols(self, uri: str, symbols: List[Dict[str, Any]]) -> None:
+        """ Replace the symbols of a document with those of its latest version. """
+        with self._lock:
+            if symbols:
+                self._symbols_by_uri[uri] = symbols
+            else:
+                self._symbols_by_uri.pop(uri, None)
+            self._dirty = True
+
+    def add_workspace_symbols(self, symbols: List[Dict[str, Any]]) -> None:
+        """
+        Merge live workspace/symbol results into the index. Only the documents that appear in the results are
+        touched: their indexed symbols with the name and kind of a live symbol are replaced by the live ones. Other
+        indexed symbols are kept, as servers match queries by rules of their own.
+        """
+        live_by_uri = {}  # type: Dict[str, List[Dict[str, Any]]]
+        for symbol in symbols:
+            live_by_uri.setdefault(symbol['location']['uri'], []).append(symbol)
+        with self._lock:
+            for uri, live in live_by_uri.items():
+                live_names = set(_symbol_name(symbol) for symbol in live)
+                indexed = self._symbols_by_uri.get(uri, [])
+                kept = [symbol for symbol in indexed if _symbol_name(symbol) not in live_names]
+                self._symbols_by_uri[uri] = kept + live
+            if live_by_uri:
+                self._dirty = True
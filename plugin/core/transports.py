@@ -17,6 +17,9 @@ except ImportError:
 ContentLengthHeader = b"Content-Length: "
 ContentLengthHeader_len = len(ContentLengthHeader)
 TCP_CONNECT_TIMEOUT = 5
+# the first wait before retrying to connect to a server that is not listening yet, doubled after each attempt.
+TCP_CONNECT_RETRY_DELAY = 0.05
+TCP_CONNECT_MAX_RETRY_DELAY = 0.5
 
 try:
 	from typing import Any, Dict, Callable
@@ -81,12 +84,14 @@ def start_tcp_transport(port: int, host: 'Optional[str]' = None) -> 'Transport':
 	start_time = time.time()
 	debug('connecting to {}:{}'.format(host or "localhost", port))
 
+	delay = TCP_CONNECT_RETRY_DELAY
 	while time.time() - start_time < TCP_CONNECT_TIMEOUT:
 		try:
 			sock = socket.create_connection((host or "localhost", port))
 			return TCPTransport(sock)
 		except ConnectionRefusedError:
-			pass
+			time.sleep(delay)
+			delay = min(delay * 2, TCP_CONNECT_MAX_RETRY_DELAY)
 
 	# process.kill()
 	raise Exception("Timeout connecting to socket")
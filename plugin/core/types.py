@@ -1,4 +1,4 @@
-from .typing import Optional, List, Dict, Any, Iterator, Protocol
+from .typing import Optional, List, Dict, Any, Iterator, Protocol, Tuple
 
 
 class Settings(object):
@@ -24,6 +24,9 @@ class Settings(object):
         self.show_symbol_action_links = False
         self.complete_all_chars = False
         self.completion_hint_type = "auto"
+        self.completion_resolve_prefetch = 0
+        self.completion_deadline = 300
+        self.definition_prefetch = False
         self.show_references_in_quick_panel = False
         self.disabled_capabilities = []  # type: List[str]
         self.log_debug = True
@@ -31,6 +34,10 @@ class Settings(object):
         self.log_stderr = False
         self.log_payloads = False
         self.auto_restart = False
+        self.prewarm_sessions = False
+        self.prewarm_concurrency = 2
+        self.prewarm_idle_timeout = 300
+        self.share_sessions = False
         self.origin_encoding = "UTF-8"
 
 
@@ -62,7 +69,8 @@ class ClientConfig(object):
                  env: dict = dict(),
                  tcp_host: Optional[str] = None,
                  tcp_mode: Optional[str] = None,
-                 experimental_capabilities: dict = dict()) -> None:
+                 experimental_capabilities: dict = dict(),
+                 idle_timeout: int = 0) -> None:
         self.name = name
         self.binary_args = binary_args
         self.tcp_port = tcp_port
@@ -76,6 +84,7 @@ class ClientConfig(object):
         self.settings = settings
         self.env = env
         self.experimental_capabilities = experimental_capabilities
+        self.idle_timeout = idle_timeout
 
 
 def syntax_language(config: ClientConfig, syntax: str) -> Optional[LanguageConfig]:
@@ -90,6 +99,21 @@ def config_supports_syntax(config: ClientConfig, syntax: str) -> bool:
     return bool(syntax_language(config, syntax))
 
 
+def index_configs_by_syntax(configs: List[ClientConfig]) -> Dict[str, List[Tuple[ClientConfig, LanguageConfig]]]:
+    """
+    Map each syntax to the configs that support it, in the order of configs, together with the language of the
+    config the syntax belongs to.
+    """
+    index = {}  # type: Dict[str, List[Tuple[ClientConfig, LanguageConfig]]]
+    for config in configs:
+        for language in config.languages:
+            for syntax in language.syntaxes:
+                config_languages = index.setdefault(syntax, [])
+                if not any(indexed is config for indexed, _ in config_languages):
+                    config_languages.append((config, language))
+    return index
+
+
 class ViewLike(Protocol):
     def id(self) -> int:
         ...
@@ -124,6 +148,9 @@ class ViewLike(Protocol):
     def score_selector(self, region: Any, scope: str) -> int:
         ...
 
+    def scope_name(self, point: int) -> str:
+        ...
+
     def run_command(self, command_name: str, command_args: Dict[str, Any]) -> None:
         ...
 
@@ -172,6 +199,7 @@ class WindowLike(Protocol):
 class ConfigRegistry(Protocol):
     # todo: calls config_for_scope immediately.
     all = []  # type: List[ClientConfig]
+    generation = 0  # type: int
 
     def is_supported(self, view: ViewLike) -> bool:
         ...
@@ -191,6 +219,12 @@ class ConfigRegistry(Protocol):
     def update(self) -> None:
         ...
 
+    def add(self, config: ClientConfig) -> None:
+        ...
+
+    def remove(self, config: ClientConfig) -> None:
+        ...
+
     def disable_temporarily(self, config_name: str) -> None:
         ...
 
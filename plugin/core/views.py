@@ -1,28 +1,51 @@
 import sublime
-import linecache
+import mmap
+import os
 from .protocol import Point, Range, Notification, Request
-from .typing import Optional, Dict, Any
+from .typing import Dict, Any, Iterable
 from .url import filename_to_uri
 from .url import uri_to_filename
 
 
-def get_line(window: Optional[sublime.Window], file_name: str, row: int) -> str:
-    '''
-    Get the line from the buffer if the view is open, else get line from linecache.
-    row - is 0 based. If you want to get the first line, you should pass 0.
-    '''
-    if not window:
-        return ''
-
-    view = window.find_open_file(file_name)
-    if view:
-        # get from buffer
-        point = view.text_point(row, 0)
-        return view.substr(view.line(point)).strip()
-    else:
-        # get from linecache
-        # linecache row is not 0 based, so we increment it by 1 to get the correct line.
-        return linecache.getline(file_name, row + 1).strip()
+# files at least this large are scanned through a memory map instead of being read line by line.
+MMAP_THRESHOLD = 1024 * 1024
+
+
+def read_lines(file_name: str, rows: Iterable[int]) -> Dict[int, str]:
+    """
+    Read the given 0-based rows of a file on disk in a single pass, with surrounding whitespace stripped.
+    Rows past the end of the file, or of a file that can't be read, map to an empty string.
+    """
+    wanted = set(rows)
+    lines = dict((row, '') for row in wanted)
+    if not wanted:
+        return lines
+    last_row = max(wanted)
+    try:
+        with open(file_name, 'rb') as file:
+            if os.fstat(file.fileno()).st_size >= MMAP_THRESHOLD:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    start = 0
+                    for row in range(last_row + 1):
+                        end = mapped.find(b'\n', start)
+                        if row in wanted:
+                            lines[row] = _decode_line(mapped[start:end if end > -1 else len(mapped)])
+                        if end == -1:
+                            break
+                        start = end + 1
+            else:
+                for row, line in enumerate(file):
+                    if row in wanted:
+                        lines[row] = _decode_line(line)
+                    if row >= last_row:
+                        break
+    except (OSError, ValueError):
+        pass
+    return lines
+
+
+def _decode_line(line: bytes) -> str:
+    return line.decode('utf-8', 'replace').strip()
 
 
 def point_to_offset(point: Point, view: sublime.View) -> int:
@@ -1,7 +1,9 @@
+from .cache import LRUCache
 from .diagnostics import DiagnosticsStorage
 from .edit import parse_workspace_edit
 from .logging import debug
 from .message_request_handler import MessageRequestHandler
+from .prewarm import find_files_by_extension, syntax_file_extensions
 from .protocol import Notification, Response
 from .rpc import Client, SublimeLogger
 from .sessions import Session
@@ -14,16 +16,30 @@ from .types import LanguageConfig
 from .types import Settings
 from .types import ViewLike
 from .types import WindowLike
-from .typing import Optional, List, Callable, Dict, Any, Protocol, Set
+from .typing import Optional, List, Callable, Dict, Any, Protocol, Set, Tuple
+from .url import uri_to_filename
 from .views import did_change, did_close, did_open, did_save, will_save
 from .workspace import disable_in_project
 from .workspace import enable_in_project
 from .workspace import get_workspace_folders
 from .workspace import ProjectFolders
-from .workspace import sorted_workspace_folders
 from weakref import WeakValueDictionary
 from weakref import ref
+import itertools
+import os
 import threading
+import time
+
+
+# client-initiated progress tokens, unique across windows.
+_progress_tokens = itertools.count(1)
+
+# the sessions of the configs that apply to a view, by (window, file, syntax, scope name at point, lsp_language).
+# Entries hold the generation of the window's configs they were routed with, so they go stale once those change.
+session_routes = LRUCache("session routing", 256)
+
+# the file extensions claimed by each syntax resource, see syntax_file_extensions.
+_syntax_extensions = {}  # type: Dict[str, List[str]]
 
 
 class SublimeLike(Protocol):
@@ -154,11 +170,10 @@ class WindowDocumentHandler(object):
                 if view:
                     syntax = view.settings().get("syntax")
                     if config_supports_syntax(session.config, syntax):
-                        sessions = self._get_applicable_sessions(view)
-                        self._attach_view(view, sessions)
-                        for session in sessions:
-                            if session.should_notify_did_open():
-                                self._notify_did_open(view, session)
+                        self._attach_view(view, self._get_applicable_sessions(view))
+                        # the other sessions of the view already have it open.
+                        if session.should_notify_did_open():
+                            self._notify_did_open(view, session)
 
     def _is_supported_view(self, view: ViewLike) -> bool:
         return self._configs.syntax_supported(view)
@@ -281,6 +296,78 @@ class WindowDocumentHandler(object):
                         session.client.send_notification(notification)
 
 
+class SharedSession(object):
+    """ A session of the session pool, with the windows that use it in the order they attached. """
+
+    def __init__(self, key: Tuple[str, str]) -> None:
+        self.key = key
+        self.session = None  # type: Optional[Session]
+        self.managers = []  # type: List[WindowManager]
+        # the window that released the session last, it handles its exit.
+        self.last_manager = None  # type: Optional[WindowManager]
+
+
+class SessionPool(object):
+    """
+    Sessions shared by all windows, by config name and resolved workspace root, see the share_sessions setting.
+    Windows attach to the session of their root and release it when they are done with it, the last window to
+    release a session ends it.
+    """
+
+    def __init__(self) -> None:
+        self._shared = {}  # type: Dict[Tuple[str, str], SharedSession]
+        self._lock = threading.Lock()
+
+    def acquire(self, config_name: str, root: str, manager: 'WindowManager') -> Tuple[SharedSession, bool]:
+        """ Attach manager to the shared session of root, returns it and whether it still has to be started. """
+        key = (config_name, os.path.normcase(os.path.realpath(root)))
+        with self._lock:
+            shared = self._shared.get(key)
+            if shared is None or shared.session is None or shared.session.state == ClientStates.STOPPING:
+                shared = SharedSession(key)
+                self._shared[key] = shared
+                created = True
+            else:
+                created = False
+            if manager not in shared.managers:
+                shared.managers.append(manager)
+            return shared, created
+
+    def find(self, session: Session) -> Optional[SharedSession]:
+        with self._lock:
+            return next((shared for shared in self._shared.values() if shared.session is session), None)
+
+    def release(self, session: Session, manager: 'WindowManager') -> bool:
+        """ Detach manager from session, returns whether no window uses the session anymore. """
+        with self._lock:
+            shared = next((shared for shared in self._shared.values() if shared.session is session), None)
+            if not shared:
+                return True
+            if manager in shared.managers:
+                shared.managers.remove(manager)
+            if shared.managers:
+                return False
+            shared.last_manager = manager
+            del self._shared[shared.key]
+            return True
+
+    def discard(self, shared: SharedSession) -> None:
+        with self._lock:
+            if self._shared.get(shared.key) is shared:
+                del self._shared[shared.key]
+
+
+session_pool = SessionPool()
+
+
+# a server that crashes more often than this within CRASH_LOOP_PERIOD seconds is not restarted automatically.
+CRASH_LOOP_LIMIT = 5
+CRASH_LOOP_PERIOD = 180
+# seconds before restarting a crashed server, doubled for each recent crash.
+RESTART_DELAY = 1
+RESTART_MAX_DELAY = 30
+
+
 def extract_message(params: Any) -> str:
     return params.get("message", "???") if isinstance(params, dict) else "???"
 
@@ -333,20 +420,65 @@ class WindowManager(object):
         self._workspace.on_changed = on_changed
         self._workspace.on_switched = on_switched
         self._progress = dict()  # type: Dict[Any, Any]
+        self._partial_results = dict()  # type: Dict[str, Callable[[Any], None]]
+        # configs waiting to be prewarmed, with a project file they apply to.
+        self._prewarm_queue = []  # type: List[Tuple[ClientConfig, str]]
+        # prewarmed sessions that no view has used yet.
+        self._prewarmed_sessions = []  # type: List[Session]
+        # configs whose idle session was stopped, they start again when one of their views needs them.
+        self._hibernated = {}  # type: Dict[str, ClientConfig]
+        # recent crash times by config name, see _handle_server_crash.
+        self._crashes = {}  # type: Dict[str, List[float]]
 
     def _on_project_changed(self, folders: List[str]) -> None:
         workspace_folders = get_workspace_folders(self._workspace.folders)
         for config_name in self._sessions:
             for session in self._sessions[config_name]:
                 session.update_folders(workspace_folders)
+        self._invalidate_session_routes()
+        self.prewarm_sessions()
 
     def _on_project_switched(self, folders: List[str]) -> None:
         debug('project switched - ending all sessions')
         self.end_sessions()
+        self.prewarm_sessions()
 
     def get_session(self, config_name: str, file_path: str) -> Optional[Session]:
         return self._find_session(config_name, file_path)
 
+    def sessions_for_view(self, view: ViewLike, point: Optional[int] = None) -> List[Session]:
+        """
+        The sessions of the configs that apply to the view at point, most specific scope first, in any state.
+        The configs only depend on the scopes at point, so routes are shared by all points with the same scope name.
+        """
+        file_path = view.file_name()
+        if not file_path:
+            return []
+        if point is None:
+            sel = view.sel()
+            if len(sel) > 0:
+                point = sel[0].begin()
+        settings = view.settings()
+        languages = settings.get('lsp_language', None)
+        key = (self._window.id(), file_path, settings.get('syntax'),
+               view.scope_name(point) if point is not None else None,
+               tuple(languages) if languages is not None else None)
+        generation = self._configs.generation
+        route = session_routes.get(key)  # type: Optional[Tuple[int, List[Session]]]
+        if route and route[0] == generation:
+            return route[1]
+        sessions = []  # type: List[Session]
+        for config in self._configs.scope_configs(view, point):
+            session = self._find_session(config.name, file_path)
+            if session:
+                sessions.append(session)
+        session_routes.set(key, (generation, sessions))
+        return sessions
+
+    def _invalidate_session_routes(self) -> None:
+        window_id = self._window.id()
+        session_routes.discard_matching(lambda key: key[0] == window_id)
+
     def _is_session_ready(self, config_name: str, file_path: str) -> bool:
         maybe_session = self._find_session(config_name, file_path)
         return maybe_session is not None and maybe_session.state == ClientStates.READY
@@ -383,12 +515,27 @@ class WindowManager(object):
                 self._workspace.update()
                 self._initialize_on_open(view)
                 self.documents.handle_did_open(view)
+        self.prewarm_sessions()
 
     def activate_view(self, view: ViewLike) -> None:
         file_name = view.file_name() or ""
         if not self.documents.has_document_state(file_name):
             self._workspace.update()
             self._initialize_on_open(view)
+        else:
+            self.wake_hibernated(view)
+
+    def wake_hibernated(self, view: ViewLike) -> None:
+        """ Restart the stopped idle sessions the view needs, the view will be served once they are ready. """
+        if not self._hibernated or not self._workspace.includes_path(view.file_name() or ""):
+            return
+        syntax = view.settings().get("syntax")
+        waking = [name for name, config in self._hibernated.items() if config_supports_syntax(config, syntax)]
+        if waking:
+            for name in waking:
+                del self._hibernated[name]
+            self._update_idle_status()
+            self._initialize_on_open(view)
 
     def _open_after_initialize(self, view: ViewLike) -> None:
         if any(v for v in self._next_initialize_views if v.id() == view.id()):
@@ -416,6 +563,9 @@ class WindowManager(object):
                 else:
                     session = next((s for s in self._sessions[c.name] if s.handles_path(file_path)), None)
                     if session:
+                        if session in self._prewarmed_sessions:
+                            debug('prewarmed session {} used by {}'.format(c.name, file_path))
+                            self._prewarmed_sessions.remove(session)
                         if session.state != ClientStates.READY:
                             debug('scheduling for delayed open, session {} not ready: {}'.format(c.name, file_path))
                             self._open_after_initialize(view)
@@ -448,34 +598,261 @@ class WindowManager(object):
             debug('Already starting on this window:', config.name)
             return
 
+        workspace_folders = self._workspace.sorted_workspace_folders(file_path)
+        shared = None  # type: Optional[SharedSession]
+        if self._settings.share_sessions and workspace_folders:
+            shared, created = session_pool.acquire(config.name, workspace_folders[0].path, self)
+            if not created and shared.session:
+                self._attach_shared_session(shared.session)
+                return
+
         if not self._handlers.on_start(config.name, self._window):
+            if shared:
+                session_pool.discard(shared)
             return
 
         self._window.status_message("Starting " + config.name + "...")
         session = None  # type: Optional[Session]
-        workspace_folders = sorted_workspace_folders(self._workspace.folders, file_path)
+        on_pre_initialize = self._handle_pre_initialize  # type: Callable[[Session], None]
+        on_post_exit = self._handle_post_exit  # type: Callable[[str], None]
+        if shared:
+            on_pre_initialize, on_post_exit = self._shared_session_handlers(shared)
         try:
             session = self._start_session(
                 self._window,                  # window
                 workspace_folders,             # workspace_folders
                 config,                        # config
-                self._handle_pre_initialize,   # on_pre_initialize
+                on_pre_initialize,             # on_pre_initialize
                 self._handle_post_initialize,  # on_post_initialize
-                self._handle_post_exit,        # on_post_exit
-                lambda msg: self._handle_stderr_log(config.name, msg))  # on_stderr_log
+                on_post_exit,                  # on_post_exit
+                lambda msg: self._handle_stderr_log(config.name, msg),  # on_stderr_log
+                self._handle_start_failure)    # on_start_failed
         except Exception as e:
-            message = "\n\n".join([
-                "Could not start {}",
-                "{}",
-                "Server will be disabled for this window"
-            ]).format(config.name, str(e))
-
-            self._configs.disable_temporarily(config.name)
-            self._sublime.message_dialog(message)
+            self._show_start_failure(config, str(e))
 
         if session:
+            if shared:
+                # known to the pool while the server is still connecting.
+                shared.session = session
             debug("window {} added session {}".format(self._window.id(), config.name))
             self._sessions.setdefault(config.name, []).append(session)
+            self._invalidate_session_routes()
+            if self._hibernated.pop(config.name, None):
+                self._update_idle_status()
+        elif shared:
+            session_pool.discard(shared)
+
+    def _handle_start_failure(self, session: Session, error: str) -> None:
+        # called on the startup thread of the session.
+        self._sublime.set_timeout(lambda: self._end_failed_session(session, error), 0)
+
+    def _end_failed_session(self, session: Session, error: str) -> None:
+        managers = self._session_managers(session)
+        shared = session_pool.find(session)
+        if shared:
+            session_pool.discard(shared)
+            shared.last_manager = self
+        for manager in managers:
+            with manager._initialization_lock:
+                manager._remove_session(session)
+            if manager is not self:
+                manager._handle_post_exit(session.config.name)
+        self._show_start_failure(session.config, error)
+
+    def _show_start_failure(self, config: ClientConfig, error: str) -> None:
+        message = "\n\n".join([
+            "Could not start {}",
+            "{}",
+            "Server will be disabled for this window"
+        ]).format(config.name, error)
+
+        self._configs.disable_temporarily(config.name)
+        self._sublime.message_dialog(message)
+
+    def _remove_session(self, session: Session) -> bool:
+        """ Forget the session, returns whether this window had it. """
+        config_sessions = self._sessions.get(session.config.name, [])
+        if session not in config_sessions:
+            return False
+        config_sessions.remove(session)
+        if not config_sessions:
+            del self._sessions[session.config.name]
+        self._invalidate_session_routes()
+        return True
+
+    def _shared_session_handlers(
+            self, shared: SharedSession) -> Tuple[Callable[[Session], None], Callable[[str], None]]:
+
+        def on_pre_initialize(session: Session) -> None:
+            # known to the pool before the initialize response can arrive.
+            shared.session = session
+            self._handle_pre_initialize(session)
+            if session.client:
+                session.client.set_crash_handler(lambda: self._handle_shared_session_crash(shared))
+
+        def on_post_exit(config_name: str) -> None:
+            manager = shared.last_manager or self
+            manager._handle_post_exit(config_name)
+
+        return on_pre_initialize, on_post_exit
+
+    def _attach_shared_session(self, session: Session) -> None:
+        debug("window {} attached to shared session {}".format(self._window.id(), session.config.name))
+        self._sessions.setdefault(session.config.name, []).append(session)
+        self._invalidate_session_routes()
+        if self._hibernated.pop(session.config.name, None):
+            self._update_idle_status()
+        if session.state == ClientStates.READY:
+            self._attach_session(session)
+
+    def _release_session(self, session: Session) -> None:
+        """ End the session, unless it is shared with windows that still use it. """
+        if session_pool.release(session, self):
+            debug("unloading session", session.config.name)
+            session.end()
+        else:
+            debug("window {} detached from shared session {}".format(self._window.id(), session.config.name))
+            self._handle_post_exit(session.config.name)
+
+    def _session_managers(self, session: Session) -> 'List[WindowManager]':
+        shared = session_pool.find(session)
+        return list(shared.managers) if shared and shared.managers else [self]
+
+    def _document_managers(self, session: Session, uri: str) -> 'List[WindowManager]':
+        """ The windows of a session whose project contains the document, or else the first window. """
+        managers = self._session_managers(session)
+        if len(managers) > 1:
+            file_path = uri_to_filename(uri)
+            owners = [manager for manager in managers if manager._workspace.includes_path(file_path)]
+            return owners or managers[:1]
+        return managers
+
+    def _handle_shared_session_crash(self, shared: SharedSession) -> None:
+        session_pool.discard(shared)
+        managers = list(shared.managers) or [self]
+        shared.managers = []
+        shared.last_manager = managers[0]
+        session = shared.session
+        if session:
+            for manager in managers[1:]:
+                manager._remove_session(session)
+                manager._handle_post_exit(session.config.name)
+            managers[0]._handle_server_crash(session)
+
+    def prewarm_sessions(self) -> None:
+        """
+        Start the sessions a project is likely to need before any of its files is opened, when the prewarm_sessions
+        setting is on. Projects are scanned for files with the extensions of the syntaxes of enabled configs.
+        """
+        if self._settings.prewarm_sessions and self._workspace.folders and not self._is_closing:
+            self._sublime.set_timeout_async(self._scan_for_prewarm, 0)
+
+    def _scan_for_prewarm(self) -> None:
+        extensions_by_config = {}  # type: Dict[str, Set[str]]
+        for config in self._configs.all:
+            if config.enabled and config.name not in self._sessions:
+                extensions = set()  # type: Set[str]
+                for language in config.languages:
+                    for syntax in language.syntaxes:
+                        extensions.update(self._syntax_extensions(syntax))
+                if extensions:
+                    extensions_by_config[config.name] = extensions
+        if not extensions_by_config:
+            return
+        all_extensions = set()  # type: Set[str]
+        for extensions in extensions_by_config.values():
+            all_extensions.update(extensions)
+        files = find_files_by_extension(list(self._workspace.folders), all_extensions)
+        queue = []  # type: List[Tuple[ClientConfig, str]]
+        for config in self._configs.all:
+            extensions = extensions_by_config.get(config.name, set())
+            file_path = next((files[extension] for extension in sorted(extensions) if extension in files), None)
+            if file_path:
+                queue.append((config, file_path))
+        debug('window {} prewarming'.format(self._window.id()), [config.name for config, _ in queue])
+        self._prewarm_queue = queue
+        self._start_prewarms()
+
+    def _syntax_extensions(self, syntax: str) -> List[str]:
+        extensions = _syntax_extensions.get(syntax)
+        if extensions is None:
+            try:
+                extensions = syntax_file_extensions(syntax, self._sublime.load_resource(syntax))
+            except Exception as ex:
+                debug('could not read syntax', syntax, ex)
+                extensions = []
+            _syntax_extensions[syntax] = extensions
+        return extensions
+
+    def _start_prewarms(self) -> None:
+        """ Start queued prewarms while fewer than prewarm_concurrency prewarmed sessions are starting. """
+        with self._initialization_lock:
+            while self._prewarm_queue:
+                starting = sum(1 for s in self._prewarmed_sessions if s.state == ClientStates.STARTING)
+                if starting >= self._settings.prewarm_concurrency:
+                    return
+                config, file_path = self._prewarm_queue.pop(0)
+                if self._is_closing or not self._can_start_config(config.name, file_path):
+                    continue
+                self._start_client(config, file_path)
+                session = self._find_session(config.name, file_path)
+                if session:
+                    self._prewarmed_sessions.append(session)
+                    self._sublime.set_timeout_async(lambda session=session: self._end_idle_prewarm(session),
+                                                    self._settings.prewarm_idle_timeout * 1000)
+
+    def _end_idle_prewarm(self, session: Session) -> None:
+        if session not in self._prewarmed_sessions:
+            return
+        self._prewarmed_sessions.remove(session)
+        if self._remove_session(session):
+            debug('ending unused prewarmed session', session.config.name)
+            self._release_session(session)
+
+    def _schedule_idle_check(self, session: Session, delay: float) -> None:
+        self._sublime.set_timeout_async(lambda: self._check_idle(session), int(delay * 1000))
+
+    def _check_idle(self, session: Session) -> None:
+        """ Stop the session once it went idle_timeout seconds without requests while none of its views is open. """
+        config = session.config
+        if self._is_closing or session.state != ClientStates.READY:
+            return
+        if session not in self._sessions.get(config.name, []) or not session.client:
+            return
+        remaining = config.idle_timeout - (time.time() - session.client.last_activity)
+        if remaining > 0:
+            self._schedule_idle_check(session, remaining)
+        elif self._has_open_views(session):
+            self._schedule_idle_check(session, config.idle_timeout)
+        else:
+            self._hibernate(session)
+
+    def _open_views(self, session: Session) -> List[ViewLike]:
+        views = []  # type: List[ViewLike]
+        for view in self._window.views():
+            file_name = view.file_name()
+            if file_name and session.handles_path(file_name) and \
+                    config_supports_syntax(session.config, view.settings().get("syntax")):
+                views.append(view)
+        return views
+
+    def _has_open_views(self, session: Session) -> bool:
+        return bool(self._open_views(session))
+
+    def _hibernate(self, session: Session) -> None:
+        config = session.config
+        debug('stopping idle session', config.name)
+        self._remove_session(session)
+        self._hibernated[config.name] = config
+        self._window.status_message("{} stopped while idle, it starts again when needed".format(config.name))
+        self._update_idle_status()
+        self._release_session(session)
+
+    def _update_idle_status(self) -> None:
+        for view in self._window.views():
+            syntax = view.settings().get("syntax")
+            names = sorted(name for name, config in self._hibernated.items() if config_supports_syntax(config, syntax))
+            view.set_status("lsp_idle", "{} (idle)".format(", ".join(names)) if names else "")
 
     def _handle_message_request(self, params: dict, source: str, client: Client, request_id: Any) -> None:
         handler = MessageRequestHandler(self._window.active_view(), client, request_id, params, source)  # type: ignore
@@ -487,22 +864,22 @@ class WindowManager(object):
 
     def end_sessions(self) -> None:
         self.documents.reset()
+        self._prewarm_queue = []
+        self._prewarmed_sessions = []
+        if self._hibernated:
+            self._hibernated = {}
+            self._update_idle_status()
         for config_name in list(self._sessions):
             self.end_config_sessions(config_name)
 
     def end_config_sessions(self, config_name: str) -> None:
         config_sessions = self._sessions.pop(config_name, [])
+        self._invalidate_session_routes()
         for session in config_sessions:
-            debug("unloading session", config_name)
-            session.end()
+            self._release_session(session)
 
     def get_project_path(self, file_path: str) -> Optional[str]:
-        candidate = None  # type: Optional[str]
-        for folder in self._workspace.folders:
-            if file_path.startswith(folder):
-                if candidate is None or len(folder) > len(candidate):
-                    candidate = folder
-        return candidate
+        return self._workspace.project_path(file_path)
 
     def _apply_workspace_edit(self, params: Dict[str, Any], client: Client, request_id: int) -> None:
         edit = params.get('edit', dict())
@@ -519,7 +896,9 @@ class WindowManager(object):
 
     def _handle_pre_initialize(self, session: Session) -> None:
         client = session.client
-        client.set_crash_handler(lambda: self._handle_server_crash(session.config))
+        if not client:
+            return
+        client.set_crash_handler(lambda: self._handle_server_crash(session))
         client.set_error_display_handler(self._window.status_message)
 
         if self.server_panel_factory and isinstance(client.logger, SublimeLogger):
@@ -539,34 +918,59 @@ class WindowManager(object):
             lambda params: self._handle_log_message(session.config.name, params))
 
     def _handle_post_initialize(self, session: Session) -> None:
+        client = session.client
+        if not client:
+            return
 
         # handle server requests and notifications
+        # a shared session routes these to the windows attached to it.
         session.on_request(
             "workspace/applyEdit",
-            lambda params, request_id: self._apply_workspace_edit(params, session.client, request_id))
+            lambda params, request_id: self._session_managers(session)[0]._apply_workspace_edit(
+                params, client, request_id))
 
         session.on_request(
             "window/workDoneProgress/create",
-            lambda params, request_id: self._receive_progress_token(params, session.client, request_id))
+            lambda params, request_id: self._receive_progress_token(session, params, request_id))
 
         session.on_notification(
             "textDocument/publishDiagnostics",
-            lambda params: self.diagnostics.receive(session.config.name, params))
+            lambda params: self._receive_diagnostics(session, params))
 
         session.on_notification(
             "$/progress",
-            lambda params: self._handle_progress_notification(params))
+            lambda params: self._receive_progress_notification(session, params))
 
-        self._handlers.on_initialized(session.config.name, self._window, session.client)
+        self._handlers.on_initialized(session.config.name, self._window, client)
 
-        session.client.send_notification(Notification.initialized())
+        client.send_notification(Notification.initialized())
         if session.config.settings:
-            session.client.send_notification(Notification.didChangeConfiguration({'settings': session.config.settings}))
+            client.send_notification(Notification.didChangeConfiguration({'settings': session.config.settings}))
+        for manager in self._session_managers(session):
+            manager._attach_session(session)
+
+    def _attach_session(self, session: Session) -> None:
+        """ Start using a ready session in this window. """
         if session.has_capability("textDocumentSync"):
             self.documents.add_session(session)
         self._window.status_message("{} initialized".format(session.config.name))
 
         self._open_pending_views()
+        if session.config.idle_timeout > 0:
+            self._schedule_idle_check(session, session.config.idle_timeout)
+        if self._prewarm_queue:
+            self._sublime.set_timeout_async(self._start_prewarms, 0)
+
+    def _receive_diagnostics(self, session: Session, params: Dict[str, Any]) -> None:
+        for manager in self._document_managers(session, params.get('uri', '')):
+            manager.diagnostics.receive(session.config.name, params)
+
+    def _receive_progress_notification(self, session: Session, params: Dict[str, Any]) -> None:
+        token = params['token']
+        managers = self._session_managers(session)
+        owners = [manager for manager in managers if token in manager._progress or token in manager._partial_results]
+        for manager in owners or managers[:1]:
+            manager._handle_progress_notification(params)
 
     def handle_view_closed(self, view: ViewLike) -> None:
         if view.file_name():
@@ -582,12 +986,37 @@ class WindowManager(object):
         if not self._is_closing and not self._window.is_valid():
             self._handle_window_closed()
 
-    def _receive_progress_token(self, params: Dict[str, Any], client: Client, request_id: Any) -> None:
-        self._progress[params['token']] = dict()
-        client.send_response(Response(request_id, None))
+    def _receive_progress_token(self, session: Session, params: Dict[str, Any], request_id: Any) -> None:
+        for manager in self._session_managers(session):
+            manager._progress[params['token']] = dict()
+        if session.client:
+            session.client.send_response(Response(request_id, None))
+
+    def create_partial_result_token(self, on_partial_result: Callable[[Any], None]) -> str:
+        """
+        Returns a partialResultToken for a request. on_partial_result receives each batch of results the server
+        streams before its response, until discard_progress_token is called with the token.
+        """
+        token = "lsp-partial-{}".format(next(_progress_tokens))
+        self._partial_results[token] = on_partial_result
+        return token
+
+    def create_work_done_token(self) -> str:
+        """ Returns a workDoneToken for a request, its progress is shown in the status bar. """
+        token = "lsp-work-done-{}".format(next(_progress_tokens))
+        self._progress[token] = dict()
+        return token
+
+    def discard_progress_token(self, token: str) -> None:
+        self._partial_results.pop(token, None)
+        self._progress.pop(token, None)
 
     def _handle_progress_notification(self, params: Dict[str, Any]) -> None:
         token = params['token']
+        on_partial_result = self._partial_results.get(token)
+        if on_partial_result:
+            on_partial_result(params['value'])
+            return
         if token not in self._progress:
             debug('unknown $/progress token: {}'.format(token))
             return
@@ -640,14 +1069,43 @@ class WindowManager(object):
         if not self._sessions:
             self._handle_all_sessions_ended()
 
-    def _handle_server_crash(self, config: ClientConfig) -> None:
-        msg = "Language server {} has crashed, do you want to restart it?".format(config.name)
+    def _handle_server_crash(self, session: Session) -> None:
+        """
+        Restart the crashed server only, leaving the other sessions of the window alone. With auto_restart, the
+        restart waits longer after each recent crash, and a server that keeps crashing is given up on.
+        """
+        config = session.config
+        if self._is_closing or not self._remove_session(session):
+            return
+        # the client has no transport anymore, ending the session only runs its exit handlers.
+        session.end()
         if self._settings.auto_restart is True:
-            self.restart_sessions()
+            now = time.time()
+            crashes = [t for t in self._crashes.get(config.name, []) if now - t < CRASH_LOOP_PERIOD] + [now]
+            self._crashes[config.name] = crashes
+            if len(crashes) > CRASH_LOOP_LIMIT:
+                self._sublime.message_dialog(
+                    "Language server {} crashed {} times within {} seconds and will not be restarted.".format(
+                        config.name, len(crashes), CRASH_LOOP_PERIOD))
+                return
+            delay = min(RESTART_DELAY * 2 ** (len(crashes) - 1), RESTART_MAX_DELAY)
+            debug('restarting crashed session {} in {}s'.format(config.name, delay))
+            self._window.status_message("{} crashed, restarting in {}s".format(config.name, delay))
+            self._sublime.set_timeout_async(lambda: self._restart_crashed_session(session), delay * 1000)
         else:
+            msg = "Language server {} has crashed, do you want to restart it?".format(config.name)
             result = self._sublime.ok_cancel_dialog(msg, ok_title="Restart")
             if result == self._sublime.DIALOG_YES:
-                self.restart_sessions()
+                self._restart_crashed_session(session)
+
+    def _restart_crashed_session(self, session: Session) -> None:
+        # the documents of the window are kept, the new session re-opens those it handles once it is ready.
+        views = self._open_views(session)
+        if self._is_closing or not views:
+            return
+        file_path = views[0].file_name() or ""
+        with self._initialization_lock:
+            self._start_client(session.config, file_path)
 
     def _handle_server_message(self, name: str, message: str) -> None:
         if not self.server_panel_factory:
@@ -1,12 +1,52 @@
 from .logging import debug
 from .protocol import WorkspaceFolder
 from .types import WindowLike
-from .typing import List, Optional, Any, Callable
+from .typing import List, Optional, Any, Callable, Dict, Iterable, Tuple
+import re
+
+# the key under which a trie node stores its folder, never a path component.
+_FOLDER = ''
+
+
+def path_components(path: str) -> Tuple[str, ...]:
+    """ Case insensitive, file paths are not normalized when converted from uri, so both separators are accepted """
+    return tuple(component for component in re.split(r'[\\/]+', path.lower()) if component)
 
 
 def is_subpath_of(file_path: str, potential_subpath: str) -> bool:
-    """ Case insensitive, file paths are not normalized when converted from uri"""
-    return file_path.lower().startswith(potential_subpath.lower())
+    folder_components = path_components(potential_subpath)
+    return path_components(file_path)[:len(folder_components)] == folder_components
+
+
+class FolderTrie(object):
+    """ Maps file paths to the folders that contain them, walking one path component at a time. """
+
+    def __init__(self, folders: Iterable[str]) -> None:
+        self._root = {}  # type: Dict[str, Any]
+        for folder in folders:
+            node = self._root
+            for component in path_components(folder):
+                node = node.setdefault(component, {})
+            node.setdefault(_FOLDER, folder)
+
+    def containing_folders(self, file_path: str) -> List[str]:
+        """ The folders that contain file_path, nearest first. """
+        folders = []  # type: List[str]
+        node = self._root  # type: Optional[Dict[str, Any]]
+        for component in path_components(file_path):
+            if node is None:
+                break
+            if _FOLDER in node:
+                folders.append(node[_FOLDER])
+            node = node.get(component)
+        if node is not None and _FOLDER in node:
+            folders.append(node[_FOLDER])
+        folders.reverse()
+        return folders
+
+    def nearest_folder(self, file_path: str) -> Optional[str]:
+        folders = self.containing_folders(file_path)
+        return folders[0] if folders else None
 
 
 class ProjectFolders(object):
@@ -16,6 +56,7 @@ class ProjectFolders(object):
         self.on_changed = None  # type: Optional[Callable[[List[str]], None]]
         self.on_switched = None  # type: Optional[Callable[[List[str]], None]]
         self.folders = []  # type: List[str]
+        self._trie = FolderTrie([])
         self._current_project_file_name = self._window.project_file_name()
         self._set_folders(window.folders())
 
@@ -33,12 +74,20 @@ class ProjectFolders(object):
 
     def includes_path(self, file_path: str) -> bool:
         if self.folders:
-            return any(is_subpath_of(file_path, folder) for folder in self.folders)
+            return self._trie.nearest_folder(file_path) is not None
         else:
             return True
 
+    def project_path(self, file_path: str) -> Optional[str]:
+        """ The nearest folder of the project that contains file_path. """
+        return self._trie.nearest_folder(file_path)
+
+    def sorted_workspace_folders(self, file_path: str) -> List[WorkspaceFolder]:
+        return _sort_workspace_folders(self.folders, self._trie, file_path)
+
     def _set_folders(self, folders: List[str]) -> None:
         self.folders = folders
+        self._trie = FolderTrie(folders)
 
     def _can_update_to(self, new_folders: List[str]) -> bool:
         """ Should detect difference between a project switch and a change to folders in the loaded project """
@@ -60,19 +109,13 @@ def get_workspace_folders(folders: List[str]) -> List[WorkspaceFolder]:
 
 
 def sorted_workspace_folders(folders: List[str], file_path: str) -> List[WorkspaceFolder]:
-    matching_paths = []  # type: List[str]
-    other_paths = []  # type: List[str]
-
-    for folder in folders:
-        is_subpath = is_subpath_of(file_path, folder)
-        if is_subpath:
-            if matching_paths and len(folder) > len(matching_paths[0]):
-                matching_paths.insert(0, folder)
-            else:
-                matching_paths.append(folder)
-        else:
-            other_paths.append(folder)
+    return _sort_workspace_folders(folders, FolderTrie(folders), file_path)
+
 
+def _sort_workspace_folders(folders: List[str], trie: FolderTrie, file_path: str) -> List[WorkspaceFolder]:
+    """ The folders that contain file_path, nearest first, followed by the others in their original order. """
+    matching_paths = trie.containing_folders(file_path)
+    other_paths = [folder for folder in folders if folder not in matching_paths]
     return [WorkspaceFolder.from_path(path) for path in matching_paths + other_paths]
 
 
@@ -1,5 +1,4 @@
 import sublime
-from .core.configurations import is_supported_syntax
 from .core.edit import parse_text_edit
 from .core.registry import LspTextCommand, LSPViewEventListener, session_for_view, client_from_session
 from .core.registry import sessions_for_view
@@ -22,7 +21,7 @@ class FormatOnSaveListener(LSPViewEventListener):
     def is_applicable(cls, view_settings: dict) -> bool:
         syntax = view_settings.get('syntax')
         if syntax:
-            return is_supported_syntax(syntax, client_configs.all)
+            return client_configs.is_syntax_supported(syntax)
         return False
 
     def on_pre_save(self) -> None:
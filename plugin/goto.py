@@ -1,10 +1,14 @@
 import sublime
 from Default.history_list import get_jump_history_for_view
-from .core.documents import get_position, is_at_word
+from .core.cache import LRUCache
+from .core.documents import get_position, is_at_word, position_is_word
 from .core.logging import debug
 from .core.protocol import Request
-from .core.registry import LspTextCommand
-from .core.typing import List, Optional, Any
+from .core.registry import LspTextCommand, LSPViewEventListener, client_from_session, session_for_view
+from .core.registry import session_for_view_or_starting
+from .core.rpc import Client
+from .core.settings import settings
+from .core.typing import Callable, Dict, List, Optional, Any, Tuple
 from .core.views import location_to_encoded_filename
 from .core.views import text_document_position_params
 
@@ -33,6 +37,88 @@ def highlight_entry(window: Optional[sublime.Window], locations: List[str], idx:
     window.open_file(locations[idx], group=window.active_group(), flags=sublime.TRANSIENT | sublime.ENCODED_POSITION)
 
 
+# definition responses by (buffer, change count, word region), wrapped in a tuple as they may be None.
+definition_cache = LRUCache("definition", 32)
+# prefetches in flight by the same key, with the goto commands that wait for them.
+_prefetches = {}  # type: Dict[Tuple, Tuple[Client, int, List[Callable[[Any], None]]]]
+DEFINITION_PREFETCH_DELAY = 500
+
+
+def definition_key(view: sublime.View, point: int) -> Tuple:
+    word = view.word(point)
+    return (view.buffer_id(), view.change_count(), word.begin(), word.end())
+
+
+def prefetch_definition(view: sublime.View, point: int) -> None:
+    if not settings.definition_prefetch or not position_is_word(view, point):
+        return
+    key = definition_key(view, point)
+    if key in definition_cache or key in _prefetches:
+        return
+    client = client_from_session(session_for_view(view, 'definitionProvider', point))
+    if client:
+        request_id = client.send_request(
+            Request.definition(text_document_position_params(view, point)),
+            lambda response: _handle_prefetched_definition(key, response),
+            lambda error: _handle_prefetch_error(key))
+        if request_id is not None and key not in definition_cache:
+            _prefetches[key] = (client, request_id, [])
+
+
+def _handle_prefetched_definition(key: Tuple, response: Any) -> None:
+    definition_cache.set(key, (response,))
+    prefetch = _prefetches.pop(key, None)
+    if prefetch:
+        for callback in prefetch[2]:
+            callback(response)
+
+
+def _handle_prefetch_error(key: Tuple) -> None:
+    # the waiting goto commands fall back to the built-in goto definition, as for an empty response.
+    prefetch = _prefetches.pop(key, None)
+    if prefetch:
+        for callback in prefetch[2]:
+            callback(None)
+
+
+def cancel_definition_prefetches(view: sublime.View) -> None:
+    """ Cancel the prefetches for a view that no goto command is waiting for. """
+    buffer_id = view.buffer_id()
+    for key, prefetch in list(_prefetches.items()):
+        client, request_id, callbacks = prefetch
+        if key[0] == buffer_id and not callbacks:
+            del _prefetches[key]
+            client.cancel_request(request_id)
+
+
+class DefinitionPrefetchListener(LSPViewEventListener):
+    """ Prefetches the definition of the word the caret rests on, see the definition_prefetch setting. """
+
+    def __init__(self, view: sublime.View) -> None:
+        super().__init__(view)
+        self._stored_point = -1
+
+    @classmethod
+    def is_applicable(cls, view_settings: dict) -> bool:
+        return settings.definition_prefetch and cls.has_supported_syntax(view_settings)
+
+    def on_selection_modified_async(self) -> None:
+        sel = self.view.sel()
+        if len(sel) != 1:
+            return
+        point = sel[0].begin()
+        if point != self._stored_point:
+            self._stored_point = point
+            sublime.set_timeout_async(lambda: self._prefetch(point), DEFINITION_PREFETCH_DELAY)
+
+    def _prefetch(self, point: int) -> None:
+        if point == self._stored_point:
+            prefetch_definition(self.view, point)
+
+    def on_modified_async(self) -> None:
+        cancel_definition_prefetches(self.view)
+
+
 class LspGotoCommand(LspTextCommand):
 
     def __init__(self, view: sublime.View) -> None:
@@ -40,21 +126,31 @@ class LspGotoCommand(LspTextCommand):
         self.goto_kind = "definition"
 
     def is_enabled(self, event: Optional[dict] = None) -> bool:
-        if self.has_client_with_capability(self.goto_kind + "Provider"):
+        if session_for_view_or_starting(self.view, self.goto_kind + "Provider"):
             return is_at_word(self.view, event)
         return False
 
     def run(self, edit: sublime.Edit, event: Optional[dict] = None) -> None:
-        client = self.client_with_capability(self.goto_kind + "Provider")
-        if client:
+        session = session_for_view_or_starting(self.view, self.goto_kind + "Provider")
+        if session:
             pos = get_position(self.view, event)
+            if self.goto_kind == "definition":
+                key = definition_key(self.view, pos)
+                cached = definition_cache.get(key)
+                if cached:
+                    self.handle_response(cached[0])
+                    return
+                prefetch = _prefetches.get(key)
+                if prefetch:
+                    prefetch[2].append(self.handle_response)
+                    return
             document_position = text_document_position_params(self.view, pos)
             request_type = getattr(Request, self.goto_kind)
             if not request_type:
                 debug("unrecognized goto kind:", self.goto_kind)
                 return
             request = request_type(document_position)
-            client.send_request(request, self.handle_response)
+            session.send_request(request, self.handle_response, capability=self.goto_kind + "Provider")
 
     def handle_response(self, response: Any) -> None:
         window = self.view.window()
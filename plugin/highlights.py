@@ -1,15 +1,19 @@
 import sublime
 import sublime_plugin
+import time
 
-from .core.configurations import is_supported_syntax
+from .core.cache import LRUCache
 from .core.protocol import Request, Range, DocumentHighlightKind
 from .core.registry import session_for_view, client_from_session
 from .core.settings import settings, client_configs
-from .core.typing import List, Dict, Optional
+from .core.typing import List, Dict, Optional, Tuple
 from .core.views import range_to_region, text_document_position_params
 
 SUBLIME_WORD_MASK = 515
 NO_HIGHLIGHT_SCOPES = 'comment, string'
+# bounds of the delay before requesting highlights, which follows the observed response time.
+MIN_HIGHLIGHT_DELAY = 100
+MAX_HIGHLIGHT_DELAY = 500
 
 _kind2name = {
     DocumentHighlightKind.Unknown: "unknown",
@@ -19,6 +23,10 @@ _kind2name = {
 }
 
 
+# highlighted regions by kind, per (buffer, change count, word region).
+highlight_cache = LRUCache("documentHighlight", 64)
+
+
 def remove_highlights(view: sublime.View) -> None:
     for kind in settings.document_highlight_scopes.keys():
         view.erase_regions("lsp_highlight_{}".format(kind))
@@ -32,7 +40,7 @@ class DocumentHighlightListener(sublime_plugin.ViewEventListener):
             return False
         syntax = view_settings.get('syntax')
         if syntax:
-            return is_supported_syntax(syntax, client_configs.all)
+            return client_configs.is_syntax_supported(syntax)
         else:
             return False
 
@@ -41,6 +49,8 @@ class DocumentHighlightListener(sublime_plugin.ViewEventListener):
         self._initialized = False
         self._enabled = False
         self._stored_point = -1
+        self._highlighted_key = None  # type: Optional[Tuple]
+        self._latency = float(MAX_HIGHLIGHT_DELAY) / 2
 
     def on_selection_modified_async(self) -> None:
         if not self._initialized:
@@ -58,44 +68,65 @@ class DocumentHighlightListener(sublime_plugin.ViewEventListener):
     def _queue(self) -> None:
         current_point = self.view.sel()[0].begin()
         if self._stored_point != current_point:
-            self._clear_regions()
             self._stored_point = current_point
-            sublime.set_timeout_async(lambda: self._purge(current_point), 500)
+            key = self._word_key(current_point)
+            if key is not None:
+                if key == self._highlighted_key:
+                    # the caret moved within the highlighted word.
+                    return
+                kind2regions = highlight_cache.get(key)
+                if kind2regions is not None:
+                    self._draw(key, kind2regions)
+                    return
+            self._clear_regions()
+            sublime.set_timeout_async(lambda: self._purge(current_point), self._delay())
+
+    def _delay(self) -> int:
+        return max(MIN_HIGHLIGHT_DELAY, min(MAX_HIGHLIGHT_DELAY, int(self._latency * 2)))
+
+    def _word_key(self, point: int) -> Optional[Tuple]:
+        if len(self.view.sel()) != 1:
+            return None
+        if not self.view.classify(point) & SUBLIME_WORD_MASK or self.view.match_selector(point, NO_HIGHLIGHT_SCOPES):
+            return None
+        word = self.view.word(point)
+        return (self.view.buffer_id(), self.view.change_count(), word.begin(), word.end())
 
     def _purge(self, current_point: int) -> None:
         if current_point == self._stored_point:
             self._on_document_highlight()
 
     def _clear_regions(self) -> None:
+        self._highlighted_key = None
         for kind in settings.document_highlight_scopes.keys():
             self.view.erase_regions("lsp_highlight_{}".format(kind))
 
     def _on_document_highlight(self) -> None:
         self._clear_regions()
-        if len(self.view.sel()) != 1:
-            return
         point = self.view.sel()[0].begin()
-        word_at_sel = self.view.classify(point)
-        if word_at_sel & SUBLIME_WORD_MASK:
-            if self.view.match_selector(point, NO_HIGHLIGHT_SCOPES):
-                return
-            client = client_from_session(session_for_view(self.view, "documentHighlightProvider"))
-            if client:
-                params = text_document_position_params(self.view, point)
-                request = Request.documentHighlight(params)
-                client.send_request(request, self._handle_response)
-
-    def _handle_response(self, response: Optional[List]) -> None:
-        if not response:
+        key = self._word_key(point)
+        if key is None:
             return
+        client = client_from_session(session_for_view(self.view, "documentHighlightProvider"))
+        if client:
+            params = text_document_position_params(self.view, point)
+            request = Request.documentHighlight(params)
+            requested_at = time.time()
+            client.send_request(request, lambda response: self._handle_response(key, requested_at, response))
+
+    def _handle_response(self, key: Tuple, requested_at: float, response: Optional[List]) -> None:
+        self._latency = 0.7 * self._latency + 0.3 * (time.time() - requested_at) * 1000
         kind2regions = {}  # type: Dict[str, List[sublime.Region]]
-        for kind in range(0, 4):
-            kind2regions[_kind2name[kind]] = []
-        for highlight in response:
+        for highlight in response or []:
             r = range_to_region(Range.from_lsp(highlight["range"]), self.view)
             kind = highlight.get("kind", DocumentHighlightKind.Unknown)
             if kind is not None:
-                kind2regions[_kind2name[kind]].append(r)
+                kind2regions.setdefault(_kind2name[kind], []).append(r)
+        highlight_cache.set(key, kind2regions)
+        if key == self._word_key(self.view.sel()[0].begin()):
+            self._draw(key, kind2regions)
+
+    def _draw(self, key: Tuple, kind2regions: Dict[str, List[sublime.Region]]) -> None:
         if settings.document_highlight_style == "fill":
             flags = 0
         elif settings.document_highlight_style == "box":
@@ -110,6 +141,7 @@ class DocumentHighlightListener(sublime_plugin.ViewEventListener):
                 flags |= sublime.DRAW_SQUIGGLY_UNDERLINE
 
         self._clear_regions()
+        self._highlighted_key = key
         for kind_str, regions in kind2regions.items():
             if regions:
                 scope = settings.document_highlight_scopes.get(kind_str, None)
@@ -6,15 +6,18 @@ import os
 from html import escape
 from .code_actions import actions_manager, run_code_action_or_command
 from .code_actions import CodeActionOrCommand
-from .core.configurations import is_supported_syntax
-from .core.popups import popups
+from .core.cache import LRUCache
+from .core.logging import debug
+from .core.popups import popups, markup
 from .core.protocol import Request, DiagnosticSeverity, Diagnostic, DiagnosticRelatedInformation, Point
-from .core.registry import session_for_view, LspTextCommand, windows
+from .core.registry import session_for_view_or_starting, LspTextCommand, windows
+from .core.sessions import Session
 from .core.settings import client_configs, settings
-from .core.typing import List, Optional, Any, Dict
+from .core.typing import List, Optional, Any, Dict, Callable, Tuple
 from .core.views import make_link
 from .core.views import text_document_position_params
 from .diagnostics import filter_by_point, view_diagnostics
+from .goto import prefetch_definition
 
 
 SUBLIME_WORD_MASK = 515
@@ -30,7 +33,7 @@ class HoverHandler(sublime_plugin.ViewEventListener):
             return False
         syntax = view_settings.get('syntax')
         if syntax:
-            return is_supported_syntax(syntax, client_configs.all)
+            return client_configs.is_syntax_supported(syntax)
         else:
             return False
 
@@ -69,6 +72,28 @@ goto_kinds = [
 ]
 
 
+# hover responses by (buffer, change count, word region, config name), wrapped in a tuple as they may be None.
+hover_cache = LRUCache("hover", 32)
+_hovers_in_flight = {}  # type: Dict[Tuple, List[Callable[[Optional[Any]], None]]]
+
+
+def hover_key(view: sublime.View, session: Session, point: int) -> Tuple:
+    word = view.word(point)
+    return (view.buffer_id(), view.change_count(), word.begin(), word.end(), session.config.name)
+
+
+def _handle_hover_response(key: Tuple, response: Optional[Any]) -> None:
+    hover_cache.set(key, (response,))
+    for callback in _hovers_in_flight.pop(key, []):
+        callback(response)
+
+
+def _handle_hover_error(key: Tuple, error: Optional[Dict[str, Any]]) -> None:
+    _hovers_in_flight.pop(key, None)
+    # the error is None when the request could not be sent.
+    debug('hover failed:', error.get('message') if error else 'no connection to the server')
+
+
 class LspHoverCommand(LspTextCommand):
     def __init__(self, view: sublime.View) -> None:
         super().__init__(view)
@@ -98,13 +123,30 @@ class LspHoverCommand(LspTextCommand):
     def request_symbol_hover(self, point: int) -> None:
         # todo: session_for_view looks up windowmanager twice (config and for sessions)
         # can we memoize some part (eg. where no point is provided?)
-        session = session_for_view(self.view, 'hoverProvider', point)
-        if session:
+        session = session_for_view_or_starting(self.view, 'hoverProvider', point)
+        if session and session.client:
+            def on_response(response: Optional[Any]) -> None:
+                self.handle_response(response, point)
+
+            key = hover_key(self.view, session, point)
+            cached = hover_cache.get(key)
+            if cached:
+                on_response(cached[0])
+                return
+
+            waiting = _hovers_in_flight.get(key)
+            if waiting is not None:
+                # join the request that is already on its way for this word.
+                waiting.append(on_response)
+                return
+
+            _hovers_in_flight[key] = [on_response]
             document_position = text_document_position_params(self.view, point)
-            if session.client:
-                session.client.send_request(
-                    Request.hover(document_position),
-                    lambda response: self.handle_response(response, point))
+            session.send_request(
+                Request.hover(document_position),
+                lambda response: _handle_hover_response(key, response),
+                lambda error: _handle_hover_error(key, error),
+                'hoverProvider')
 
     def request_code_actions(self, point: int) -> None:
         actions_manager.request(self.view, point, lambda response: self.handle_code_actions(response, point))
@@ -116,6 +158,8 @@ class LspHoverCommand(LspTextCommand):
     def handle_response(self, response: Optional[Any], point: int) -> None:
         self._hover = response
         self.request_show_hover(point)
+        if response:
+            prefetch_definition(self.view, point)
 
     def symbol_actions_content(self) -> str:
         actions = []
@@ -199,7 +243,7 @@ class LspHoverCommand(LspTextCommand):
 
         if formatted:
             frontmatter_config = mdpopups.format_frontmatter({'allow_code_wrap': True})
-            return mdpopups.md2html(self.view, frontmatter_config + "\n".join(formatted))
+            return markup.md2html(self.view, frontmatter_config + "\n".join(formatted))
 
         return ""
 
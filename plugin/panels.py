@@ -1,3 +1,5 @@
+from .core.cache import cache_statistics
+from .core.logging import printf
 from .core.main import ensure_server_panel
 from .diagnostics import ensure_diagnostics_panel
 from .core.panels import PanelName
@@ -21,3 +23,10 @@ class LspShowDiagnosticsPanelCommand(WindowCommand):
     def run(self) -> None:
         ensure_diagnostics_panel(self.window)
         toggle_output_panel(self.window, PanelName.Diagnostics)
+
+
+class LspShowCacheStatisticsCommand(WindowCommand):
+    def run(self) -> None:
+        for name, (hits, misses, entries) in sorted(cache_statistics().items()):
+            printf("{} cache: {} hits, {} misses, {} entries".format(name, hits, misses, entries))
+        self.window.run_command("show_panel", {"panel": "console"})
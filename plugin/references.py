@@ -1,17 +1,23 @@
+import functools
 import os
 import sublime
-import linecache
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from .core.documents import is_at_word, get_position
 from .core.panels import ensure_panel
 from .core.protocol import Request, Point
 from .core.registry import LspTextCommand, windows
 from .core.settings import PLUGIN_NAME, settings
-from .core.typing import List, Dict, Optional, Tuple, TypedDict
+from .core.typing import Any, Callable, List, Dict, Optional, Tuple, TypedDict
 from .core.url import uri_to_filename
-from .core.views import get_line, text_document_position_params
+from .core.views import read_lines, text_document_position_params
 
 ReferenceDict = TypedDict('ReferenceDict', {'uri': str, 'range': dict})
+FileReferences = List[Tuple[Point, str]]
+
+# reads the lines of referenced files that are not open, one file per task.
+_line_readers = ThreadPoolExecutor(max_workers=4)
 
 
 def ensure_references_panel(window: sublime.Window) -> 'Optional[sublime.View]':
@@ -26,6 +32,10 @@ class LspSymbolReferencesCommand(LspTextCommand):
         self.word_region = None  # type: Optional[sublime.Region]
         self.word = ""
         self.base_dir = None  # type: Optional[str]
+        self.generation = 0
+        # references streamed by the server as partial results before its response.
+        self.partial_references = []  # type: List[ReferenceDict]
+        self.panel = None  # type: Optional[sublime.View]
 
     def is_enabled(self, event: Optional[dict] = None) -> bool:
         if self.has_client_with_capability('referencesProvider'):
@@ -42,38 +52,91 @@ class LspSymbolReferencesCommand(LspTextCommand):
             self.word = self.view.substr(self.word_region)
 
             # use relative paths if file on the same root.
-            base_dir = windows.lookup(window).get_project_path(file_path)
+            manager = windows.lookup(window)
+            base_dir = manager.get_project_path(file_path)
             if base_dir:
                 if os.path.commonprefix([base_dir, file_path]):
                     self.base_dir = base_dir
 
+            self.generation += 1
+            generation = self.generation
+            self.partial_references = []
+            self.panel = None
+            partial_result_token = manager.create_partial_result_token(
+                lambda references: self.handle_partial_response(references, generation))
+            work_done_token = manager.create_work_done_token()
+
+            def discard_tokens() -> None:
+                manager.discard_progress_token(partial_result_token)
+                manager.discard_progress_token(work_done_token)
+
+            def on_response(response: Optional[List[ReferenceDict]]) -> None:
+                discard_tokens()
+                self.handle_response(response, generation)
+
+            def on_error(error: Optional[Dict[str, Any]]) -> None:
+                discard_tokens()
+                window = self.view.window()
+                if window:
+                    message = error.get("message") if error else "no connection to the server"
+                    window.status_message("References failed: {}".format(message))
+
             document_position = text_document_position_params(self.view, pos)
             document_position['context'] = {"includeDeclaration": False}
+            document_position['partialResultToken'] = partial_result_token
+            document_position['workDoneToken'] = work_done_token
             request = Request.references(document_position)
-            client.send_request(request, lambda response: self.handle_response(response, pos))
+            client.send_request(request, on_response, on_error)
+
+    def handle_partial_response(self, references: Optional[List[ReferenceDict]], generation: int) -> None:
+        window = self.view.window()
+        if not window or not references or generation != self.generation:
+            return
+
+        if settings.show_references_in_quick_panel:
+            # the quick panel can't be extended once shown, it opens with the response.
+            self.partial_references.extend(references)
+            return
+
+        if not self.panel:
+            self.panel = self.start_references_panel(window, "References for '{}'\n\n".format(self.word))
+        if self.panel:
+            self.partial_references.extend(references)
+            self.stream_references(window, self.panel, self._group_points_by_file(references))
 
-    def handle_response(self, response: Optional[List[ReferenceDict]], pos: int) -> None:
+    def handle_response(self, response: Optional[List[ReferenceDict]], generation: int) -> None:
         window = self.view.window()
 
         if response is None:
             response = []
 
-        if window:
-            references_count = len(response)
+        if window and generation == self.generation:
+            if self.panel:
+                # the panel already shows the streamed references, add the rest.
+                if response:
+                    self.stream_references(window, self.panel, self._group_points_by_file(response))
+                window.status_message("{} references for '{}'".format(
+                    len(self.partial_references) + len(response), self.word))
+                return
+
+            references = self.partial_references + response
+            references_count = len(references)
             # return if there are no references
             if references_count < 1:
                 window.run_command("hide_panel", {"panel": "output.references"})
                 window.status_message("No references found")
                 return
 
-            references_by_file = self._group_references_by_file(response)
-
+            points_by_file = self._group_points_by_file(references)
             if settings.show_references_in_quick_panel:
-                self.show_quick_panel(references_by_file)
+                self._read_references(window, points_by_file, None, self.show_quick_panel)
             else:
-                self.show_references_panel(references_by_file)
+                panel = self.start_references_panel(
+                    window, "{} references for '{}'\n\n".format(references_count, self.word))
+                if panel:
+                    self.stream_references(window, panel, points_by_file)
 
-    def show_quick_panel(self, references_by_file: Dict[str, List[Tuple[Point, str]]]) -> None:
+    def show_quick_panel(self, references_by_file: Dict[str, FileReferences]) -> None:
         selected_index = -1
         current_file_path = self.view.file_name()
         self.reflist.clear()
@@ -111,39 +174,44 @@ class LspSymbolReferencesCommand(LspTextCommand):
             if window:
                 window.open_file(self.get_selected_file_path(index), flags)
 
-    def show_references_panel(self, references_by_file: Dict[str, List[Tuple[Point, str]]]) -> None:
-        window = self.view.window()
-        if window:
-            panel = ensure_references_panel(window)
-            if not panel:
-                return
+    def start_references_panel(self, window: sublime.Window, header: str) -> Optional[sublime.View]:
+        panel = ensure_references_panel(window)
+        if not panel:
+            return None
+
+        base_dir = windows.lookup(window).get_project_path(self.view.file_name() or "")
+        panel.settings().set("result_base_dir", base_dir)
+
+        panel.run_command("lsp_clear_panel")
+        window.run_command("show_panel", {"panel": "output.references"})
+        self._append_to_panel(panel, header)
+        return panel
 
-            text = ''
-            references_count = 0
-            for file, references in references_by_file.items():
-                text += '◌ {}:\n'.format(self.get_relative_path(file))
-                for reference in references:
-                    references_count += 1
-                    point, line = reference
-                    text += '\t{:>8}:{:<4} {}\n'.format(point.row + 1, point.col + 1, line)
-                # append a new line after each file name
-                text += '\n'
-
-            base_dir = windows.lookup(window).get_project_path(self.view.file_name() or "")
-            panel.settings().set("result_base_dir", base_dir)
-
-            panel.run_command("lsp_clear_panel")
-            window.run_command("show_panel", {"panel": "output.references"})
-            panel.run_command('append', {
-                'characters': "{} references for '{}'\n\n{}".format(references_count, self.word, text),
-                'force': True,
-                'scroll_to_end': False
-            })
+    def stream_references(self, window: sublime.Window, panel: sublime.View,
+                          points_by_file: Dict[str, List[Point]]) -> None:
 
+        def on_file(file_path: str, references: FileReferences) -> None:
+            parts = ['◌ {}:\n'.format(self.get_relative_path(file_path))]
+            for point, line in references:
+                parts.append('\t{:>8}:{:<4} {}\n'.format(point.row + 1, point.col + 1, line))
+            # append a new line after each file name
+            parts.append('\n')
+            self._append_to_panel(panel, "".join(parts))
+
+        def on_done(references_by_file: Dict[str, FileReferences]) -> None:
             # highlight all word occurrences
             regions = panel.find_all(r"\b{}\b".format(self.word))
             panel.add_regions('ReferenceHighlight', regions, 'comment', flags=sublime.DRAW_OUTLINED)
 
+        self._read_references(window, points_by_file, on_file, on_done)
+
+    def _append_to_panel(self, panel: sublime.View, characters: str) -> None:
+        panel.run_command('append', {
+            'characters': characters,
+            'force': True,
+            'scroll_to_end': False
+        })
+
     def get_selected_file_path(self, index: int) -> str:
         return self.get_full_path(self.reflist[index][0])
 
@@ -161,22 +229,46 @@ class LspSymbolReferencesCommand(LspTextCommand):
     def want_event(self) -> bool:
         return True
 
-    def _group_references_by_file(self, references: List[ReferenceDict]
-                                  ) -> Dict[str, List[Tuple[Point, str]]]:
-        """ Return a dictionary that groups references by the file it belongs. """
-        grouped_references = {}  # type: Dict[str, List[Tuple[Point, str]]]
+    def _group_points_by_file(self, references: List[ReferenceDict]) -> Dict[str, List[Point]]:
+        """ Return a dictionary that groups reference positions by the file they belong to. """
+        grouped_points = OrderedDict()  # type: Dict[str, List[Point]]
         for reference in references:
             file_path = uri_to_filename(reference["uri"])
-            point = Point.from_lsp(reference['range']['start'])
-
-            # get line of the reference, to showcase its use
-            reference_line = get_line(self.view.window(), file_path, point.row)
-
-            if grouped_references.get(file_path) is None:
-                grouped_references[file_path] = []
-            grouped_references[file_path].append((point, reference_line))
-
-        # we don't want to cache the line, we always want to get fresh data
-        linecache.clearcache()
-
-        return grouped_references
+            grouped_points.setdefault(file_path, []).append(Point.from_lsp(reference['range']['start']))
+        return grouped_points
+
+    def _read_references(self, window: sublime.Window, points_by_file: Dict[str, List[Point]],
+                         on_file: Optional[Callable[[str, FileReferences], None]],
+                         on_done: Callable[[Dict[str, FileReferences]], None]) -> None:
+        """
+        Look up the line of every reference, to showcase its use. Open files are read from their buffer,
+        other files are read from disk in the background, each of them once.
+
+        on_file is called on the main thread for each file as soon as its lines are known, on_done with all
+        files in their original order. Results are dropped once a newer references request has been answered.
+        """
+        generation = self.generation
+        references_by_file = {}  # type: Dict[str, FileReferences]
+
+        def deliver(file_path: str, lines: Dict[int, str]) -> None:
+            if generation != self.generation:
+                return
+            references = [(point, lines[point.row]) for point in points_by_file[file_path]]
+            references_by_file[file_path] = references
+            if on_file:
+                on_file(file_path, references)
+            if len(references_by_file) == len(points_by_file):
+                on_done(OrderedDict((path, references_by_file[path]) for path in points_by_file))
+
+        def on_read(file_path: str, future: Future) -> None:
+            sublime.set_timeout(lambda: deliver(file_path, future.result()))
+
+        for file_path, points in points_by_file.items():
+            rows = set(point.row for point in points)
+            view = window.find_open_file(file_path)
+            if view:
+                lines = dict((row, view.substr(view.line(view.text_point(row, 0))).strip()) for row in rows)
+                sublime.set_timeout(lambda file_path=file_path, lines=lines: deliver(file_path, lines))
+            else:
+                future = _line_readers.submit(read_lines, file_path, rows)
+                future.add_done_callback(functools.partial(on_read, file_path))
@@ -3,8 +3,7 @@ import sublime
 import html
 import webbrowser
 
-from .core.configurations import is_supported_syntax
-from .core.popups import popups
+from .core.popups import popups, markup
 from .core.protocol import Request
 from .core.registry import session_for_view, client_from_session, LSPViewEventListener
 from .core.settings import client_configs, settings
@@ -30,7 +29,7 @@ class ColorSchemeScopeRenderer(object):
         return self._wrap_with_scope_style(content, "variable.parameter", emphasize)
 
     def markdown(self, content: str) -> str:
-        return mdpopups.md2html(self._view, content)
+        return markup.md2html(self._view, content)
 
     def _wrap_with_scope_style(self, content: str, scope: str, emphasize: bool = False, escape: bool = True) -> str:
         color = self._scope_styles[scope]["color"]
@@ -56,7 +55,7 @@ class SignatureHelpListener(LSPViewEventListener):
             return False
         syntax = view_settings.get('syntax')
         if syntax:
-            return is_supported_syntax(syntax, client_configs.all)
+            return client_configs.is_syntax_supported(syntax)
         else:
             return False
 
@@ -1,10 +1,15 @@
+from .core.cache import LRUCache
 from .core.protocol import Request, Range
 from .core.protocol import SymbolKind
-from .core.registry import LspTextCommand
-from .core.typing import Any, List, Optional, Tuple, Dict
+from .core.registry import LspTextCommand, LSPViewEventListener, session_for_view, windows
+from .core.settings import settings
+from .core.symbol_index import SymbolIndex, flatten_document_symbols
+from .core.typing import Any, Callable, List, Optional, Tuple, Dict, Set
 from .core.views import location_to_encoded_filename
 from .core.views import range_to_region
 from .core.views import text_document_identifier
+from .core.views import uri_from_view
+import hashlib
 import os
 import sublime
 import sublime_plugin
@@ -44,6 +49,112 @@ def format_symbol_kind(kind: int) -> str:
     return symbol_kind_names.get(kind, str(kind))
 
 
+_symbol_indexes = {}  # type: Dict[str, SymbolIndex]
+_symbol_index_saves = set()  # type: Set[SymbolIndex]
+SYMBOL_INDEX_SAVE_DELAY = 5000
+
+
+def symbol_index(window: Optional[sublime.Window]) -> Optional[SymbolIndex]:
+    """
+    The on-disk symbol index of the project open in the window, if it has folders. The index is read on the async
+    thread, until then it only holds the symbols indexed in the meantime.
+    """
+    folders = window.folders() if window else None
+    if not folders:
+        return None
+    project_key = "\n".join(sorted(folders))
+    index = _symbol_indexes.get(project_key)
+    if index is None:
+        file_name = hashlib.sha1(project_key.encode('utf-8')).hexdigest() + '.json'
+        index = SymbolIndex(os.path.join(sublime.cache_path(), 'LSP', 'symbols', file_name))
+        _symbol_indexes[project_key] = index
+        sublime.set_timeout_async(index.load, 0)
+    return index
+
+
+def save_symbol_index(index: SymbolIndex) -> None:
+    """ Save the index a little later, once for any number of changes made in the meantime. """
+    if index in _symbol_index_saves:
+        return
+    _symbol_index_saves.add(index)
+
+    def save() -> None:
+        _symbol_index_saves.discard(index)
+        index.save()
+
+    sublime.set_timeout_async(save, SYMBOL_INDEX_SAVE_DELAY)
+
+
+# textDocument/documentSymbol responses by (buffer, change count).
+document_symbol_cache = LRUCache("document symbols", 32)
+_document_symbols_in_flight = {}  # type: Dict[Tuple[int, int], List[Callable[[List[Dict[str, Any]]], None]]]
+DOCUMENT_SYMBOL_DELAY = 1000
+
+
+def request_document_symbols(view: sublime.View, callback: Callable[[List[Dict[str, Any]]], None]) -> None:
+    """
+    Calls back with the symbol tree of the current version of the document, the raw DocumentSymbol or
+    SymbolInformation items. Each version is requested from the server only once and shared by all callers.
+    """
+    key = (view.buffer_id(), view.change_count())
+    symbols = document_symbol_cache.get(key)
+    if symbols is not None:
+        callback(symbols)
+        return
+
+    waiting = _document_symbols_in_flight.get(key)
+    if waiting is not None:
+        waiting.append(callback)
+        return
+
+    session = session_for_view(view, 'documentSymbolProvider')
+    if session and session.client:
+        _document_symbols_in_flight[key] = [callback]
+        index = symbol_index(view.window())
+        uri = uri_from_view(view)
+        session.client.send_request(
+            Request.documentSymbols({"textDocument": text_document_identifier(view)}),
+            lambda response: _handle_document_symbols(key, response, index, uri),
+            lambda error: _handle_document_symbols_error(key))
+
+
+def _handle_document_symbols(key: Tuple[int, int], response: Any, index: Optional[SymbolIndex], uri: str) -> None:
+    symbols = response if isinstance(response, list) else []
+    document_symbol_cache.set(key, symbols)
+    if index:
+        index.set_document_symbols(uri, flatten_document_symbols(uri, symbols))
+        save_symbol_index(index)
+    for callback in _document_symbols_in_flight.pop(key, []):
+        callback(symbols)
+
+
+def _handle_document_symbols_error(key: Tuple[int, int]) -> None:
+    # nothing is cached, so the next caller asks the server again.
+    for callback in _document_symbols_in_flight.pop(key, []):
+        callback([])
+
+
+class DocumentSymbolsListener(LSPViewEventListener):
+    """ Fills the document symbol cache in the background once edits settle. """
+
+    def __init__(self, view: sublime.View) -> None:
+        super().__init__(view)
+        self._change_count = -1
+
+    @classmethod
+    def is_applicable(cls, view_settings: dict) -> bool:
+        return 'documentSymbol' not in settings.disabled_capabilities and cls.has_supported_syntax(view_settings)
+
+    def on_modified_async(self) -> None:
+        change_count = self.view.change_count()
+        self._change_count = change_count
+        sublime.set_timeout_async(lambda: self._fill(change_count), DOCUMENT_SYMBOL_DELAY)
+
+    def _fill(self, change_count: int) -> None:
+        if change_count == self._change_count == self.view.change_count():
+            request_document_symbols(self.view, lambda symbols: None)
+
+
 class LspSelectionClearCommand(sublime_plugin.TextCommand):
     """
     Selections may not be modified outside the run method of a text command. Thus, to allow modification in an async
@@ -70,7 +181,8 @@ class LspDocumentSymbolsCommand(LspTextCommand):
     def __init__(self, view: sublime.View) -> None:
         super().__init__(view)
         self.old_regions = []  # type: List[sublime.Region]
-        self.regions = []  # type: List[Tuple[sublime.Region, Optional[sublime.Region]]]
+        # LSP ranges of the listed symbols, converted to regions when a symbol is highlighted or selected.
+        self.ranges = []  # type: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]
         self.found_at_least_one_nonempty_detail = False
         self.is_first_selection = False
 
@@ -78,10 +190,7 @@ class LspDocumentSymbolsCommand(LspTextCommand):
         return self.has_client_with_capability('documentSymbolProvider')
 
     def run(self, edit: sublime.Edit) -> None:
-        client = self.client_with_capability('documentSymbolProvider')
-        if client:
-            client.send_request(
-                Request.documentSymbols({"textDocument": text_document_identifier(self.view)}), self.handle_response)
+        request_document_symbols(self.view, self.handle_response)
 
     def handle_response(self, response: Any) -> None:
         window = self.view.window()
@@ -97,10 +206,11 @@ class LspDocumentSymbolsCommand(LspTextCommand):
             self.view.run_command("lsp_selection_clear")
 
     def region(self, index: int) -> sublime.Region:
-        return self.regions[index][0]
+        return range_to_region(Range.from_lsp(self.ranges[index][0]), self.view)
 
     def selection_region(self, index: int) -> Optional[sublime.Region]:
-        return self.regions[index][1]
+        selection_range = self.ranges[index][1]
+        return range_to_region(Range.from_lsp(selection_range), self.view) if selection_range else None
 
     def on_symbol_selected(self, index: int) -> None:
         if index == -1:
@@ -113,7 +223,7 @@ class LspDocumentSymbolsCommand(LspTextCommand):
             self.view.show_at_center(region.a)
         self.view.erase_regions(self.REGIONS_KEY)
         self.old_regions.clear()
-        self.regions.clear()
+        self.ranges.clear()
 
     def on_highlighted(self, index: int) -> None:
         if self.is_first_selection:
@@ -124,7 +234,7 @@ class LspDocumentSymbolsCommand(LspTextCommand):
         self.view.add_regions(self.REGIONS_KEY, [region], 'comment', '', sublime.DRAW_NO_FILL)
 
     def process_symbols(self, items: List[Dict[str, Any]]) -> List[List[str]]:
-        self.regions.clear()
+        self.ranges.clear()
         if 'selectionRange' in items[0]:
             return self.process_document_symbols(items)
         else:
@@ -142,8 +252,7 @@ class LspDocumentSymbolsCommand(LspTextCommand):
 
     def process_document_symbol_recursive(self, quick_panel_items: List[List[str]], item: Dict[str, Any],
                                           depth: int) -> None:
-        self.regions.append((range_to_region(Range.from_lsp(item['range']), self.view),
-                             range_to_region(Range.from_lsp(item['selectionRange']), self.view)))
+        self.ranges.append((item['range'], item['selectionRange']))
         name = ' ' * (4 * depth) + item['name']
         quick_panel_item = [name, format_symbol_kind(item['kind']), item.get('detail') or '']
         if quick_panel_item[2]:
@@ -156,7 +265,7 @@ class LspDocumentSymbolsCommand(LspTextCommand):
     def process_symbol_informations(self, items: List[Dict[str, Any]]) -> List[List[str]]:
         quick_panel_items = []  # type: List[List[str]]
         for item in items:
-            self.regions.append((range_to_region(Range.from_lsp(item['location']['range']), self.view), None))
+            self.ranges.append((item['location']['range'], None))
             quick_panel_items.append([item['name'], format_symbol_kind(item['kind'])])
         return quick_panel_items
 
@@ -172,19 +281,59 @@ class SymbolQueryInput(sublime_plugin.TextInputHandler):
 
 class LspWorkspaceSymbolsCommand(LspTextCommand):
 
+    def __init__(self, view: sublime.View) -> None:
+        super().__init__(view)
+        self.generation = 0
+        # symbols received so far, the quick panel opens on the first partial result.
+        self.matches = []  # type: List[Dict[str, Any]]
+        self.shown_count = 0
+        self.highlighted_index = 0
+
     def is_enabled(self) -> bool:
-        return self.has_client_with_capability('workspaceSymbolProvider')
+        if self.has_client_with_capability('workspaceSymbolProvider'):
+            return True
+        # answer from the symbol index while the servers are starting.
+        index = symbol_index(self.view.window())
+        return bool(index and index.is_loaded() and not index.is_empty())
 
-    def input(self, _args: Any) -> sublime_plugin.TextInputHandler:
+    def input(self, _args: Any) -> Optional[sublime_plugin.TextInputHandler]:
         return SymbolQueryInput()
 
     def run(self, edit: sublime.Edit, symbol_query_input: str = "") -> None:
         if symbol_query_input:
             client = self.client_with_capability('workspaceSymbolProvider')
-            if client:
+            window = self.view.window()
+            if not client:
+                self._show_indexed_symbols(symbol_query_input)
+            elif window:
                 self.view.set_status("lsp_workspace_symbols", "Searching for '{}'...".format(symbol_query_input))
-                request = Request.workspaceSymbol({"query": symbol_query_input})
-                client.send_request(request, lambda r: self._handle_response(symbol_query_input, r), self._handle_error)
+                self.generation += 1
+                generation = self.generation
+                self.matches = []
+                self.shown_count = 0
+                manager = windows.lookup(window)
+                partial_result_token = manager.create_partial_result_token(
+                    lambda symbols: self._handle_partial_response(symbols, generation))
+                work_done_token = manager.create_work_done_token()
+
+                def discard_tokens() -> None:
+                    manager.discard_progress_token(partial_result_token)
+                    manager.discard_progress_token(work_done_token)
+
+                def on_response(response: Optional[List[Dict[str, Any]]]) -> None:
+                    discard_tokens()
+                    self._handle_response(symbol_query_input, response, generation)
+
+                def on_error(error: Dict[str, Any]) -> None:
+                    discard_tokens()
+                    self._handle_error(error)
+
+                request = Request.workspaceSymbol({
+                    "query": symbol_query_input,
+                    "partialResultToken": partial_result_token,
+                    "workDoneToken": work_done_token
+                })
+                client.send_request(request, on_response, on_error)
 
     def _format(self, s: Dict[str, Any]) -> str:
         file_name = os.path.basename(s['location']['uri'])
@@ -199,18 +348,178 @@ class LspWorkspaceSymbolsCommand(LspTextCommand):
             if window:
                 window.open_file(location_to_encoded_filename(symbol['location']), sublime.ENCODED_POSITION)
 
-    def _handle_response(self, query: str, response: Optional[List[Dict[str, Any]]]) -> None:
+    def _on_highlighted(self, index: int) -> None:
+        self.highlighted_index = index
+
+    def _show_matches(self) -> None:
+        window = self.view.window()
+        if window:
+            matches = self.matches
+            selected_index = self.highlighted_index if self.shown_count else 0
+            self.shown_count = len(matches)
+            window.show_quick_panel(list(map(self._format, matches)), lambda i: self._open_file(matches, i),
+                                    0, selected_index, self._on_highlighted)
+
+    def _handle_partial_response(self, symbols: Optional[List[Dict[str, Any]]], generation: int) -> None:
+        if symbols and generation == self.generation:
+            self.matches.extend(symbols)
+            if not self.shown_count:
+                self._show_matches()
+
+    def _show_indexed_symbols(self, query: str) -> None:
+        index = symbol_index(self.view.window())
+        self.generation += 1
+        self.matches = index.query(query) if index else []
+        self.shown_count = 0
+        if self.matches:
+            self.view.set_status("lsp_workspace_symbols", "Symbols from the index, the server is starting")
+            sublime.set_timeout(lambda: self.view.erase_status("lsp_workspace_symbols"), 3000)
+            self._show_matches()
+        else:
+            sublime.message_dialog("No matches found for query string: '{}'".format(query))
+
+    def _handle_response(self, query: str, response: Optional[List[Dict[str, Any]]], generation: int) -> None:
+        if generation != self.generation:
+            return
         self.view.erase_status("lsp_workspace_symbols")
         if response:
-            matches = response
-            window = self.view.window()
-            if window:
-                window.show_quick_panel(list(map(self._format, matches)), lambda i: self._open_file(matches, i))
-        else:
+            self.matches.extend(response)
+        self._update_index(self.matches)
+        if len(self.matches) > self.shown_count:
+            # show the complete list, keeping the symbol that was highlighted in the partial one.
+            self._show_matches()
+        elif not self.matches:
             sublime.message_dialog("No matches found for query string: '{}'".format(query))
 
+    def _update_index(self, symbols: List[Dict[str, Any]]) -> None:
+        index = symbol_index(self.view.window())
+        if index:
+            index.add_workspace_symbols(symbols)
+            save_symbol_index(index)
+
     def _handle_error(self, error: Dict[str, Any]) -> None:
         self.view.erase_status("lsp_workspace_symbols")
         reason = error.get("message", "none provided by server :(")
         msg = "command 'workspace/symbol' failed. Reason: {}".format(reason)
         sublime.error_message(msg)
+
+
+# workspace/symbol results by query, for the duration of one as-you-type search.
+workspace_symbol_cache = LRUCache("workspace symbol", 64)
+WORKSPACE_SYMBOL_DELAY = 250
+# the number of matches named in the status bar while typing.
+WORKSPACE_SYMBOL_STATUS_NAMES = 3
+
+
+class LspWorkspaceSymbolsAsYouTypeCommand(LspWorkspaceSymbolsCommand):
+    """
+    Searches workspace symbols while the query is typed into an input panel, showing the best matches in the status
+    bar and the results of the final query in a quick panel. The server is asked once typing pauses, and a request
+    for a query that was typed over is cancelled right away.
+    """
+
+    def __init__(self, view: sublime.View) -> None:
+        super().__init__(view)
+        self.query = ""
+        self.pending_request = None  # type: Optional[Tuple[str, int]]
+        self.show_when_answered = False
+
+    def input(self, _args: Any) -> Optional[sublime_plugin.TextInputHandler]:
+        return None
+
+    def run(self, edit: sublime.Edit, symbol_query_input: str = "") -> None:
+        window = self.view.window()
+        if window:
+            workspace_symbol_cache.clear()
+            self.query = ""
+            self.show_when_answered = False
+            window.show_input_panel("Symbol", symbol_query_input, self.on_done, self.on_change, self.on_cancel)
+            if symbol_query_input:
+                self.on_change(symbol_query_input)
+
+    def on_change(self, query: str) -> None:
+        self.query = query
+        self.show_when_answered = False
+        if self.pending_request and self.pending_request[0] != query:
+            self.cancel_pending_request()
+        if not query:
+            self.view.erase_status("lsp_workspace_symbols")
+            return
+        symbols = workspace_symbol_cache.get(query)
+        if symbols is None:
+            sublime.set_timeout(lambda: self.request(query), WORKSPACE_SYMBOL_DELAY)
+        else:
+            self.set_status(query, symbols)
+
+    def on_done(self, query: str) -> None:
+        self.query = query
+        symbols = workspace_symbol_cache.get(query) if query else None
+        if symbols is not None:
+            self.show_symbols(query, symbols)
+        elif query:
+            self.show_when_answered = True
+            if not self.pending_request or self.pending_request[0] != query:
+                self.request(query)
+
+    def on_cancel(self) -> None:
+        self.query = ""
+        self.cancel_pending_request()
+        self.view.erase_status("lsp_workspace_symbols")
+
+    def request(self, query: str) -> None:
+        if query != self.query or query in workspace_symbol_cache:
+            return
+        if self.pending_request and self.pending_request[0] == query:
+            return
+        self.cancel_pending_request()
+        client = self.client_with_capability('workspaceSymbolProvider')
+        if client:
+            self.view.set_status("lsp_workspace_symbols", "Searching for '{}'...".format(query))
+            request_id = client.send_request(
+                Request.workspaceSymbol({"query": query}),
+                lambda response: self.on_symbols(query, response),
+                self._handle_error)
+            if request_id is not None:
+                self.pending_request = (query, request_id)
+        else:
+            # answer from the symbol index while the servers are starting.
+            index = symbol_index(self.view.window())
+            symbols = index.query(query) if index else []
+            if self.show_when_answered:
+                self.show_symbols(query, symbols)
+            else:
+                self.set_status(query, symbols)
+
+    def cancel_pending_request(self) -> None:
+        if self.pending_request:
+            client = self.client_with_capability('workspaceSymbolProvider')
+            if client:
+                client.cancel_request(self.pending_request[1])
+            self.pending_request = None
+            self.view.erase_status("lsp_workspace_symbols")
+
+    def on_symbols(self, query: str, response: Optional[List[Dict[str, Any]]]) -> None:
+        if self.pending_request and self.pending_request[0] == query:
+            self.pending_request = None
+        symbols = response or []
+        workspace_symbol_cache.set(query, symbols)
+        self._update_index(symbols)
+        if query == self.query:
+            if self.show_when_answered:
+                self.show_symbols(query, symbols)
+            else:
+                self.set_status(query, symbols)
+
+    def set_status(self, query: str, symbols: List[Dict[str, Any]]) -> None:
+        names = ", ".join(symbol['name'] for symbol in symbols[:WORKSPACE_SYMBOL_STATUS_NAMES])
+        status = "{} symbols for '{}'".format(len(symbols), query)
+        self.view.set_status("lsp_workspace_symbols", "{}: {}".format(status, names) if names else status)
+
+    def show_symbols(self, query: str, symbols: List[Dict[str, Any]]) -> None:
+        self.show_when_answered = False
+        self.view.erase_status("lsp_workspace_symbols")
+        window = self.view.window()
+        if not symbols:
+            sublime.message_dialog("No matches found for query string: '{}'".format(query))
+        elif window:
+            window.show_quick_panel(list(map(self._format, symbols)), lambda i: self._open_file(symbols, i))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measures the capability checks a Session answers on every keystroke, hover and save, outside of Sublime Text.
+
+The checks of one editor event are timed against the compiled capability record of a Session, and against a
+reference that inspects the raw capabilities dict on each call, the way Session did before the record existed.
+The cost of compiling the record, paid after initialization and on each (un)registration, is reported as well.
+
+    python3 scripts/benchmark_capabilities.py --events 100000 --repeat 5
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import os
+import sys
+import timeit
+import types
+
+PACKAGE_PATH = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
+
+# a typical initialize response, with a dynamically registered didChange.
+CAPABILITIES = {
+    'textDocumentSync': {'openClose': True, 'change': {'syncKind': 2}, 'save': {'includeText': False},
+                         'willSave': False},
+    'hoverProvider': True,
+    'completionProvider': {'triggerCharacters': ['.', ':'], 'resolveProvider': True},
+    'signatureHelpProvider': {'triggerCharacters': ['(', ',']},
+    'definitionProvider': True,
+    'referencesProvider': True,
+    'documentHighlightProvider': True,
+    'documentSymbolProvider': True,
+    'workspaceSymbolProvider': True,
+    'codeActionProvider': True,
+    'documentFormattingProvider': False,
+    'renameProvider': True,
+    'colorProvider': False,
+    'workspace': {'workspaceFolders': {'supported': True, 'changeNotifications': True}},
+}  # type: Dict[str, Any]
+
+
+def import_sessions_module() -> Any:
+    """Import plugin.core.sessions as part of a package named LSP, the way Sublime Text loads it."""
+    if 'LSP' not in sys.modules:
+        package = types.ModuleType('LSP')
+        package.__path__ = [PACKAGE_PATH]  # type: ignore
+        sys.modules['LSP'] = package
+    from LSP.plugin.core import sessions
+    return sessions
+
+
+class InitializingClient(object):
+    """Answers the initialize request with CAPABILITIES, and nothing else."""
+
+    def send_request(self, request: Any, on_success: Callable, on_error: Callable) -> None:
+        if request.method == 'initialize':
+            on_success({'capabilities': CAPABILITIES})
+
+    def on_request(self, method: str, handler: Callable) -> None:
+        pass
+
+
+class RawCapabilities(object):
+    """The checks as made on the raw capabilities dict."""
+
+    def __init__(self, capabilities: Dict[str, Any]) -> None:
+        self.capabilities = capabilities
+
+    def has_capability(self, capability: str) -> bool:
+        return capability in self.capabilities and self.capabilities[capability] is not False
+
+    def text_sync_kind(self) -> int:
+        textsync = self.capabilities.get('textDocumentSync')
+        if isinstance(textsync, dict):
+            change = textsync.get('change', 0)
+            if isinstance(change, dict):
+                return 2
+            return int(change)
+        if isinstance(textsync, int):
+            return textsync
+        return 0
+
+    def should_notify_did_change(self) -> bool:
+        return self.text_sync_kind() > 0
+
+    def should_notify_will_save(self) -> bool:
+        textsync = self.capabilities.get('textDocumentSync')
+        if isinstance(textsync, dict):
+            will_save = textsync.get('willSave')
+            if isinstance(will_save, dict):
+                return True
+            return bool(will_save)
+        return False
+
+    def should_notify_did_save(self) -> Tuple[bool, bool]:
+        textsync = self.capabilities.get('textDocumentSync')
+        if isinstance(textsync, dict):
+            options = textsync.get('save')
+            if isinstance(options, dict):
+                return True, bool(options.get('includeText'))
+            elif isinstance(options, bool):
+                return options, False
+        return False, False
+
+    def should_notify_did_change_workspace_folders(self) -> bool:
+        return bool(self.capabilities.get("workspace", {}).get("workspaceFolders", {}).get("changeNotifications"))
+
+
+def event_checks(session: Any) -> Callable[[], None]:
+    """The checks of one editor event: session lookups for the features, then document sync."""
+    has_capability = session.has_capability
+
+    def event() -> None:
+        has_capability('completionProvider')
+        has_capability('signatureHelpProvider')
+        has_capability('hoverProvider')
+        has_capability('documentHighlightProvider')
+        has_capability('colorProvider')
+        session.should_notify_did_change()
+        session.text_sync_kind()
+        session.should_notify_will_save()
+        session.should_notify_did_save()
+        session.should_notify_did_change_workspace_folders()
+
+    return event
+
+
+def run(events: int, repeat: int) -> None:
+    sessions = import_sessions_module()
+    config = sessions.ClientConfig('benchmark', [], None, [], [], None)
+    session = sessions.Session(config, [], InitializingClient())
+    cases = [
+        ('raw dict', event_checks(RawCapabilities(CAPABILITIES))),
+        ('compiled', event_checks(session)),
+    ]  # type: List[Tuple[str, Callable[[], None]]]
+    print('{:<12} {:>10} {:>12} {:>14}'.format('checks', 'events', 'best ms', 'ns per event'))
+    for name, event in cases:
+        best = min(timeit.repeat(event, number=events, repeat=repeat))
+        print('{:<12} {:>10} {:>12.3f} {:>14.1f}'.format(name, events, best * 1000, best * 1e9 / events))
+    best = min(timeit.repeat(lambda: sessions.CompiledCapabilities(CAPABILITIES), number=1000, repeat=repeat))
+    print('compiling the record once: {:.1f} us'.format(best * 1e6 / 1000))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the capability checks of a session.')
+    parser.add_argument('--events', type=int, default=100000, help='editor events per run')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per case, the best one is reported')
+    args = parser.parse_args()
+    run(args.events, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measures the client-side completion path outside of Sublime Text.
+
+For each fixture in tests/*_completion_sample.json, and for synthetic lists built by repeating their items,
+the stages that run between receiving a textDocument/completion response and looking up an inserted item are
+timed separately: JSON decoding, parse_completion_response, format_completion and CompletionIndex lookups.
+Peak memory of each stage is measured with tracemalloc in a separate, untimed pass.
+
+    python3 scripts/benchmark_completion.py --size 50000 --repeat 5
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+import argparse
+import copy
+import glob
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+import types
+
+PACKAGE_PATH = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
+FIXTURE_PATTERN = os.path.join(PACKAGE_PATH, 'tests', '*_completion_sample.json')
+WORD_COL = 4
+
+
+def import_completion_module() -> Any:
+    """Import plugin.core.completion as part of a package named LSP, the way Sublime Text loads it."""
+    if 'LSP' not in sys.modules:
+        package = types.ModuleType('LSP')
+        package.__path__ = [PACKAGE_PATH]  # type: ignore
+        sys.modules['LSP'] = package
+    from LSP.plugin.core import completion
+    return completion
+
+
+def synthetic_items(items: List[Dict[str, Any]], size: int) -> List[Dict[str, Any]]:
+    """Repeat the fixture items until there are `size` of them, keeping labels and replacements unique."""
+    result = []
+    for index in range(size):
+        item = copy.deepcopy(items[index % len(items)])
+        suffix = str(index)
+        item['label'] = item['label'] + suffix
+        if 'insertText' in item:
+            item['insertText'] = item['insertText'] + suffix
+        text_edit = item.get('textEdit')
+        if text_edit:
+            text_edit['newText'] = text_edit['newText'] + suffix
+        result.append(item)
+    return result
+
+
+def load_cases(size: int) -> List[Tuple[str, str]]:
+    cases = []
+    for path in sorted(glob.glob(FIXTURE_PATTERN)):
+        name = os.path.basename(path)[:-len('_completion_sample.json')]
+        with open(path, 'r', encoding='utf-8') as file:
+            items = json.load(file)
+        cases.append((name, json.dumps(items)))
+        if size > 0:
+            response = {'isIncomplete': False, 'items': synthetic_items(items, size)}
+            cases.append(('{}-{}'.format(name, size), json.dumps(response)))
+    return cases
+
+
+def stages(completion: Any, payload: str) -> List[Tuple[str, Callable[[], Any]]]:
+    """Build the stages of one case; each stage runs on the output of the previous one."""
+    settings = completion.Settings()
+    response = json.loads(payload)
+    items, _ = completion.parse_completion_response(response)
+    completions = [completion.format_completion(item, WORD_COL, settings) for item in items]
+    index = completion.CompletionIndex(completions)
+    inserted = [replacement for _, replacement in completions]
+
+    def lookup() -> None:
+        for text in inserted:
+            index.find(text)
+
+    return [
+        ('json decode', lambda: json.loads(payload)),
+        ('parse', lambda: completion.parse_completion_response(response)),
+        ('format', lambda: [completion.format_completion(item, WORD_COL, settings) for item in items]),
+        ('index', lambda: completion.CompletionIndex(completions)),
+        ('lookup all', lookup),
+    ]
+
+
+def peak_memory(stage: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run(size: int, repeat: int) -> None:
+    completion = import_completion_module()
+    print('{:<24} {:<12} {:>8} {:>12} {:>12}'.format('case', 'stage', 'items', 'best ms', 'peak KiB'))
+    for name, payload in load_cases(size):
+        items = len(completion.parse_completion_response(json.loads(payload))[0])
+        total = 0.0
+        for stage_name, stage in stages(completion, payload):
+            best = min(timeit.repeat(stage, number=1, repeat=repeat))
+            total += best
+            print('{:<24} {:<12} {:>8} {:>12.3f} {:>12.1f}'.format(
+                name, stage_name, items, best * 1000, peak_memory(stage) / 1024))
+        print('{:<24} {:<12} {:>8} {:>12.3f}'.format(name, 'total', items, total * 1000))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the client-side completion path.')
+    parser.add_argument('--size', type=int, default=50000,
+                        help='number of items in the synthetic lists, 0 to only use the fixtures')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per stage, the best one is reported')
+    args = parser.parse_args()
+    run(args.size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
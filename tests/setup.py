@@ -60,11 +60,11 @@ def make_stdio_test_config() -> ClientConfig:
 
 
 def add_config(config):
-    client_configs.all.append(config)
+    client_configs.add(config)
 
 
 def remove_config(config):
-    client_configs.all.remove(config)
+    client_configs.remove(config)
 
 
 def close_test_view(view: sublime.View):
@@ -112,7 +112,7 @@ class TextDocumentTestCase(DeferrableTestCase):
         self.config.init_options["serverResponse"] = server_capabilities
         add_config(self.config)
         self.wm = windows.lookup(window)
-        self.wm._configs.all.append(self.config)
+        self.wm._configs.add(self.config)
         filename = expand(join("$packages", "LSP", "tests", "{}.txt".format(test_name)), window)
         open_view = window.find_open_file(filename)
         close_test_view(open_view)
@@ -241,5 +241,5 @@ class TextDocumentTestCase(DeferrableTestCase):
         # restore the user's configs
         close_test_view(self.view)
         remove_config(self.config)
-        self.wm._configs.all.remove(self.config)
+        self.wm._configs.remove(self.config)
         yield from super().doCleanups()
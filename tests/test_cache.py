@@ -0,0 +1,43 @@
+from LSP.plugin.core.cache import LRUCache, cache_statistics
+import unittest
+
+
+class LRUCacheTests(unittest.TestCase):
+
+    def test_counts_hits_and_misses(self) -> None:
+        cache = LRUCache("test-counts", 2)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache_statistics()["test-counts"], (1, 1, 1))
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = LRUCache("test-evicts", 2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_discard_and_clear(self) -> None:
+        cache = LRUCache("test-discard", 4)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.discard("a")
+        cache.discard("missing")
+        self.assertNotIn("a", cache)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_discard_matching(self) -> None:
+        cache = LRUCache("test-discard-matching", 4)
+        cache.set((1, "a"), 1)
+        cache.set((2, "a"), 2)
+        cache.set((1, "b"), 3)
+        cache.discard_matching(lambda key: key[0] == 1)
+        self.assertEqual(len(cache), 1)
+        self.assertIn((2, "a"), cache)
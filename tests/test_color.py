@@ -0,0 +1,80 @@
+from LSP.plugin.color import ColorPhantoms, LspColorListener
+import sublime
+import unittest
+import unittest.mock
+
+try:
+    from typing import Any, Dict, List, Optional, Tuple
+    assert Any and Dict and List and Optional and Tuple
+except ImportError:
+    pass
+
+
+class FakeView(object):
+    def __init__(self) -> None:
+        self.phantoms = {}  # type: Dict[int, sublime.Region]
+        self.added = 0
+        self._window = None  # type: Optional[FakeWindow]
+
+    def add_phantom(self, key: str, region: 'sublime.Region', content: str, layout: int) -> int:
+        self.added += 1
+        self.phantoms[self.added] = region
+        return self.added
+
+    def query_phantoms(self, pids: 'List[int]') -> 'List[sublime.Region]':
+        return [self.phantoms[pid] for pid in pids]
+
+    def erase_phantom_by_id(self, pid: int) -> None:
+        del self.phantoms[pid]
+
+    def window(self) -> 'Optional[FakeWindow]':
+        return self._window
+
+
+class FakeWindow(object):
+    def __init__(self, active_view: 'Any') -> None:
+        self.active_view = active_view
+
+    def get_view_index(self, view: 'Any') -> 'Tuple[int, int]':
+        return (0, 0)
+
+    def active_view_in_group(self, group: int) -> 'Any':
+        return self.active_view
+
+
+class ColorPhantomsTests(unittest.TestCase):
+
+    def test_reuses_phantoms(self) -> None:
+        view = FakeView()
+        phantoms = ColorPhantoms(view)  # type: ignore
+        red = (sublime.Region(0, 1), "red")
+        blue = (sublime.Region(5, 6), "blue")
+        phantoms.update([red, blue])
+        self.assertEqual(view.added, 2)
+        phantoms.update([red, blue])
+        self.assertEqual(view.added, 2)
+        self.assertEqual(len(view.phantoms), 2)
+        phantoms.update([red, (sublime.Region(5, 6), "green")])
+        self.assertEqual(view.added, 3)
+        self.assertEqual(sorted(view.phantoms.keys()), [1, 3])
+
+
+class ColorListenerTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.view = FakeView()
+        self.listener = LspColorListener(self.view)  # type: ignore
+        self.listener.view = self.view  # type: ignore
+        self.listener._stored_point = 3
+
+    def test_skips_request_for_hidden_view(self) -> None:
+        self.view._window = FakeWindow(FakeView())
+        with unittest.mock.patch.object(self.listener, 'send_color_request') as send_color_request:
+            self.listener.fire_request(3)
+            send_color_request.assert_not_called()
+
+    def test_requests_for_visible_view(self) -> None:
+        self.view._window = FakeWindow(self.view)
+        with unittest.mock.patch.object(self.listener, 'send_color_request') as send_color_request:
+            self.listener.fire_request(3)
+            send_color_request.assert_called_once_with()
@@ -1,15 +1,19 @@
 from LSP.plugin.completion import CompletionHandler
 from LSP.plugin.completion import CompletionState
 from LSP.plugin.core.registry import is_supported_view
+from LSP.plugin.core.settings import settings
+from LSP.plugin.core.types import ClientConfig, LanguageConfig
 from setup import SUPPORTED_SYNTAX, TextDocumentTestCase, add_config, remove_config, text_config
 from unittesting import DeferrableTestCase
 import sublime
+import unittest
+import unittest.mock
 from sublime_plugin import view_event_listeners, ViewEventListener
 
 
 try:
-    from typing import Dict, Optional, List, Generator
-    assert Dict and Optional and List and Generator
+    from typing import Any, Callable, Dict, Optional, List, Generator, Tuple
+    assert Any and Callable and Dict and Optional and List and Generator and Tuple
 except ImportError:
     pass
 
@@ -398,6 +402,10 @@ class QueryCompletionsTests(TextDocumentTestCase):
 
             # note: ideally the handler is initialized with resolveProvider capability
             handler.resolve = True
+            assert self.session
+            # the test server does not advertise resolveProvider.
+            completion_provider = self.session.get_capability('completionProvider')
+            completion_provider['resolveProvider'] = True
 
             yield from self.await_message('textDocument/completion')
             # note: invoking on_text_command manually as sublime doesn't call it.
@@ -411,3 +419,192 @@ class QueryCompletionsTests(TextDocumentTestCase):
                 self.view.substr(sublime.Region(0, self.view.size())),
                 'import asdf;\nasdf')
             handler.resolve = False
+            completion_provider['resolveProvider'] = False
+
+
+class FakeClient(object):
+    def __init__(self) -> None:
+        self.requests = []  # type: List[Tuple[str, Callable, Optional[Callable]]]
+        self.cancelled = []  # type: List[int]
+
+    def send_request(self, request: 'Any', handler: 'Callable', error_handler: 'Optional[Callable]' = None) -> int:
+        self.requests.append((request.method, handler, error_handler))
+        return len(self.requests)
+
+    def cancel_request(self, request_id: int) -> None:
+        self.cancelled.append(request_id)
+
+    def methods(self) -> 'List[str]':
+        return [method for method, _, _ in self.requests]
+
+
+class FakeSession(object):
+    def __init__(self, name: str, resolve_provider: bool = False) -> None:
+        self.config = ClientConfig(name, [], None)
+        self.client = FakeClient()
+        self.completion_provider = {'resolveProvider': resolve_provider}
+
+    def get_capability(self, capability: str) -> 'Optional[Any]':
+        return self.completion_provider if capability == 'completionProvider' else None
+
+    def respond(self, labels: 'List[str]') -> None:
+        handler = self.client.requests[0][1]
+        handler([dict(label=label) for label in labels])
+
+
+class FakeSettings(dict):
+    def set(self, key: str, value: 'Any') -> None:
+        self[key] = value
+
+
+class FakeView(object):
+    """ A view with the caret after "." at point 4, which is not a word. """
+
+    def __init__(self) -> None:
+        self.commands = []  # type: List[str]
+        self._settings = FakeSettings()
+
+    def settings(self) -> FakeSettings:
+        return self._settings
+
+    def id(self) -> int:
+        return 1
+
+    def buffer_id(self) -> int:
+        return 1
+
+    def sel(self) -> 'List[sublime.Region]':
+        return [sublime.Region(4, 4)]
+
+    def classify(self, point: int) -> int:
+        return 0
+
+    def rowcol(self, point: int) -> 'Tuple[int, int]':
+        return (0, point)
+
+    def substr(self, region: 'Any') -> str:
+        return "."
+
+    def is_auto_complete_visible(self) -> bool:
+        return True
+
+    def run_command(self, command_name: str, args: 'Optional[Dict[str, Any]]' = None) -> None:
+        self.commands.append(command_name)
+
+
+class MultiSessionCompletionTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.first = FakeSession("first", resolve_provider=True)
+        self.second = FakeSession("second")
+        view = FakeView()
+        self.handler = CompletionHandler(view)  # type: ignore
+        self.handler.view = view  # type: ignore
+        self.handler._manager = unittest.mock.Mock()
+        self.handler.completion_sessions = lambda point=None: [self.first, self.second]  # type: ignore
+        self.handler.cache_key = lambda location, config_names: ('multi-session',)  # type: ignore
+        CompletionHandler.cache.clear()
+        self.complete_all_chars = settings.complete_all_chars
+        settings.complete_all_chars = True
+        self.handler.last_location = 4
+        with unittest.mock.patch('LSP.plugin.completion.text_document_position_params', return_value={}):
+            self.handler.do_request("", [4])
+
+    def tearDown(self) -> None:
+        settings.complete_all_chars = self.complete_all_chars
+
+    def labels(self) -> 'List[str]':
+        return [item['label'] for item in self.handler.response_items]
+
+    def test_requests_every_session(self) -> None:
+        self.assertEqual(self.first.client.methods(), ['textDocument/completion'])
+        self.assertEqual(self.second.client.methods(), ['textDocument/completion'])
+        self.assertEqual(self.handler.pending_configs, {"first", "second"})
+        self.assertEqual(self.handler.state, CompletionState.REQUESTING)
+
+    def test_merges_in_session_order(self) -> None:
+        self.second.respond(["b", "shared"])
+        self.assertFalse(self.handler.presented)
+        self.first.respond(["a", "shared"])
+        self.assertTrue(self.handler.presented)
+        # the first session's items come first, and its duplicate wins.
+        self.assertEqual(self.labels(), ["a", "shared", "b"])
+        self.assertEqual(self.handler.response_configs, ["first", "first", "second"])
+
+    def test_presents_at_deadline_and_merges_late_responses(self) -> None:
+        self.first.respond(["a"])
+        self.assertFalse(self.handler.presented)
+        self.handler.handle_deadline(self.handler.request_generation)
+        self.assertTrue(self.handler.presented)
+        self.assertEqual(self.labels(), ["a"])
+        self.second.respond(["b"])
+        self.assertEqual(self.labels(), ["a", "b"])
+
+    def test_resolves_only_with_sessions_that_support_it(self) -> None:
+        self.handler.resolve = True
+        resolve_prefetch = settings.completion_resolve_prefetch
+        settings.completion_resolve_prefetch = 10
+        try:
+            self.first.respond(["a"])
+            self.second.respond(["b"])
+        finally:
+            settings.completion_resolve_prefetch = resolve_prefetch
+        self.assertEqual(self.first.client.methods(), ['textDocument/completion', 'completionItem/resolve'])
+        self.assertEqual(self.second.client.methods(), ['textDocument/completion'])
+        self.handler.completion_session = lambda config_name: self.second  # type: ignore
+        self.handler.do_resolve(self.handler.response_items[1], "second")
+        self.assertEqual(self.second.client.methods(), ['textDocument/completion'])
+
+    def respond_with_resolves(self, labels: 'List[str]', resolve_prefetch: int) -> None:
+        self.handler.resolve = True
+        prefetch = settings.completion_resolve_prefetch
+        settings.completion_resolve_prefetch = resolve_prefetch
+        try:
+            self.first.respond(labels)
+            self.second.respond([])
+        finally:
+            settings.completion_resolve_prefetch = prefetch
+
+    def request_again(self) -> None:
+        with unittest.mock.patch('LSP.plugin.completion.text_document_position_params', return_value={}):
+            self.handler.do_request("", [4])
+
+    def test_prefetches_resolves_of_top_items(self) -> None:
+        self.respond_with_resolves(["a", "b", "c"], 2)
+        self.assertEqual(self.first.client.methods(),
+                         ['textDocument/completion', 'completionItem/resolve', 'completionItem/resolve'])
+        self.assertEqual(self.handler.pending_resolves, {0: ("first", 2), 1: ("first", 3)})
+
+    def test_cancels_stale_prefetched_resolves(self) -> None:
+        self.respond_with_resolves(["a", "b", "c"], 2)
+        # the resolve of "a" arrives, the one of "b" is still pending when the next request starts.
+        self.first.client.requests[1][1]({"label": "a", "detail": "resolved"})
+        self.assertEqual(self.handler.resolved_items, {0: {"label": "a", "detail": "resolved"}})
+        self.request_again()
+        self.assertEqual(self.first.client.cancelled, [3])
+        self.assertEqual(self.handler.pending_resolves, {})
+        self.assertEqual(self.handler.resolved_items, {})
+        # a late answer to the cancelled resolve is not kept for the new response.
+        self.first.client.requests[2][1]({"label": "b"})
+        self.assertEqual(self.handler.resolved_items, {})
+
+
+class TriggerCharacterTests(unittest.TestCase):
+
+    def test_merges_trigger_characters_of_sessions(self) -> None:
+        view = FakeView()
+        view.settings().set('lsp_language', {"first": "test", "second": "test"})
+        user_trigger = {'characters': '@', 'selector': 'source.user'}
+        view.settings().set('auto_complete_triggers', [user_trigger])
+        handler = CompletionHandler(view)  # type: ignore
+        handler.view = view  # type: ignore
+        first = FakeSession("first")
+        second = FakeSession("second")
+        for session in (first, second):
+            session.config.languages = [LanguageConfig("test", ["source.test", "source.user"], [])]
+        handler.register_trigger_chars(first, ["."])  # type: ignore
+        handler.register_trigger_chars(second, [".", ":"])  # type: ignore
+        # the second session's characters are added, the user's trigger is left alone.
+        self.assertEqual(view.settings().get('auto_complete_triggers'),
+                         [{'characters': '@', 'selector': 'source.user'},
+                          {'characters': '.:', 'selector': 'source.test'}])
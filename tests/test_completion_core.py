@@ -1,7 +1,7 @@
 import unittest
 from os import path
 import json
-from LSP.plugin.core.completion import format_completion, parse_completion_response
+from LSP.plugin.core.completion import format_completion, parse_completion_response, CompletionIndex
 from LSP.plugin.core.types import Settings
 try:
     from typing import Optional, Dict
@@ -180,3 +180,46 @@ class CompletionFormattingTests(unittest.TestCase):
                 ('device_encoding(fd)\t  os', 'device_encoding(${1:fd})$0')
             ]
         )
+
+
+class CompletionIndexTests(unittest.TestCase):
+
+    def test_exact_match(self):
+        index = CompletionIndex([('asdf', 'asdf'), ('efgh', 'efgh')])
+        self.assertEqual(index.find('efgh'), 1)
+        self.assertIsNone(index.find('efg'))
+        self.assertIsNone(index.find('efghi'))
+
+    def test_snippet_prefix_match(self):
+        index = CompletionIndex([('chdir(path)', 'chdir(${1:path})$0'), ('chmod', 'chmod')])
+        self.assertEqual(index.find('chdir(path)'), 0)
+        self.assertEqual(index.find('chdir('), 0)
+        self.assertIsNone(index.find('chdir'))
+
+    def test_first_match_wins(self):
+        index = CompletionIndex([('abs', 'abs(${1:x})'), ('abs', 'abs('), ('abs', 'abs(${1:y})')])
+        self.assertEqual(index.find('abs('), 0)
+
+    def test_escaped_dollar_is_not_a_placeholder(self):
+        index = CompletionIndex([('$this', '\\$this')])
+        self.assertEqual(index.find('\\$this'), 0)
+
+    def test_matches_linear_scan_for_samples(self):
+
+        def linear_find(completions, inserted):
+            for index, completion in enumerate(completions):
+                replacement = completion[1]
+                snippet_offset = replacement.find('$', 2)
+                if snippet_offset > -1:
+                    if inserted.startswith(replacement[:snippet_offset]):
+                        return index
+                elif replacement == inserted:
+                    return index
+            return None
+
+        for sample in (pyls_completion_sample, clangd_completion_sample, intelephense_completion_sample):
+            completions = [format_completion(item, 1, settings) for item in sample]
+            index = CompletionIndex(completions)
+            for completion in completions:
+                for inserted in (completion[1], completion[1][:4], completion[1] + "(x)"):
+                    self.assertEqual(index.find(inserted), linear_find(completions, inserted))
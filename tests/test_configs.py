@@ -2,7 +2,7 @@ from unittesting import DeferrableTestCase
 import unittest
 import sublime
 from os.path import dirname
-from LSP.plugin.core.settings import client_configs, read_client_config, update_client_config
+from LSP.plugin.core.settings import ClientConfigs, client_configs, read_client_config, update_client_config
 from LSP.plugin.core.registry import windows
 
 test_file_path = dirname(__file__) + "/testfile.txt"
@@ -71,6 +71,14 @@ class ConfigTests(DeferrableTestCase):
             self.assertFalse(config.enabled)
             self.assertEqual(1, len(config.languages))
 
+    def test_add_and_remove_update_syntax_index(self):
+        configs = ClientConfigs()
+        config = read_client_config("test", {"command": [], "languages": [{"syntaxes": ["Plain Text"]}]})
+        configs.add(config)
+        self.assertTrue(configs.is_syntax_supported("Plain Text"))
+        configs.remove(config)
+        self.assertFalse(configs.is_syntax_supported("Plain Text"))
+
 
 class WindowConfigTests(DeferrableTestCase):
 
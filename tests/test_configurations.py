@@ -6,6 +6,7 @@ from test_mocks import MockView
 from test_mocks import MockWindow
 from test_mocks import TEST_CONFIG, DISABLED_CONFIG
 from test_mocks import TEST_LANGUAGE
+from LSP.plugin.core.types import ClientConfig, index_configs_by_syntax, LanguageConfig
 import unittest
 
 
@@ -112,6 +113,15 @@ class WindowConfigManagerTests(unittest.TestCase):
         manager.update()
         self.assertEqual([], manager.syntax_configs(view))
 
+    def test_add_and_remove_update_syntax_index(self):
+        view = MockView(__file__)
+        manager = WindowConfigManager(MockWindow(), [])
+        manager.add(TEST_CONFIG)
+        self.assertTrue(manager.syntax_supported(view))
+        self.assertEqual(manager.syntax_configs(view), [TEST_CONFIG])
+        manager.remove(TEST_CONFIG)
+        self.assertFalse(manager.syntax_supported(view))
+
 
 class IsSupportedSyntaxTests(unittest.TestCase):
 
@@ -121,3 +131,14 @@ class IsSupportedSyntaxTests(unittest.TestCase):
     def test_single_config(self):
         self.assertEqual(TEST_LANGUAGE.syntaxes[0], TEST_CONFIG.languages[0].syntaxes[0])
         self.assertTrue(is_supported_syntax(TEST_LANGUAGE.syntaxes[0], [TEST_CONFIG]))
+
+
+class IndexConfigsBySyntaxTests(unittest.TestCase):
+
+    def test_indexes_configs_in_order(self):
+        other_language = LanguageConfig("other", ["source.other"], ["Plain Text", "Other"])
+        other_config = ClientConfig("other", [], None, languages=[other_language, TEST_LANGUAGE])
+        index = index_configs_by_syntax([TEST_CONFIG, other_config])
+        self.assertEqual(index["Plain Text"], [(TEST_CONFIG, TEST_LANGUAGE), (other_config, other_language)])
+        self.assertEqual(index["Other"], [(other_config, other_language)])
+        self.assertNotIn("asdf", index)
@@ -92,6 +92,34 @@ class WindowDocumentHandlerTests(unittest.TestCase):
         self.assertIn(basename(__file__), document.get("uri"))
         self.assertFalse(__file__ in handler._document_states)
 
+    def test_sends_did_open_to_added_session_only(self):
+        view = MockView(__file__)
+        window = MockWindow([[view]])
+        folders = [WorkspaceFolder.from_path("/")]
+        view.set_window(window)
+        workspace = ProjectFolders(window)
+        configs = MockConfigs()
+        test_config2 = ClientConfig("test2", [], None, languages=[TEST_LANGUAGE])
+        configs.add(test_config2)
+        handler = WindowDocumentHandler(test_sublime, MockSettings(), window, workspace, configs)
+        client = MockClient()
+        session = self.assert_if_none(
+            create_session(TEST_CONFIG, folders, dict(), MockSettings(),
+                           bootstrap_client=client))
+        handler.add_session(session)
+        handler.handle_did_open(view)
+        self.assertEqual(len(client._notifications), 1)
+
+        # e.g. a restarted server, the documents are opened with it but not again with the running one.
+        client2 = MockClient()
+        session2 = self.assert_if_none(
+            create_session(test_config2, folders, dict(), MockSettings(),
+                           bootstrap_client=client2))
+        handler.add_session(session2)
+        self.assertEqual(len(client._notifications), 1)
+        self.assertEqual(len(client2._notifications), 1)
+        self.assertEqual(client2._notifications[0].method, "textDocument/didOpen")
+
     def test_sends_did_open_to_multiple_sessions(self):
         view = MockView(__file__)
         window = MockWindow([[view]])
@@ -107,7 +135,7 @@ class WindowDocumentHandlerTests(unittest.TestCase):
                            bootstrap_client=client))
         client2 = MockClient()
         test_config2 = ClientConfig("test2", [], None, languages=[TEST_LANGUAGE])
-        configs.all.append(test_config2)
+        configs.add(test_config2)
         session2 = self.assert_if_none(
             create_session(test_config2, folders, dict(), MockSettings(),
                            bootstrap_client=client2))
@@ -0,0 +1,114 @@
+from LSP.plugin.goto import LspGotoCommand, prefetch_definition, cancel_definition_prefetches
+from LSP.plugin.goto import definition_cache, _prefetches
+import sublime
+import unittest
+import unittest.mock
+
+try:
+    from typing import Any, Callable, List, Optional, Tuple
+    assert Any and Callable and List and Optional and Tuple
+except ImportError:
+    pass
+
+
+class FakeClient(object):
+    def __init__(self) -> None:
+        self.requests = []  # type: List[Tuple[Any, Callable, Callable]]
+        self.cancelled = []  # type: List[int]
+
+    def send_request(self, request: 'Any', handler: 'Callable', error_handler: 'Callable') -> int:
+        self.requests.append((request, handler, error_handler))
+        return len(self.requests)
+
+    def cancel_request(self, request_id: int) -> None:
+        self.cancelled.append(request_id)
+
+
+class FakeSession(object):
+    def __init__(self) -> None:
+        self.requests = []  # type: List[Tuple[Any, Callable]]
+
+    def send_request(self, request: 'Any', handler: 'Callable', error_handler: 'Optional[Callable]' = None,
+                     capability: 'Optional[str]' = None) -> None:
+        self.requests.append((request, handler))
+
+
+class FakeView(object):
+    def __init__(self) -> None:
+        self.changes = 0
+
+    def buffer_id(self) -> int:
+        return 1
+
+    def change_count(self) -> int:
+        return self.changes
+
+    def word(self, point: int) -> 'sublime.Region':
+        return sublime.Region(0, 5)
+
+
+class DefinitionPrefetchTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        definition_cache.clear()
+        _prefetches.clear()
+        self.client = FakeClient()
+        self.session = FakeSession()
+        self.view = FakeView()
+        self.command = LspGotoCommand(self.view)  # type: ignore
+        self.command.view = self.view  # type: ignore
+        self.command.goto_kind = "definition"
+        self.responses = []  # type: List[Any]
+        self.command.handle_response = self.responses.append  # type: ignore
+        patches = [
+            unittest.mock.patch('LSP.plugin.goto.settings.definition_prefetch', True),
+            unittest.mock.patch('LSP.plugin.goto.position_is_word', return_value=True),
+            unittest.mock.patch('LSP.plugin.goto.session_for_view', return_value=self.session),
+            unittest.mock.patch('LSP.plugin.goto.client_from_session', return_value=self.client),
+            unittest.mock.patch('LSP.plugin.goto.session_for_view_or_starting', return_value=self.session),
+            unittest.mock.patch('LSP.plugin.goto.get_position', return_value=2),
+            unittest.mock.patch('LSP.plugin.goto.text_document_position_params', return_value={})
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def goto(self) -> None:
+        self.command.run(None)  # type: ignore
+
+    def test_uses_prefetched_definition(self) -> None:
+        prefetch_definition(self.view, 2)  # type: ignore
+        self.client.requests[0][1]({"uri": "file:///a.py"})
+        self.goto()
+        self.assertEqual(self.responses, [{"uri": "file:///a.py"}])
+        self.assertEqual(self.session.requests, [])
+
+    def test_joins_prefetch_in_flight(self) -> None:
+        prefetch_definition(self.view, 2)  # type: ignore
+        self.goto()
+        self.assertEqual(self.responses, [])
+        self.client.requests[0][1]({"uri": "file:///a.py"})
+        self.assertEqual(self.responses, [{"uri": "file:///a.py"}])
+        self.assertEqual(self.session.requests, [])
+
+    def test_requests_without_prefetch(self) -> None:
+        self.goto()
+        self.assertEqual(len(self.session.requests), 1)
+        self.assertEqual(self.responses, [])
+
+    def test_discards_stale_prefetch_after_edit(self) -> None:
+        prefetch_definition(self.view, 2)  # type: ignore
+        self.view.changes += 1
+        cancel_definition_prefetches(self.view)  # type: ignore
+        self.assertEqual(self.client.cancelled, [1])
+        self.assertEqual(_prefetches, {})
+        self.goto()
+        self.assertEqual(len(self.session.requests), 1)
+
+    def test_keeps_prefetch_a_goto_waits_for(self) -> None:
+        prefetch_definition(self.view, 2)  # type: ignore
+        self.goto()
+        cancel_definition_prefetches(self.view)  # type: ignore
+        self.assertEqual(self.client.cancelled, [])
+        self.client.requests[0][1](None)
+        self.assertEqual(self.responses, [None])
@@ -0,0 +1,88 @@
+from LSP.plugin.highlights import DocumentHighlightListener, highlight_cache
+from LSP.plugin.highlights import MIN_HIGHLIGHT_DELAY, MAX_HIGHLIGHT_DELAY
+import sublime
+import unittest
+import unittest.mock
+
+try:
+    from typing import Any, Dict, List
+    assert Any and Dict and List
+except ImportError:
+    pass
+
+
+class FakeView(object):
+    def __init__(self) -> None:
+        self.point = 0
+        self.changes = 0
+        self.regions = {}  # type: Dict[str, Any]
+
+    def sel(self) -> 'List[sublime.Region]':
+        return [sublime.Region(self.point, self.point)]
+
+    def classify(self, point: int) -> int:
+        return 1
+
+    def match_selector(self, point: int, selector: str) -> bool:
+        return False
+
+    def word(self, point: int) -> 'sublime.Region':
+        # words of five characters, one after another.
+        begin = point - point % 5
+        return sublime.Region(begin, begin + 5)
+
+    def buffer_id(self) -> int:
+        return 1
+
+    def change_count(self) -> int:
+        return self.changes
+
+    def erase_regions(self, key: str) -> None:
+        self.regions.pop(key, None)
+
+    def add_regions(self, key: str, regions: 'List[sublime.Region]', **kwargs: 'Any') -> None:
+        self.regions[key] = regions
+
+
+class HighlightTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        highlight_cache.clear()
+        self.view = FakeView()
+        self.listener = DocumentHighlightListener(self.view)  # type: ignore
+        self.listener.view = self.view  # type: ignore
+
+    def test_clamps_delay(self) -> None:
+        self.listener._latency = 10
+        self.assertEqual(self.listener._delay(), MIN_HIGHLIGHT_DELAY)
+        self.listener._latency = 150
+        self.assertEqual(self.listener._delay(), 300)
+        self.listener._latency = 1000
+        self.assertEqual(self.listener._delay(), MAX_HIGHLIGHT_DELAY)
+
+    def test_updates_latency_average(self) -> None:
+        self.listener._latency = 100
+        key = self.listener._word_key(0)
+        assert key
+        with unittest.mock.patch('LSP.plugin.highlights.time.time', return_value=10.2):
+            self.listener._handle_response(key, 10.0, [])
+        self.assertAlmostEqual(self.listener._latency, 0.7 * 100 + 0.3 * 200)
+
+    def test_reuses_cached_highlights_at_same_change_count(self) -> None:
+        key = self.listener._word_key(0)
+        assert key
+        highlight_cache.set(key, {"text": [sublime.Region(0, 5)]})
+        with unittest.mock.patch('LSP.plugin.highlights.sublime.set_timeout_async') as set_timeout_async:
+            self.view.point = 7
+            self.listener._queue()
+            set_timeout_async.assert_called_once()
+            self.assertEqual(self.view.regions, {})
+            self.view.point = 2
+            self.listener._queue()
+            set_timeout_async.assert_called_once()
+            self.assertIn("lsp_highlight_text", self.view.regions)
+            self.view.changes += 1
+            self.view.point = 3
+            self.listener._queue()
+            self.assertEqual(set_timeout_async.call_count, 2)
+            self.assertEqual(self.view.regions, {})
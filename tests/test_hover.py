@@ -0,0 +1,89 @@
+from LSP.plugin.core.types import ClientConfig
+from LSP.plugin.hover import LspHoverCommand, hover_cache, _hovers_in_flight
+import sublime
+import unittest
+import unittest.mock
+
+try:
+    from typing import Any, Callable, List, Optional, Tuple
+    assert Any and Callable and List and Optional and Tuple
+except ImportError:
+    pass
+
+
+class FakeSession(object):
+    def __init__(self) -> None:
+        self.config = ClientConfig("test", [], None)
+        self.client = object()
+        self.requests = []  # type: List[Tuple[Any, Callable, Callable]]
+
+    def send_request(self, request: 'Any', handler: 'Callable', error_handler: 'Callable',
+                     capability: 'Optional[str]' = None) -> None:
+        self.requests.append((request, handler, error_handler))
+
+
+class FakeView(object):
+    def __init__(self) -> None:
+        self.changes = 0
+
+    def buffer_id(self) -> int:
+        return 1
+
+    def change_count(self) -> int:
+        return self.changes
+
+    def word(self, point: int) -> 'sublime.Region':
+        return sublime.Region(0, 5)
+
+
+class HoverCacheTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        hover_cache.clear()
+        _hovers_in_flight.clear()
+        self.session = FakeSession()
+        self.view = FakeView()
+        self.command = LspHoverCommand(self.view)  # type: ignore
+        self.command.view = self.view  # type: ignore
+        self.responses = []  # type: List[Any]
+        self.command.handle_response = lambda response, point: self.responses.append(response)  # type: ignore
+        patches = [
+            unittest.mock.patch('LSP.plugin.hover.session_for_view_or_starting', return_value=self.session),
+            unittest.mock.patch('LSP.plugin.hover.text_document_position_params', return_value={})
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def respond(self, index: int, response: 'Any') -> None:
+        self.session.requests[index][1](response)
+
+    def test_answers_from_cache(self) -> None:
+        self.command.request_symbol_hover(2)
+        self.respond(0, "contents")
+        self.command.request_symbol_hover(3)
+        self.assertEqual(len(self.session.requests), 1)
+        self.assertEqual(self.responses, ["contents", "contents"])
+
+    def test_joins_request_in_flight(self) -> None:
+        self.command.request_symbol_hover(2)
+        self.command.request_symbol_hover(4)
+        self.assertEqual(len(self.session.requests), 1)
+        self.assertEqual(self.responses, [])
+        self.respond(0, "contents")
+        self.assertEqual(self.responses, ["contents", "contents"])
+
+    def test_requests_again_after_change(self) -> None:
+        self.command.request_symbol_hover(2)
+        self.respond(0, "old")
+        self.view.changes += 1
+        self.command.request_symbol_hover(2)
+        self.assertEqual(len(self.session.requests), 2)
+        self.respond(1, "new")
+        self.assertEqual(self.responses, ["old", "new"])
+
+    def test_requests_again_after_error(self) -> None:
+        self.command.request_symbol_hover(2)
+        self.session.requests[0][2](None)
+        self.command.request_symbol_hover(2)
+        self.assertEqual(len(self.session.requests), 2)
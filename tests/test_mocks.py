@@ -102,6 +102,9 @@ class MockView(object):
     def score_selector(self, region, scope: str) -> int:
         return 1
 
+    def scope_name(self, point: int) -> str:
+        return "text.plain "
+
     def buffer_id(self):
         return 1
 
@@ -194,7 +197,11 @@ class MockWindow(object):
         return views
 
     def find_open_file(self, path: str) -> Optional[ViewLike]:
-        pass
+        for views_in_group in self._files_in_groups:
+            for view in views_in_group:
+                if view.file_name() == path:
+                    return view
+        return None
 
     def run_command(self, command_name: str, command_args: Dict[str, Any]) -> None:
         self.commands.append((command_name, command_args))
@@ -208,6 +215,7 @@ class TestGlobalConfigs(object):
 class MockConfigs(object):
     def __init__(self):
         self.all = [TEST_CONFIG]
+        self.generation = 0
 
     def is_supported(self, view):
         return any(self.scope_configs(view))
@@ -236,6 +244,14 @@ class MockConfigs(object):
     def update(self) -> None:
         pass
 
+    def add(self, config: ClientConfig) -> None:
+        self.all.append(config)
+        self.generation += 1
+
+    def remove(self, config: ClientConfig) -> None:
+        self.all.remove(config)
+        self.generation += 1
+
     def enable_config(self, config_name: str) -> None:
         pass
 
@@ -294,6 +310,7 @@ class MockClient(object):
         self.responses = basic_responses
         self._notifications = []  # type: List[Notification]
         self._async_response_callback = async_response
+        self.last_activity = 0.0
 
     def send_request(self, request: Request, on_success: Callable, on_error: Callable = None) -> None:
         response = self.responses.get(request.method)
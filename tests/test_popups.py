@@ -0,0 +1,41 @@
+from LSP.plugin.core.popups import MarkupRenderer
+import unittest
+import unittest.mock
+
+try:
+    from typing import Any, Dict
+    assert Any and Dict
+except ImportError:
+    pass
+
+
+class FakeView(object):
+    def __init__(self) -> None:
+        self._settings = {"color_scheme": "Monokai.sublime-color-scheme"}  # type: Dict[str, Any]
+
+    def settings(self) -> 'Dict[str, Any]':
+        return self._settings
+
+
+class MarkupRendererTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.view = FakeView()
+        self.renderer = MarkupRenderer(4)
+        patch = unittest.mock.patch('LSP.plugin.core.popups.mdpopups.md2html',
+                                    side_effect=lambda view, markdown: "<p>{}</p>".format(markdown))
+        self.md2html = patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_reuses_rendered_markup(self) -> None:
+        self.assertEqual(self.renderer.md2html(self.view, "a"), "<p>a</p>")  # type: ignore
+        self.assertEqual(self.renderer.md2html(self.view, "a"), "<p>a</p>")  # type: ignore
+        self.assertEqual(self.md2html.call_count, 1)
+        self.renderer.md2html(self.view, "b")  # type: ignore
+        self.assertEqual(self.md2html.call_count, 2)
+
+    def test_renders_again_for_other_color_scheme(self) -> None:
+        self.renderer.md2html(self.view, "a")  # type: ignore
+        self.view.settings()["color_scheme"] = "Mariana.sublime-color-scheme"
+        self.renderer.md2html(self.view, "a")  # type: ignore
+        self.assertEqual(self.md2html.call_count, 2)
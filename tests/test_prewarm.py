@@ -0,0 +1,62 @@
+from LSP.plugin.core.prewarm import find_files_by_extension, syntax_file_extensions
+import os
+import tempfile
+import unittest
+
+
+SUBLIME_SYNTAX = """%YAML 1.2
+---
+name: Python
+file_extensions:
+  - py
+  - pyw  # windowed
+  - SConstruct
+first_line_match: ^#!\\s*/.*\\bpython
+scope: source.python
+"""
+
+TM_LANGUAGE = """<plist version="1.0"><dict>
+  <key>fileTypes</key>
+  <array>
+    <string>rs</string>
+  </array>
+  <key>name</key>
+  <string>Rust</string>
+</dict></plist>
+"""
+
+
+class SyntaxFileExtensionsTest(unittest.TestCase):
+
+    def test_sublime_syntax(self) -> None:
+        self.assertEqual(syntax_file_extensions("Packages/Python/Python.sublime-syntax", SUBLIME_SYNTAX),
+                         ["py", "pyw", "sconstruct"])
+
+    def test_inline_list(self) -> None:
+        content = "name: C\nfile_extensions: [c, 'h']\nscope: source.c\n"
+        self.assertEqual(syntax_file_extensions("Packages/C++/C.sublime-syntax", content), ["c", "h"])
+
+    def test_tm_language(self) -> None:
+        self.assertEqual(syntax_file_extensions("Packages/Rust/Rust.tmLanguage", TM_LANGUAGE), ["rs"])
+
+    def test_no_extensions(self) -> None:
+        self.assertEqual(syntax_file_extensions("Packages/Foo/Foo.sublime-syntax", "name: Foo\n"), [])
+
+
+class FindFilesByExtensionTest(unittest.TestCase):
+
+    def test_finds_one_file_per_extension(self) -> None:
+        with tempfile.TemporaryDirectory() as folder:
+            os.makedirs(os.path.join(folder, "src"))
+            os.makedirs(os.path.join(folder, ".git"))
+            for name in ("src/main.rs", ".git/config.py", "Makefile"):
+                open(os.path.join(folder, name), "w").close()
+            found = find_files_by_extension([folder], {"rs", "py", "makefile"})
+            self.assertEqual(found, {"rs": os.path.join(folder, "src", "main.rs"),
+                                     "makefile": os.path.join(folder, "Makefile")})
+
+    def test_stops_at_limit(self) -> None:
+        with tempfile.TemporaryDirectory() as folder:
+            for index in range(3):
+                open(os.path.join(folder, "{}.txt".format(index)), "w").close()
+            self.assertEqual(find_files_by_extension([folder], {"py"}, limit=2), {})
@@ -1,15 +1,19 @@
 from LSP.plugin.core.protocol import TextDocumentSyncKindFull, TextDocumentSyncKindNone, TextDocumentSyncKindIncremental
+from LSP.plugin.core.protocol import ErrorCode
+from LSP.plugin.core.protocol import Request
 from LSP.plugin.core.protocol import WorkspaceFolder
 from LSP.plugin.core.sessions import clear_dotted_value
-from LSP.plugin.core.sessions import create_session, Session, get_initialize_params
+from LSP.plugin.core.sessions import create_session, Session, get_initialize_params, start_session
 from LSP.plugin.core.sessions import set_dotted_value
 from LSP.plugin.core.types import ClientConfig
+from LSP.plugin.core.types import ClientStates
 from LSP.plugin.core.types import Settings
-from LSP.plugin.core.typing import Optional
+from LSP.plugin.core.typing import Any, Callable, List, Optional
 from test_mocks import MockClient
 from test_mocks import TEST_CONFIG
 from test_mocks import TEST_LANGUAGE
 import sublime
+import threading
 import unittest
 import unittest.mock
 
@@ -276,3 +280,69 @@ class SessionTest(unittest.TestCase):
         self.assertFalse(session.should_notify_will_save())
         self.assertFalse(session.should_request_will_save_wait_until())
         self.assertEqual(session.should_notify_did_save(), (False, False))
+
+    def test_capability_checks_follow_registrations(self) -> None:
+        client = MockClient()
+        client.responses = {'initialize': {'capabilities': {'textDocumentSync': {"openClose": True}}}}
+        session = Session(TEST_CONFIG, [], client)
+        self.assertFalse(session.has_capability("hoverProvider"))
+        self.assertFalse(session.should_notify_did_change())
+        session._handle_register_capability({"registrations": [
+            {"method": "textDocument/hover", "id": "1"},
+            {"method": "textDocument/didChange", "id": "2", "registerOptions": {"syncKind": 1}}]}, 1)
+        self.assertTrue(session.has_capability("hoverProvider"))
+        self.assertEqual(session.text_sync_kind(), TextDocumentSyncKindIncremental)
+        self.assertTrue(session.should_notify_did_change())
+        session._handle_unregister_capability({"unregisterations": [
+            {"method": "textDocument/hover", "id": "1"},
+            {"method": "textDocument/didChange", "id": "2"}]}, 2)
+        self.assertFalse(session.has_capability("hoverProvider"))
+        self.assertFalse(session.should_notify_did_change())
+
+    def test_queues_requests_until_initialized(self) -> None:
+        initialize_responses = []  # type: List[Callable[[], None]]
+        client = MockClient(async_response=initialize_responses.append)
+        session = Session(TEST_CONFIG, [], client)
+        self.assertEqual(session.state, ClientStates.STARTING)
+        sent = []  # type: List[str]
+        client.send_request = lambda request, on_success, on_error=None: sent.append(request.method)
+
+        errors = []  # type: List[Any]
+        session.send_request(Request.hover({}), lambda response: None, errors.append, 'hoverProvider')
+        session.send_request(Request.references({}), lambda response: None, errors.append, 'referencesProvider')
+        session.send_request(Request.hover({}), lambda response: None, errors.append, 'hoverProvider')
+        session.send_request(Request.rename({}), lambda response: None, errors.append, 'renameProvider')
+        # the first hover is superseded by the second one.
+        self.assertEqual([error["code"] for error in errors], [ErrorCode.RequestCancelled])
+        self.assertEqual(sent, [])
+
+        initialize_responses[0]()
+        self.assertEqual(session.state, ClientStates.READY)
+        # the mock server has no references and rename providers.
+        self.assertEqual(sent, ["textDocument/hover"])
+        self.assertEqual(len(errors), 3)
+
+    def test_start_session_reports_failure(self) -> None:
+        exited = threading.Event()
+        failures = []  # type: List[str]
+        session = start_session(
+            ClientConfig("test", [], None, languages=[TEST_LANGUAGE]), [], dict(), Settings(),
+            on_post_exit=lambda config_name: exited.set(),
+            on_start_failed=lambda session, error: failures.append(error))
+        self.assertTrue(exited.wait(5))
+        self.assertEqual(failures, ["No way to start session"])
+        self.assertEqual(session.state, ClientStates.STOPPING)
+        self.assertIsNone(session.client)
+
+    def test_session_ended_while_connecting(self) -> None:
+        post_initialize_callback = unittest.mock.Mock()
+        post_exit_callback = unittest.mock.Mock()
+        session = Session(TEST_CONFIG, [], None, on_post_initialize=post_initialize_callback,
+                          on_post_exit=post_exit_callback)
+        self.assertEqual(session.state, ClientStates.STARTING)
+        session.end()
+        post_exit_callback.assert_not_called()
+        session.connected(MockClient())
+        assert post_exit_callback.call_count == 1
+        post_initialize_callback.assert_not_called()
+        self.assertIsNone(session.client)
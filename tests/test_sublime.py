@@ -23,6 +23,10 @@ def set_timeout_async(callback, duration):
     _callback = callback
 
 
+def set_timeout(callback, duration):
+    set_timeout_async(callback, duration)
+
+
 def _run_timeout():
     global _callback
     if _callback:
@@ -0,0 +1,85 @@
+from LSP.plugin.core.symbol_index import SymbolIndex, flatten_document_symbols, matches_query
+import os
+import shutil
+import tempfile
+import unittest
+
+
+def symbol(name: str, uri: str = 'file:///a.py', line: int = 0, kind: int = 12) -> dict:
+    position = {'line': line, 'character': 0}
+    return {'name': name, 'kind': kind, 'location': {'uri': uri, 'range': {'start': position, 'end': position}}}
+
+
+class SymbolIndexTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'nested', 'index.json')
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def test_matches_query(self) -> None:
+        self.assertTrue(matches_query('gtv', 'get_value'))
+        self.assertTrue(matches_query('GV', 'get_value'))
+        self.assertFalse(matches_query('vg', 'get_value'))
+
+    def test_flatten_document_symbols(self) -> None:
+        position = {'line': 1, 'character': 0}
+        range_ = {'start': position, 'end': position}
+        items = [{'name': 'Foo', 'kind': 5, 'range': range_, 'selectionRange': range_,
+                  'children': [{'name': 'bar', 'kind': 6, 'range': range_, 'selectionRange': range_}]}]
+        symbols = flatten_document_symbols('file:///a.py', items)
+        self.assertEqual([s['name'] for s in symbols], ['Foo', 'bar'])
+        self.assertEqual(symbols[1]['containerName'], 'Foo')
+        self.assertEqual(symbols[1]['location'], {'uri': 'file:///a.py', 'range': range_})
+
+    def test_persists_and_queries(self) -> None:
+        index = SymbolIndex(self.path)
+        index.load()
+        self.assertTrue(index.is_loaded())
+        self.assertTrue(index.is_empty())
+        index.set_document_symbols('file:///a.py', [symbol('get_value'), symbol('set_value', line=3)])
+        index.save()
+
+        loaded = SymbolIndex(self.path)
+        loaded.load()
+        self.assertEqual([s['name'] for s in loaded.query('get')], ['get_value'])
+        self.assertEqual(len(loaded.query('value')), 2)
+
+    def test_merges_workspace_results(self) -> None:
+        index = SymbolIndex(self.path)
+        index.set_document_symbols('file:///a.py', [symbol('get_value'), symbol('other_value', line=5)])
+        index.add_workspace_symbols([symbol('get_value', line=2), symbol('new_value', 'file:///b.py')])
+        # the server's matching rules may differ, so symbols missing from the results are kept.
+        self.assertEqual(sorted((s['name'], s['location']['range']['start']['line']) for s in index.query('value')),
+                         [('get_value', 2), ('new_value', 0), ('other_value', 5)])
+
+    def test_load_keeps_newer_symbols(self) -> None:
+        saved = SymbolIndex(self.path)
+        saved.load()
+        saved.set_document_symbols('file:///a.py', [symbol('old')])
+        saved.set_document_symbols('file:///b.py', [symbol('kept')])
+        saved.save()
+
+        index = SymbolIndex(self.path)
+        index.set_document_symbols('file:///a.py', [symbol('new')])
+        # not read yet, saving would lose the other documents.
+        index.save()
+        self.assertFalse(index.is_loaded())
+        index.load()
+        self.assertEqual(sorted(s['name'] for s in index.query('')), ['kept', 'new'])
+
+    def test_keeps_documents_missing_from_workspace_results(self) -> None:
+        index = SymbolIndex(self.path)
+        index.set_document_symbols('file:///a.py', [symbol('get_value')])
+        index.add_workspace_symbols([symbol('set_value', 'file:///b.py')])
+        self.assertEqual(sorted(s['name'] for s in index.query('value')), ['get_value', 'set_value'])
+
+    def test_replaces_document_symbols(self) -> None:
+        index = SymbolIndex(self.path)
+        index.set_document_symbols('file:///a.py', [symbol('old')])
+        index.set_document_symbols('file:///a.py', [symbol('new')])
+        self.assertEqual([s['name'] for s in index.query('')], ['new'])
+        index.set_document_symbols('file:///a.py', [])
+        self.assertTrue(index.is_empty())
@@ -0,0 +1,165 @@
+from LSP.plugin.symbols import request_document_symbols, document_symbol_cache, _document_symbols_in_flight
+from LSP.plugin.symbols import LspWorkspaceSymbolsAsYouTypeCommand, workspace_symbol_cache
+import unittest
+import unittest.mock
+
+try:
+    from typing import Any, Callable, List, Optional, Tuple
+    assert Any and Callable and List and Optional and Tuple
+except ImportError:
+    pass
+
+
+class FakeClient(object):
+    def __init__(self) -> None:
+        self.requests = []  # type: List[Tuple[Any, Callable, Callable]]
+        self.cancelled = []  # type: List[int]
+
+    def send_request(self, request: 'Any', handler: 'Callable', error_handler: 'Callable') -> int:
+        self.requests.append((request, handler, error_handler))
+        return len(self.requests)
+
+    def cancel_request(self, request_id: int) -> None:
+        self.cancelled.append(request_id)
+
+
+class FakeSession(object):
+    def __init__(self) -> None:
+        self.client = FakeClient()
+
+
+class FakeWindow(object):
+    def folders(self) -> 'List[str]':
+        return []
+
+
+class FakeView(object):
+    def __init__(self) -> None:
+        self.changes = 0
+        self.status = None  # type: Optional[str]
+
+    def buffer_id(self) -> int:
+        return 1
+
+    def change_count(self) -> int:
+        return self.changes
+
+    def file_name(self) -> str:
+        return "/a.py"
+
+    def window(self) -> FakeWindow:
+        return FakeWindow()
+
+    def set_status(self, key: str, value: str) -> None:
+        self.status = value
+
+    def erase_status(self, key: str) -> None:
+        self.status = None
+
+
+class DocumentSymbolCacheTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        document_symbol_cache.clear()
+        _document_symbols_in_flight.clear()
+        self.session = FakeSession()
+        self.view = FakeView()
+        self.results = []  # type: List[List[Any]]
+        patch = unittest.mock.patch('LSP.plugin.symbols.session_for_view', return_value=self.session)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def request(self) -> None:
+        request_document_symbols(self.view, self.results.append)  # type: ignore
+
+    def test_reuses_symbols_of_same_change_count(self) -> None:
+        self.request()
+        self.session.client.requests[0][1]([{"name": "a"}])
+        self.request()
+        self.assertEqual(len(self.session.client.requests), 1)
+        self.assertEqual(self.results, [[{"name": "a"}], [{"name": "a"}]])
+
+    def test_misses_after_change(self) -> None:
+        self.request()
+        self.session.client.requests[0][1]([{"name": "a"}])
+        self.view.changes += 1
+        self.request()
+        self.assertEqual(len(self.session.client.requests), 2)
+        self.session.client.requests[1][1]([{"name": "b"}])
+        self.assertEqual(self.results, [[{"name": "a"}], [{"name": "b"}]])
+
+
+class WorkspaceSymbolsAsYouTypeTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        workspace_symbol_cache.clear()
+        self.client = FakeClient()
+        self.view = FakeView()
+        self.command = LspWorkspaceSymbolsAsYouTypeCommand(self.view)  # type: ignore
+        self.command.view = self.view  # type: ignore
+        self.timeouts = []  # type: List[Callable[[], None]]
+        patches = [
+            unittest.mock.patch('LSP.plugin.symbols.sublime.set_timeout',
+                                side_effect=lambda callback, delay: self.timeouts.append(callback)),
+            unittest.mock.patch.object(self.command, 'client_with_capability', return_value=self.client),
+            unittest.mock.patch.object(self.command, '_update_index')
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def type(self, query: str) -> None:
+        for length in range(1, len(query) + 1):
+            self.command.on_change(query[:length])
+
+    def pause(self) -> None:
+        timeouts, self.timeouts = self.timeouts, []
+        for callback in timeouts:
+            callback()
+
+    def queries(self) -> 'List[str]':
+        return [request.params["query"] for request, _, _ in self.client.requests]
+
+    def test_requests_once_typing_pauses(self) -> None:
+        self.type("foo")
+        self.assertEqual(self.queries(), [])
+        self.pause()
+        self.assertEqual(self.queries(), ["foo"])
+
+    def test_requests_each_query_from_server(self) -> None:
+        self.type("fo")
+        self.pause()
+        self.client.requests[0][1]([{"name": "foo"}, {"name": "fob"}])
+        self.assertEqual(self.view.status, "2 symbols for 'fo': foo, fob")
+        self.command.on_change("foo")
+        self.pause()
+        self.assertEqual(self.queries(), ["fo", "foo"])
+
+    def test_reuses_results_of_earlier_query(self) -> None:
+        self.type("fo")
+        self.pause()
+        self.client.requests[0][1]([{"name": "foo"}])
+        self.command.on_change("foo")
+        self.command.on_change("fo")
+        self.pause()
+        self.assertEqual(self.queries(), ["fo"])
+        self.assertEqual(self.view.status, "1 symbols for 'fo': foo")
+
+    def test_cancels_request_for_query_typed_over(self) -> None:
+        self.type("fo")
+        self.pause()
+        self.command.on_change("foo")
+        self.assertEqual(self.client.cancelled, [1])
+        self.assertIsNone(self.command.pending_request)
+        self.client.requests[0][1]([{"name": "fob"}])
+        self.assertIsNone(self.view.status)
+        self.pause()
+        self.assertEqual(self.queries(), ["fo", "foo"])
+
+    def test_keeps_request_for_same_query(self) -> None:
+        self.type("foo")
+        self.pause()
+        self.command.on_change("foo")
+        self.pause()
+        self.assertEqual(self.client.cancelled, [])
+        self.assertEqual(self.queries(), ["foo"])
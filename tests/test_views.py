@@ -5,6 +5,7 @@ from LSP.plugin.core.views import did_open
 from LSP.plugin.core.views import did_save
 from LSP.plugin.core.views import MissingFilenameError
 from LSP.plugin.core.views import point_to_offset
+from LSP.plugin.core.views import read_lines
 from LSP.plugin.core.views import text_document_formatting
 from LSP.plugin.core.views import text_document_position_params
 from LSP.plugin.core.views import text_document_range_formatting
@@ -12,9 +13,12 @@ from LSP.plugin.core.views import uri_from_view
 from LSP.plugin.core.views import will_save
 from LSP.plugin.core.views import will_save_wait_until
 from LSP.plugin.core.views import location_to_encoded_filename
+from unittest import mock
 from unittest.mock import MagicMock
 from unittesting import DeferrableTestCase
+import os
 import sublime
+import tempfile
 
 
 class ViewsTest(DeferrableTestCase):
@@ -111,3 +115,26 @@ class ViewsTest(DeferrableTestCase):
             location_to_encoded_filename(
                 {'targetUri': 'file:///foo/bar', 'targetSelectionRange': {'start': {'line': 1234, 'character': 4321}}}),
             '/foo/bar:1235:4322')
+
+
+class ReadLinesTest(DeferrableTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        with tempfile.NamedTemporaryFile('wb', delete=False) as file:
+            file.write('first\r\n    second  \nthird é'.encode('utf-8'))
+            self.file_name = file.name
+
+    def tearDown(self) -> None:
+        os.remove(self.file_name)
+        super().tearDown()
+
+    def test_reads_requested_rows(self) -> None:
+        self.assertEqual(read_lines(self.file_name, [2, 0, 1, 7]), {0: 'first', 1: 'second', 2: 'third é', 7: ''})
+
+    def test_reads_large_files_through_mmap(self) -> None:
+        with mock.patch('LSP.plugin.core.views.MMAP_THRESHOLD', 1):
+            self.assertEqual(read_lines(self.file_name, [2, 0, 1, 7]), {0: 'first', 1: 'second', 2: 'third é', 7: ''})
+
+    def test_missing_file(self) -> None:
+        self.assertEqual(read_lines(self.file_name + '.missing', [0]), {0: ''})
@@ -3,8 +3,10 @@ from LSP.plugin.core.sessions import create_session
 from LSP.plugin.core.sessions import Session
 from LSP.plugin.core.types import ClientConfig
 from LSP.plugin.core.types import LanguageConfig
+from LSP.plugin.core.windows import CRASH_LOOP_LIMIT
 from LSP.plugin.core.windows import WindowManager
 from LSP.plugin.core.windows import WindowRegistry
+from LSP.plugin.core.windows import _syntax_extensions
 from LSP.plugin.core.workspace import ProjectFolders
 from test_mocks import MockClient
 from test_mocks import MockConfigs
@@ -36,7 +38,8 @@ def mock_start_session(window: MockWindow,
                        on_pre_initialize: 'Callable[[Session], None]',
                        on_post_initialize: 'Callable[[Session], None]',
                        on_post_exit: 'Callable[[str], None]',
-                       on_stderr_log: 'Optional[Callable[[str], None]]') -> 'Optional[Session]':
+                       on_stderr_log: 'Optional[Callable[[str], None]]',
+                       on_start_failed: 'Callable[[Session, str], None]') -> 'Optional[Session]':
     return create_session(
         config=TEST_CONFIG,
         workspace_folders=workspace_folders,
@@ -182,6 +185,16 @@ class WindowManagerTests(unittest.TestCase):
         # don't forget to check or we'll keep restarting sessions!
         self.assertEqual(wm.get_project_path(file_path), new_project_path)
 
+    def test_ends_failed_session_on_main_thread(self):
+        _, _, _, wm = self.make([[MockView(__file__)]])
+        session = wm.get_session(TEST_CONFIG.name, __file__)
+        self.assertIsNotNone(session)
+        # reported from the startup thread, the window is only changed once the main thread runs it.
+        wm._handle_start_failure(session, "no such server")
+        self.assertIs(wm.get_session(TEST_CONFIG.name, __file__), session)
+        test_sublime._run_timeout()
+        self.assertIsNone(wm.get_session(TEST_CONFIG.name, __file__))
+
     def test_offers_restart_on_crash(self):
         _, docs, _, wm = self.make([[MockView(__file__)]])
 
@@ -191,7 +204,9 @@ class WindowManagerTests(unittest.TestCase):
         # our starting document must be loaded
         self.assertListEqual(docs._documents, [__file__])
 
-        wm._handle_server_crash(TEST_CONFIG)
+        session = wm.get_session(TEST_CONFIG.name, __file__)
+        wm._handle_server_crash(session)
+        self.assertIsNone(session.client)
 
         # session must be started
         self.assertIsNotNone(wm.get_session(TEST_CONFIG.name, __file__))
@@ -246,3 +261,160 @@ class WindowManagerTests(unittest.TestCase):
             wm.activate_view(another_view)
             _ = wm.get_session(TEST_CONFIG.name, outside_file)
             self.assertEqual(len(wm._sessions), 1)
+
+    def test_routes_partial_results_by_token(self):
+        _, _, _, wm = self.make([[MockView(__file__)]])
+        batches = []  # type: List[Any]
+        token = wm.create_partial_result_token(batches.append)
+        other_token = wm.create_partial_result_token(batches.append)
+        self.assertNotEqual(token, other_token)
+
+        wm._handle_progress_notification({'token': token, 'value': [1, 2]})
+        wm._handle_progress_notification({'token': token, 'value': [3]})
+        self.assertListEqual(batches, [[1, 2], [3]])
+
+        wm.discard_progress_token(token)
+        wm._handle_progress_notification({'token': token, 'value': [4]})
+        self.assertListEqual(batches, [[1, 2], [3]])
+
+    def test_tracks_work_done_tokens(self):
+        _, _, _, wm = self.make([[MockView(__file__)]])
+        token = wm.create_work_done_token()
+        wm._handle_progress_notification({'token': token, 'value': {'kind': 'begin', 'title': 'Searching'}})
+        self.assertEqual(wm._progress[token]['title'], 'Searching')
+        wm.discard_progress_token(token)
+        self.assertNotIn(token, wm._progress)
+
+    def test_caches_session_routes(self):
+        view = MockView(__file__)
+        _, _, _, wm = self.make([[view]])
+        session = wm.get_session(TEST_CONFIG.name, __file__)
+        self.assertEqual(wm.sessions_for_view(view), [session])
+        wm._configs.scope_configs = lambda view, point=None: []
+        # routed from the cache, the configs are not scored again.
+        self.assertEqual(wm.sessions_for_view(view), [session])
+        wm.end_sessions()
+        self.assertEqual(wm.sessions_for_view(view), [])
+
+    def test_config_change_invalidates_session_routes(self):
+        view = MockView(__file__)
+        _, _, _, wm = self.make([[view]])
+        self.assertEqual(len(wm.sessions_for_view(view)), 1)
+        wm._configs.remove(TEST_CONFIG)
+        wm._configs.scope_configs = lambda view, point=None: []
+        self.assertEqual(wm.sessions_for_view(view), [])
+
+    def test_invalidates_only_own_session_routes(self):
+        view = MockView(__file__)
+        _, _, _, wm = self.make([[view]])
+        other_view = MockView(__file__)
+        other_window, _, _, other_wm = self.make([[other_view]])
+        other_window.id = lambda: 1  # type: ignore
+        other_sessions = other_wm.sessions_for_view(other_view)
+        self.assertEqual(len(other_sessions), 1)
+        other_wm._configs.scope_configs = lambda view, point=None: []
+        wm._invalidate_session_routes()
+        # the other window still routes from the cache.
+        self.assertEqual(other_wm.sessions_for_view(other_view), other_sessions)
+
+    def test_prewarms_and_ends_unused_sessions(self):
+        folder = os.path.dirname(__file__)
+        _, _, _, wm = self.make([[]], [folder])
+        self.assertEqual(len(wm._sessions), 0)
+        _syntax_extensions["Plain Text"] = ["py"]
+        try:
+            wm._settings.prewarm_sessions = True
+            wm.prewarm_sessions()
+            test_sublime._run_timeout()
+        finally:
+            del _syntax_extensions["Plain Text"]
+        session = wm.get_session(TEST_CONFIG.name, __file__)
+        self.assertIsNotNone(session)
+        self.assertEqual(wm._prewarmed_sessions, [session])
+        # the idle timeout ends the session as no view used it.
+        test_sublime._run_timeout()
+        self.assertIsNone(wm.get_session(TEST_CONFIG.name, __file__))
+        self.assertEqual(wm._prewarmed_sessions, [])
+
+    def test_shares_session_between_windows(self):
+        folder = os.path.dirname(__file__)
+        window1, docs1, _, wm1 = self.make([[]], [folder])
+        window2, docs2, _, wm2 = self.make([[]], [folder])
+        for window, wm in ((window1, wm1), (window2, wm2)):
+            wm._settings.share_sessions = True
+            view = MockView(__file__)
+            window._files_in_groups = [[view]]
+            wm.activate_view(view)
+        session = wm1.get_session(TEST_CONFIG.name, __file__)
+        self.assertIsNotNone(session)
+        self.assertIs(wm2.get_session(TEST_CONFIG.name, __file__), session)
+        self.assertIs(docs2._sessions[TEST_CONFIG.name], session)
+
+        # the session outlives the first window to release it.
+        wm1.end_sessions()
+        self.assertIsNone(wm1.get_session(TEST_CONFIG.name, __file__))
+        self.assertIsNotNone(session.client)
+        wm2.end_sessions()
+        self.assertIsNone(session.client)
+
+    def test_hibernates_idle_session(self):
+        folder = os.path.dirname(__file__)
+        window, docs, _, wm = self.make([[]], [folder])
+        TEST_CONFIG.idle_timeout = 60
+        try:
+            wm._start_client(TEST_CONFIG, __file__)
+            self.assertIsNotNone(wm.get_session(TEST_CONFIG.name, __file__))
+            # no view of the session is open and the client was never used.
+            test_sublime._run_timeout()
+            self.assertIsNone(wm.get_session(TEST_CONFIG.name, __file__))
+            self.assertIn(TEST_CONFIG.name, wm._hibernated)
+
+            view = MockView(__file__)
+            window._files_in_groups = [[view]]
+            wm.activate_view(view)
+            self.assertIsNotNone(wm.get_session(TEST_CONFIG.name, __file__))
+            self.assertEqual(wm._hibernated, {})
+            self.assertEqual(view._status["lsp_idle"], "")
+        finally:
+            TEST_CONFIG.idle_timeout = 0
+
+    def test_wakes_hibernated_session_once(self):
+        folder = os.path.dirname(__file__)
+        window, docs, _, wm = self.make([[]], [folder])
+        TEST_CONFIG.idle_timeout = 60
+        try:
+            wm._start_client(TEST_CONFIG, __file__)
+            test_sublime._run_timeout()
+            self.assertIn(TEST_CONFIG.name, wm._hibernated)
+
+            # files outside the workspace leave the session stopped.
+            wm.wake_hibernated(MockView(os.path.join(os.path.dirname(folder), "outside.py")))
+            self.assertIn(TEST_CONFIG.name, wm._hibernated)
+
+            view = MockView(__file__)
+            window._files_in_groups = [[view]]
+            wm.wake_hibernated(view)
+            session = wm.get_session(TEST_CONFIG.name, __file__)
+            self.assertIsNotNone(session)
+            self.assertEqual(wm._hibernated, {})
+            wm.wake_hibernated(view)
+            self.assertIs(wm.get_session(TEST_CONFIG.name, __file__), session)
+        finally:
+            TEST_CONFIG.idle_timeout = 0
+
+    def test_restarts_crashed_session_with_backoff(self):
+        _, docs, _, wm = self.make([[MockView(__file__)]])
+        wm._settings.auto_restart = True
+        for crash in range(CRASH_LOOP_LIMIT):
+            session = wm.get_session(TEST_CONFIG.name, __file__)
+            self.assertIsNotNone(session)
+            wm._handle_server_crash(session)
+            self.assertIsNone(wm.get_session(TEST_CONFIG.name, __file__))
+            test_sublime._run_timeout()
+            self.assertIsNot(wm.get_session(TEST_CONFIG.name, __file__), session)
+            self.assertIs(docs._sessions[TEST_CONFIG.name], wm.get_session(TEST_CONFIG.name, __file__))
+
+        # one crash too many within the period, the server is given up on.
+        wm._handle_server_crash(wm.get_session(TEST_CONFIG.name, __file__))
+        test_sublime._run_timeout()
+        self.assertIsNone(wm.get_session(TEST_CONFIG.name, __file__))
@@ -1,5 +1,5 @@
 from test_mocks import MockWindow
-from LSP.plugin.core.workspace import ProjectFolders, sorted_workspace_folders, is_subpath_of
+from LSP.plugin.core.workspace import ProjectFolders, sorted_workspace_folders, is_subpath_of, FolderTrie
 from LSP.plugin.core.protocol import WorkspaceFolder
 import os
 from unittest import mock
@@ -50,6 +50,25 @@ class IsSubpathOfTest(unittest.TestCase):
         self.assertTrue(is_subpath_of(r"e:\WWW\nthu-ee-iframe\public\include\list_faculty_functions.php",
                                       r"E:\WWW\nthu-ee-iframe"))
 
+    def test_sibling_with_common_prefix(self) -> None:
+        self.assertTrue(is_subpath_of("/a/foo/bar.py", "/a/foo"))
+        self.assertTrue(is_subpath_of("/a/foo/bar.py", "/a/foo/"))
+        self.assertFalse(is_subpath_of("/a/foo2/bar.py", "/a/foo"))
+
+
+class FolderTrieTest(unittest.TestCase):
+
+    def test_containing_folders(self) -> None:
+        trie = FolderTrie(["/a", "/a/foo", "/a/foo2", "/b"])
+        self.assertEqual(trie.containing_folders("/a/foo/bar.py"), ["/a/foo", "/a"])
+        self.assertEqual(trie.nearest_folder("/a/foo2/bar.py"), "/a/foo2")
+        self.assertEqual(trie.nearest_folder("/a/fo/bar.py"), "/a")
+        self.assertIsNone(trie.nearest_folder("/c/bar.py"))
+
+    def test_case_and_separators(self) -> None:
+        trie = FolderTrie([r"E:\WWW\project"])
+        self.assertEqual(trie.nearest_folder("e:/www/project/index.php"), r"E:\WWW\project")
+
 
 class WorkspaceFoldersTest(unittest.TestCase):
 